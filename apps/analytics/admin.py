@@ -1,3 +1,24 @@
 from django.contrib import admin
+from .models import FxRate, MonthlySpend
 
 # Register your models here.
+@admin.register(MonthlySpend)
+class MonthlySpendAdmin(admin.ModelAdmin):
+    """
+    Админка агрегатов расходов (только просмотр)
+    """
+    list_display = ('id', 'user', 'category', 'currency', 'monthly_amount', 'subscriptions_count', 'update_at')
+    readonly_fields = ('user', 'category', 'currency', 'monthly_amount', 'subscriptions_count', 'update_at')
+    search_fields = ('user__email',)
+    list_filter = ('currency',)
+
+
+@admin.register(FxRate)
+class FxRateAdmin(admin.ModelAdmin):
+    """
+    Админка курсов валют
+    """
+    list_display = ('id', 'date', 'currency', 'rate')
+    list_filter = ('currency',)
+    date_hierarchy = 'date'
+    ordering = ('-date', 'currency')
@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from rest_framework import serializers
+
+from apps.analytics.models import MonthlySpend
+from apps.analytics.services.spend_history import GROUP_BY_FIELDS
+
+from utils.validators import validator_currency
+
+# Максимальная длина периода отчета по фактическим списаниям
+MAX_HISTORY_DAYS = 366 * 5
+
+
+class MonthlySpendSerializer(serializers.ModelSerializer):
+    """
+    Строка сводки расходов: валюта + категория
+    """
+    category_name = serializers.CharField(source='category.name', read_only=True, default=None)
+
+    class Meta:
+        model = MonthlySpend
+        fields = [
+            'currency',
+            'category',             # Категория (null — без категории)
+            'category_name',
+            'monthly_amount',       # Сумма в месяц
+            'subscriptions_count',  # Количество активных подписок
+        ]
+        read_only_fields = fields
+
+
+class SpendTotalSerializer(serializers.Serializer):
+    """
+    Итог расходов в месяц по валюте
+    """
+    currency = serializers.CharField()
+    monthly_amount = serializers.DecimalField(max_digits=16, decimal_places=4)
+    subscriptions_count = serializers.IntegerField()
+
+
+class SpendSummaryQuerySerializer(serializers.Serializer):
+    """
+    Валюта итога сводки (по текущему курсу), необязательно
+    """
+    currency = serializers.CharField(max_length=3, required=False, validators=[validator_currency])
+
+
+class SpendHistoryQuerySerializer(serializers.Serializer):
+    """
+    Параметры отчета по фактическим списаниям: период [date_from, date_to) и группировка
+    """
+    date_from = serializers.DateTimeField()
+    date_to = serializers.DateTimeField()
+    group_by = serializers.ChoiceField(choices=list(GROUP_BY_FIELDS), default='category')
+    # Пересчет в одну валюту по курсу на дату списания
+    currency = serializers.CharField(max_length=3, required=False, validators=[validator_currency])
+
+    def validate(self, attrs):
+        if attrs['date_to'] <= attrs['date_from']:
+            raise serializers.ValidationError('date_to должна быть позже date_from')
+        if attrs['date_to'] - attrs['date_from'] > timedelta(days=MAX_HISTORY_DAYS):
+            raise serializers.ValidationError(f'Период отчета не может превышать {MAX_HISTORY_DAYS} дней')
+        return attrs
+
+
+class SpendHistoryRowSerializer(serializers.Serializer):
+    """
+    Итог фактических списаний: группа (id подписки/категории/провайдера) + валюта
+    """
+    group = serializers.IntegerField(allow_null=True)
+    currency = serializers.CharField()
+    amount = serializers.DecimalField(max_digits=16, decimal_places=2)
+    count = serializers.IntegerField()
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import SpendHistoryView, SpendSummaryView
+
+urlpatterns = [
+    path('spend-summary/', SpendSummaryView.as_view(), name='analytics-spend-summary'),
+    path('spend-history/', SpendHistoryView.as_view(), name='analytics-spend-history'),
+]
@@ -0,0 +1,65 @@
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .serializers import (MonthlySpendSerializer, SpendHistoryQuerySerializer, SpendHistoryRowSerializer,
+    SpendSummaryQuerySerializer,
+    SpendTotalSerializer,
+)
+from apps.analytics.services.aggregations import user_spend_summary
+from apps.analytics.services.fx import convert_total
+from apps.analytics.services.spend_history import spend_history
+
+class SpendSummaryView(APIView):
+    """
+    Сводка ежемесячных расходов пользователя (по валютам и категориям)
+
+    Читает готовые агрегаты MonthlySpend, без пересчета подписок.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = SpendSummaryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        currency = query.validated_data.get('currency')
+
+        summary = user_spend_summary(request.user)
+        data = {
+            'totals': SpendTotalSerializer(summary['totals'], many=True).data,
+            'by_category': MonthlySpendSerializer(summary['by_category'], many=True).data,
+        }
+        if currency:
+            try:
+                amount = convert_total(summary['totals'], to=currency, on=timezone.localdate(),
+                                       amount_key='monthly_amount')
+            except ValueError as e:
+                return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            data['total'] = {'currency': currency, 'monthly_amount': amount}
+        return Response(data)
+
+
+class SpendHistoryView(APIView):
+    """
+    Фактические списания пользователя за период, по группам (подписка/категория/провайдер) и валютам
+
+    Считается по версиям расписаний и истории цен (services/spend_history.py).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = SpendHistoryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        try:
+            rows = spend_history(date_from=params['date_from'], date_to=params['date_to'],
+                                 group_by=params['group_by'], currency=params.get('currency'), user=request.user)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'date_from': params['date_from'],
+            'date_to': params['date_to'],
+            'group_by': params['group_by'],
+            'rows': SpendHistoryRowSerializer(rows, many=True).data,
+        })
@@ -2,4 +2,10 @@ from django.apps import AppConfig
 
 
 class AnalyticsConfig(AppConfig):
-    name = 'analytics'
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.analytics'
+    verbose_name = 'Analytics'
+    label = 'analytics'
+
+    def ready(self):
+        from apps.analytics import signals  # noqa: F401
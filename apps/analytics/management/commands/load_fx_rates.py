@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.analytics.services.fx import base_currency, iter_rate_rows, load_rates
+
+
+class Command(BaseCommand):
+    """
+    Загрузка курсов валют (FxRate) из локального файла
+
+    CSV с заголовком date,currency,rate или JSON-массив объектов с теми же полями.
+    rate — стоимость 1 единицы currency в базовой валюте (settings.FX_BASE_CURRENCY).
+    Повторная загрузка обновляет курсы на те же даты.
+
+    Пример:
+        python manage.py load_fx_rates rates/2025.csv
+    """
+    help = "Загрузка курсов валют из CSV/JSON файла"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к файлу")
+        parser.add_argument("--format", choices=["csv", "json"], default=None,
+                            help="Формат файла (по умолчанию — по расширению)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Размер пачки (одна транзакция)")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        fmt = options["format"] or path.suffix.lstrip(".").lower()
+        if not path.exists():
+            raise CommandError(f"Файл не найден: {path}")
+
+        with path.open(encoding="utf-8-sig", newline="") as stream:
+            try:
+                loaded = load_rates(iter_rate_rows(stream, fmt), batch_size=options["batch_size"])
+            except (KeyError, ValueError, ArithmeticError) as e:
+                raise CommandError(f"Ошибка загрузки курсов: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Загружено курсов: {loaded} (база {base_currency()})"))
@@ -0,0 +1,64 @@
+import csv
+from datetime import datetime, time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.analytics.services.spend_history import GROUP_BY_FIELDS, iter_charges, spend_history
+
+User = get_user_model()
+
+
+def _parse_date(value: str) -> datetime:
+    try:
+        return timezone.make_aware(datetime.combine(datetime.strptime(value, "%Y-%m-%d").date(), time.min))
+    except ValueError:
+        raise CommandError(f"Неверная дата (ожидается YYYY-MM-DD): {value}")
+
+
+class Command(BaseCommand):
+    """
+    Отчет по фактическим списаниям за период (CSV в stdout)
+
+    Пример (годовой отчет по всей базе):
+        python manage.py spend_report --from 2025-01-01 --to 2026-01-01 --group-by provider > year.csv
+        python manage.py spend_report --from 2025-01-01 --to 2026-01-01 --user a@example.com --charges
+    """
+    help = "Отчет по фактическим списаниям подписок за период"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", required=True, help="Начало периода (YYYY-MM-DD)")
+        parser.add_argument("--to", dest="date_to", required=True, help="Конец периода, не включая (YYYY-MM-DD)")
+        parser.add_argument("--group-by", choices=list(GROUP_BY_FIELDS), default="category", help="Группировка")
+        parser.add_argument("--user", default=None, help="Email пользователя (по умолчанию — все пользователи)")
+        parser.add_argument("--charges", action="store_true",
+                            help="Выгрузить каждое списание построчно вместо итогов")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Подписок на чанк")
+
+    def handle(self, *args, **options):
+        date_from = _parse_date(options["date_from"])
+        date_to = _parse_date(options["date_to"])
+        if date_to <= date_from:
+            raise CommandError("--to должна быть позже --from")
+
+        user = None
+        if options["user"]:
+            user = User.objects.filter(email=options["user"]).first()
+            if user is None:
+                raise CommandError(f"Пользователь не найден: {options['user']}")
+
+        writer = csv.writer(self.stdout)
+        if options["charges"]:
+            writer.writerow(["subscription_id", "user_id", "category_id", "provider_id", "occurs_at", "amount",
+                             "currency"])
+            for charge in iter_charges(date_from=date_from, date_to=date_to, user=user,
+                                       chunk_size=options["chunk_size"]):
+                writer.writerow([charge.subscription_id, charge.user_id, charge.category_id, charge.provider_id,
+                                 charge.occurs_at.isoformat(), charge.amount, charge.currency])
+            return
+
+        writer.writerow([options["group_by"], "currency", "amount", "count"])
+        for row in spend_history(date_from=date_from, date_to=date_to, group_by=options["group_by"], user=user,
+                                 chunk_size=options["chunk_size"]):
+            writer.writerow([row["group"], row["currency"], row["amount"], row["count"]])
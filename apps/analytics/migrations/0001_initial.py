@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-17 18:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('subscriptions', '0004_billing_occurrences'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpendContribution',
+            fields=[
+                ('subscription', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='spend_contribution', serialize=False, to='subscriptions.subscription')),
+                ('currency', models.CharField(max_length=3)),
+                ('monthly_amount', models.DecimalField(decimal_places=4, max_digits=16)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='subscriptions.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'analytics_spend_contributions',
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlySpend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3)),
+                ('monthly_amount', models.DecimalField(decimal_places=4, default=0, max_digits=16)),
+                ('subscriptions_count', models.PositiveIntegerField(default=0)),
+                ('update_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='monthly_spend', to='subscriptions.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_spend', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'analytics_monthly_spend',
+                'constraints': [models.UniqueConstraint(fields=('user', 'category', 'currency'), name='uniq_monthly_spend_user_category_currency', nulls_distinct=False)],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-17 19:20
+
+import django.core.validators
+import utils.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('currency', models.CharField(max_length=3, validators=[utils.validators.validator_currency])),
+                ('rate', models.DecimalField(decimal_places=10, max_digits=20, validators=[django.core.validators.MinValueValidator(0)])),
+                ('create_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'analytics_fx_rates',
+                'constraints': [models.UniqueConstraint(fields=('currency', 'date'), name='uniq_fx_rate_currency_date'), models.CheckConstraint(condition=models.Q(('rate__gt', 0)), name='fx_rate_positive')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0 on 2026-10-17 20:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_fx_rates'),
+        ('subscriptions', '0013_trial_queue_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='monthlyspend',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='monthly_spend', to='subscriptions.category'),
+        ),
+    ]
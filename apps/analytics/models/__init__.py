@@ -0,0 +1,8 @@
+from .fx import FxRate
+from .spend import MonthlySpend, SpendContribution
+
+__all__ = [
+    'FxRate',
+    'MonthlySpend',
+    'SpendContribution',
+]
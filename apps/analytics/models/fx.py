@@ -0,0 +1,33 @@
+from django.core.validators import MinValueValidator
+from django.db import models
+
+from utils.validators import validator_currency
+
+
+class FxRate(models.Model):
+    """
+    FxRate - курс валюты на дату
+
+    rate — сколько единиц базовой валюты (settings.FX_BASE_CURRENCY) стоит 1 единица currency.
+    Кросс-курс X -> Y = rate(X) / rate(Y), поэтому хранится одна строка на валюту и дату.
+
+    Заполняется из локальных файлов/фикстур (management command load_fx_rates), без сетевых запросов.
+    Курс на дату без записи — последний известный до этой даты.
+    """
+
+    date = models.DateField()
+    currency = models.CharField(max_length=3, validators=[validator_currency])
+    rate = models.DecimalField(max_digits=20, decimal_places=10, validators=[MinValueValidator(0)])
+
+    create_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "analytics_fx_rates"
+        constraints = [
+            # Один курс на валюту и дату
+            models.UniqueConstraint(fields=["currency", "date"], name="uniq_fx_rate_currency_date"),
+            models.CheckConstraint(condition=models.Q(rate__gt=0), name="fx_rate_positive"),
+        ]
+
+    def __str__(self):
+        return f"{self.date}: 1 {self.currency} = {self.rate}"
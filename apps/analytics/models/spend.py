@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.db import models
+
+from apps.subscriptions.models import Category, Subscription
+
+
+class MonthlySpend(models.Model):
+    """
+    MonthlySpend - агрегат ежемесячных расходов пользователя по валюте и категории
+
+    Одна запись = сумма "месячной стоимости" активных подписок пользователя в группе (валюта + категория).
+    Поддерживается инкрементально (дельтами) в services/aggregations.py,
+    поэтому чтение сводки — это чтение нескольких строк по пользователю.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="monthly_spend")
+    # SET_NULL, как у Subscription.category и SpendContribution.category; перед удалением категории строки
+    # сливаются в группу "без категории" (merge_category_spend), чтобы не нарушить уникальность группы
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name="monthly_spend")
+    currency = models.CharField(max_length=3)
+
+    # Сумма в месяц (4 знака, чтобы дельты не накапливали ошибку округления)
+    monthly_amount = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+    # Количество активных подписок в группе
+    subscriptions_count = models.PositiveIntegerField(default=0)
+
+    update_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "analytics_monthly_spend"
+        constraints = [
+            # Одна строка на группу пользователь + категория (в т.ч. "без категории") + валюта
+            models.UniqueConstraint(fields=["user", "category", "currency"], nulls_distinct=False,
+                                    name="uniq_monthly_spend_user_category_currency"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.monthly_amount} {self.currency} [{self.category_id}]"
+
+
+class SpendContribution(models.Model):
+    """
+    SpendContribution - текущий вклад подписки в MonthlySpend
+
+    Нужен, чтобы при изменении подписки вычесть из агрегата ровно то, что было добавлено ранее
+    (без пересчета всех подписок пользователя).
+    """
+
+    subscription = models.OneToOneField(Subscription, on_delete=models.CASCADE, primary_key=True,
+                                        related_name="spend_contribution")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    currency = models.CharField(max_length=3)
+    monthly_amount = models.DecimalField(max_digits=16, decimal_places=4)
+
+    class Meta:
+        db_table = "analytics_spend_contributions"
+
+    def __str__(self):
+        return f"{self.subscription_id}: {self.monthly_amount} {self.currency}"
@@ -0,0 +1,193 @@
+"""
+Aggregations service
+
+Функционал:
+- нормализация цены подписки к "стоимости в месяц"
+- инкрементальное обновление MonthlySpend при изменении подписки (цена/статус/категория/расписание)
+- полный пересчет агрегатов (восстановление/первичное заполнение)
+- перенос агрегатов удаляемой категории в группу "без категории" (вслед за подписками и вкладами)
+- чтение сводки расходов пользователя
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.analytics.models import MonthlySpend, SpendContribution
+from apps.subscriptions.models import BillingSchedule, Subscription
+
+from utils.enums import PeriodUnit, Status
+
+# Средняя длина месяца в днях (365.25 / 12)
+_DAYS_PER_MONTH = Decimal("30.4375")
+_AMOUNT_QUANT = Decimal("0.0001")
+# Подписки, которые учитываются в расходах
+SPEND_STATUSES = (Status.ACTIVE,)
+
+
+def monthly_amount(amount: Decimal, period_unit: str, period_interval: int) -> Decimal:
+    """
+    Стоимость подписки в месяц по цене за период (каждые N period_unit)
+    """
+    if period_unit == PeriodUnit.DAY:
+        per_month = _DAYS_PER_MONTH / period_interval
+    elif period_unit == PeriodUnit.WEEK:
+        per_month = _DAYS_PER_MONTH / (7 * period_interval)
+    elif period_unit == PeriodUnit.MONTH:
+        per_month = Decimal(1) / period_interval
+    elif period_unit == PeriodUnit.YEAR:
+        per_month = Decimal(1) / (12 * period_interval)
+    else:
+        raise ValueError(f"Период не найден: {period_unit}")
+    return (amount * per_month).quantize(_AMOUNT_QUANT)
+
+
+def _current_schedule(sub: Subscription) -> Optional[BillingSchedule]:
+    if sub.current_schedule_id is None:
+        return None
+    return BillingSchedule.objects.filter(pk=sub.current_schedule_id).first()
+
+
+def _add_to_group(*, user_id: int, category_id: Optional[int], currency: str, amount: Decimal, count: int) -> None:
+    """
+    Применяет дельту к строке агрегата (UPDATE ... SET x = x + delta), создавая строку при необходимости
+    """
+    group = MonthlySpend.objects.filter(user_id=user_id, category_id=category_id, currency=currency)
+    delta = dict(monthly_amount=F("monthly_amount") + amount,
+                 subscriptions_count=F("subscriptions_count") + count,
+                 update_at=timezone.now())
+    if group.update(**delta):
+        return
+    try:
+        with transaction.atomic():
+            MonthlySpend.objects.create(user_id=user_id, category_id=category_id, currency=currency,
+                                        monthly_amount=amount, subscriptions_count=count)
+    except IntegrityError:
+        # Строку успел создать параллельный процесс
+        group.update(**delta)
+
+
+@transaction.atomic
+def apply_subscription_spend(sub: Subscription, *, schedule: Optional[BillingSchedule] = None) -> None:
+    """
+    Инкрементально обновляет MonthlySpend по одной подписке.
+
+    Старый вклад подписки (SpendContribution) вычитается, новый добавляется —
+    O(1) запросов независимо от количества подписок пользователя.
+    schedule — актуальное расписание, если уже известно (экономит запрос).
+    """
+    old = SpendContribution.objects.select_for_update().filter(subscription_id=sub.pk).first()
+
+    new_amount = None
+    if sub.status in SPEND_STATUSES:
+        schedule = schedule or _current_schedule(sub)
+        if schedule is not None:
+            new_amount = monthly_amount(sub.current_price_amount, schedule.period_unit, schedule.period_interval)
+
+    new_key = (sub.user_id, sub.category_id, sub.current_price_currency)
+    if old is not None and new_amount is not None \
+            and (old.user_id, old.category_id, old.currency) == new_key and old.monthly_amount == new_amount:
+        return
+
+    if old is not None:
+        _add_to_group(user_id=old.user_id, category_id=old.category_id, currency=old.currency,
+                      amount=-old.monthly_amount, count=-1)
+
+    if new_amount is None:
+        if old is not None:
+            old.delete()
+        return
+
+    _add_to_group(user_id=sub.user_id, category_id=sub.category_id, currency=sub.current_price_currency,
+                  amount=new_amount, count=1)
+    SpendContribution.objects.update_or_create(subscription_id=sub.pk,
+                                               defaults=dict(user_id=sub.user_id,
+                                                             category_id=sub.category_id,
+                                                             currency=sub.current_price_currency,
+                                                             monthly_amount=new_amount))
+
+
+@transaction.atomic
+def discard_subscription_spend(sub: Subscription) -> None:
+    """
+    Убирает вклад подписки из MonthlySpend (перед удалением подписки)
+    """
+    old = SpendContribution.objects.select_for_update().filter(subscription_id=sub.pk).first()
+    if old is None:
+        return
+    _add_to_group(user_id=old.user_id, category_id=old.category_id, currency=old.currency,
+                  amount=-old.monthly_amount, count=-1)
+    old.delete()
+
+
+@transaction.atomic
+def merge_category_spend(category_id: int) -> int:
+    """
+    Переносит строки MonthlySpend категории в группу "без категории" (перед удалением категории).
+
+    Подписки и SpendContribution при удалении получают category = NULL, поэтому и их сумма должна оказаться
+    в NULL-группе: иначе следующие дельты apply_subscription_spend вычитают из нее то, что в нее не добавлялось.
+    Возвращает количество перенесенных строк.
+    """
+    rows = list(MonthlySpend.objects.select_for_update().filter(category_id=category_id))
+    for row in rows:
+        _add_to_group(user_id=row.user_id, category_id=None, currency=row.currency,
+                      amount=row.monthly_amount, count=row.subscriptions_count)
+    MonthlySpend.objects.filter(pk__in=[row.pk for row in rows]).delete()
+    return len(rows)
+
+
+@transaction.atomic
+def rebuild_user_spend(user_ids: Iterable[int]) -> int:
+    """
+    Полный пересчет агрегатов для набора пользователей (первичное заполнение/восстановление).
+    Возвращает количество учтенных подписок.
+    """
+    user_ids = list(user_ids)
+    MonthlySpend.objects.filter(user_id__in=user_ids).delete()
+    SpendContribution.objects.filter(user_id__in=user_ids).delete()
+
+    contributions = []
+    groups: dict[tuple, list] = {}
+    subs = (Subscription.objects.select_related("current_schedule")
+            .filter(user_id__in=user_ids, status__in=SPEND_STATUSES, current_schedule__isnull=False))
+
+    for sub in subs:
+        schedule = sub.current_schedule
+        amount = monthly_amount(sub.current_price_amount, schedule.period_unit, schedule.period_interval)
+        contributions.append(SpendContribution(subscription_id=sub.pk, user_id=sub.user_id,
+                                               category_id=sub.category_id,
+                                               currency=sub.current_price_currency, monthly_amount=amount))
+        group = groups.setdefault((sub.user_id, sub.category_id, sub.current_price_currency), [Decimal(0), 0])
+        group[0] += amount
+        group[1] += 1
+
+    SpendContribution.objects.bulk_create(contributions, batch_size=1000)
+    MonthlySpend.objects.bulk_create([MonthlySpend(user_id=user_id, category_id=category_id, currency=currency,
+                                                   monthly_amount=amount, subscriptions_count=count)
+                                      for (user_id, category_id, currency), (amount, count) in groups.items()],
+                                     batch_size=1000)
+    return len(contributions)
+
+
+def user_spend_summary(user) -> dict:
+    """
+    Сводка ежемесячных расходов пользователя:
+    - by_category — строки агрегата (валюта + категория)
+    - totals — итоги по валютам
+    """
+    rows = list(MonthlySpend.objects.select_related("category")
+                .filter(user=user, subscriptions_count__gt=0).order_by("currency", "category__sort_order"))
+
+    totals: dict[str, dict] = {}
+    for row in rows:
+        total = totals.setdefault(row.currency, {"currency": row.currency, "monthly_amount": Decimal(0),
+                                                 "subscriptions_count": 0})
+        total["monthly_amount"] += row.monthly_amount
+        total["subscriptions_count"] += row.subscriptions_count
+
+    return {"by_category": rows, "totals": list(totals.values())}
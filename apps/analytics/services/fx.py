@@ -0,0 +1,244 @@
+"""
+FX service
+
+Функционал:
+- загрузка курсов FxRate из локальных файлов (CSV / JSON), без сетевых запросов
+- кеш курсов в памяти процесса: временные ряды по валютам (NumPy) и срезы "все курсы на дату"
+- конвертация одной суммы и векторная конвертация массивов сумм (валюта + дата на каждую строку)
+
+Суммы считаются в Decimal (как в БД): векторный только поиск курсов, поэтому итоги отчетов
+не накапливают ошибку float.
+
+Курс на дату без записи — последний известный до этой даты (выходные/праздники).
+"""
+from __future__ import annotations
+
+import csv
+import json
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+from typing import IO, Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from apps.analytics.models import FxRate
+
+from utils.validators import invalid_currencies
+
+_AMOUNT_QUANT = Decimal("0.01")
+# Сколько секунд процесс доверяет загруженным курсам (новые загрузки видны не позже)
+FX_CACHE_TTL = 60 * 60
+# Срезов "курсы на дату" в памяти не больше
+_MAX_DATES = 4096
+
+
+def base_currency() -> str:
+    """
+    Базовая валюта курсов (settings.FX_BASE_CURRENCY)
+    """
+    return getattr(settings, "FX_BASE_CURRENCY", "USD")
+
+
+class _RateCache:
+    """
+    Кеш курсов процесса
+
+    - series: валюта -> (ordinal дат по возрастанию, курсы Decimal в массиве dtype=object) для searchsorted
+    - by_date: дата -> {валюта: Decimal курс} (срезы для скалярной конвертации)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        self.series: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self.by_date: dict[date, dict[str, Decimal]] = {}
+        self.loaded_at = time.monotonic()
+
+    def _expire(self) -> None:
+        if time.monotonic() - self.loaded_at > FX_CACHE_TTL:
+            self.clear()
+
+    def get_series(self, currencies: Iterable[str]) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        """
+        Временные ряды курсов; недостающие валюты догружаются одним запросом
+        """
+        with self._lock:
+            self._expire()
+            currencies = set(currencies)
+            missing = currencies - self.series.keys()
+            if missing:
+                rows: dict[str, list[tuple[int, Decimal]]] = {currency: [] for currency in missing}
+                for currency, day, rate in (FxRate.objects.filter(currency__in=missing)
+                                            .order_by("currency", "date").values_list("currency", "date", "rate")):
+                    rows[currency].append((day.toordinal(), rate))
+                for currency, points in rows.items():
+                    self.series[currency] = (np.array([p[0] for p in points], dtype=np.int64),
+                                             np.array([p[1] for p in points], dtype=object))
+            return {currency: self.series[currency] for currency in currencies}
+
+    def rates_on(self, on: date, currencies: Iterable[str]) -> dict[str, Decimal]:
+        """
+        Курсы валют на дату (Decimal), срез кешируется по дате
+        """
+        currencies = set(currencies)
+        with self._lock:
+            self._expire()
+            cached = self.by_date.get(on)
+            if cached is not None and currencies <= cached.keys():
+                return cached
+
+        ordinal = on.toordinal()
+        rates = {}
+        for currency, (days, values) in self.get_series(currencies).items():
+            idx = int(np.searchsorted(days, ordinal, side="right")) - 1
+            if idx >= 0:
+                rates[currency] = values[idx]
+
+        with self._lock:
+            if len(self.by_date) >= _MAX_DATES:
+                self.by_date.clear()
+            self.by_date.setdefault(on, {}).update(rates)
+            return self.by_date[on]
+
+
+_cache = _RateCache()
+
+
+def invalidate_fx_cache() -> None:
+    """
+    Сброс кеша курсов процесса (после загрузки новых курсов)
+    """
+    _cache.clear()
+
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _rate(rates: dict[str, Decimal], currency: str, on: date) -> Decimal:
+    if currency == base_currency():
+        return Decimal(1)
+    try:
+        return rates[currency]
+    except KeyError:
+        raise ValueError(f"Нет курса {currency} на {on}")
+
+
+def convert(amount: Decimal, from_currency: str, to_currency: str, *, on: date | datetime) -> Decimal:
+    """
+    Конвертация одной суммы по курсу на дату (округление до 0.01)
+    """
+    if from_currency == to_currency:
+        return amount
+    on = _as_date(on)
+    rates = _cache.rates_on(on, {from_currency, to_currency} - {base_currency()})
+    result = amount * _rate(rates, from_currency, on) / _rate(rates, to_currency, on)
+    return result.quantize(_AMOUNT_QUANT)
+
+
+_quantize_amounts = np.frompyfunc(lambda amount: amount.quantize(_AMOUNT_QUANT), 1, 1)
+
+
+def _rates_for(currency: str, ordinals: np.ndarray, series: dict[str, tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+    """
+    Курсы одной валюты (Decimal) на массив дат (searchsorted по временному ряду)
+    """
+    if currency == base_currency():
+        return np.full(ordinals.shape, Decimal(1), dtype=object)
+    days, rates = series[currency]
+    idx = np.searchsorted(days, ordinals, side="right") - 1
+    if idx.size and (idx.min() < 0):
+        first_missing = date.fromordinal(int(ordinals[idx < 0].min()))
+        raise ValueError(f"Нет курса {currency} на {first_missing}")
+    return rates[idx]
+
+
+def convert_many(amounts: Sequence, currencies: Sequence[str], dates: Sequence[date | datetime], *,
+                 to: str) -> np.ndarray:
+    """
+    Векторная конвертация: amounts[i] в валюте currencies[i] по курсу на dates[i] -> валюта to.
+
+    Курсы берутся из кеша временных рядов (один запрос на недостающие валюты),
+    поиск курса — np.searchsorted по всем строкам валюты сразу.
+    Результат — массив Decimal (dtype=object), округленных до 0.01, совпадает с поштучным convert.
+    """
+    size = len(amounts)
+    if size == 0:
+        return np.zeros(0, dtype=object)
+
+    values = np.array([Decimal(str(amount)) for amount in amounts], dtype=object)
+    codes = np.asarray(currencies)
+    ordinals = np.fromiter((_as_date(value).toordinal() for value in dates), dtype=np.int64, count=size)
+
+    unique_codes = [str(code) for code in np.unique(codes)]
+    series = _cache.get_series(set(unique_codes + [to]) - {base_currency()})
+
+    result = np.empty(size, dtype=object)
+    # Курс to нужен только строкам в другой валюте (строки уже в to не требуют курса на свою дату)
+    converted = codes != to
+    target_rates = np.empty(size, dtype=object)
+    if converted.any():
+        target_rates[converted] = _rates_for(to, ordinals[converted], series)
+    for code in unique_codes:
+        mask = codes == code
+        if code == to:
+            result[mask] = values[mask]
+        else:
+            result[mask] = values[mask] * _rates_for(code, ordinals[mask], series) / target_rates[mask]
+    return _quantize_amounts(result)
+
+
+def convert_total(rows: Iterable[dict], *, to: str, on: date | datetime, amount_key: str = "amount") -> Decimal:
+    """
+    Сумма строк итогов вида {"currency": ..., amount_key: ...} в валюте to по курсу на дату
+    """
+    total = Decimal(0)
+    for row in rows:
+        total += convert(Decimal(row[amount_key]), row["currency"], to, on=on)
+    return total.quantize(_AMOUNT_QUANT)
+
+
+def iter_rate_rows(stream: IO[str], fmt: str) -> Iterator[dict]:
+    """
+    Строки курсов из файла: CSV с заголовком date,currency,rate или JSON-массив объектов
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    elif fmt == "json":
+        yield from json.load(stream)
+    else:
+        raise ValueError(f"Неподдерживаемый формат курсов: {fmt}")
+
+
+def load_rates(rows: Iterable[dict], *, batch_size: int = 1000) -> int:
+    """
+    Загрузка курсов пачками (upsert по currency + date). Возвращает количество записанных строк
+    (повторы currency + date внутри пачки схлопываются, действует последний).
+    """
+    rows = iter(rows)
+    loaded = 0
+    while batch := list(islice(rows, batch_size)):
+        rates = [FxRate(date=date.fromisoformat(str(row["date"])), currency=str(row["currency"]).upper(),
+                        rate=Decimal(str(row["rate"])))
+                 for row in batch]
+        unknown = invalid_currencies(rate.currency for rate in rates)
+        if unknown:
+            raise ValueError(f"Неизвестные валюты: {', '.join(sorted(unknown))}")
+        if any(rate.rate <= 0 for rate in rates):
+            raise ValueError("Курс должен быть больше 0")
+        # Повтор (currency, date) в пачке: ON CONFLICT не обновляет строку дважды — берется последний
+        rates = list({(rate.currency, rate.date): rate for rate in rates}.values())
+        with transaction.atomic():
+            FxRate.objects.bulk_create(rates, update_conflicts=True, unique_fields=["currency", "date"],
+                                       update_fields=["rate"])
+        loaded += len(rates)
+
+    invalidate_fx_cache()
+    return loaded
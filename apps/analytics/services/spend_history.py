@@ -0,0 +1,197 @@
+"""
+Spend history service
+
+Функционал:
+- фактические списания подписок за произвольный период [date_from, date_to)
+- серия списаний строится по версиям расписания (BillingSchedule: актуальное и исторические)
+- цена каждого списания — из интервалов PriceHistory, слиянием двух отсортированных
+  последовательностей (sweep-line), без поиска цены на каждое списание
+- потоковый вывод (iter_charges) и итоги по группам (подписка/категория/провайдер) и валютам
+
+Версия расписания действует с момента создания (create_at) до создания следующей версии;
+первое списание версии считается как calculate_next_run_at(schedule, from_dt=create_at) —
+так же, как при создании подписки. Подписка с ended_at не списывается после конца этого дня.
+"""
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import islice
+from typing import Iterator, Optional, Sequence
+
+from django.utils import timezone
+
+from apps.analytics.services.fx import convert_many
+from apps.subscriptions.models import BillingSchedule, PriceHistory, Subscription
+from apps.subscriptions.services.billing_service import calculate_catch_up, calculate_next_run_at
+from apps.subscriptions.services.pricing_service import price_intervals, prices_for_moments
+
+from utils.date_calculator import get_tzinfo
+
+# Группировки отчета -> поле Charge
+GROUP_BY_FIELDS = {
+    "subscription": "subscription_id",
+    "category": "category_id",
+    "provider": "provider_id",
+}
+_ONE_US = timedelta(microseconds=1)
+
+
+@dataclass(frozen=True)
+class Charge:
+    """
+    Одно фактическое списание подписки
+    """
+    subscription_id: int
+    user_id: int
+    category_id: Optional[int]
+    provider_id: Optional[int]
+    occurs_at: datetime
+    amount: Decimal
+    currency: str
+
+
+def _subscription_end(sub: Subscription, tzone) -> Optional[datetime]:
+    """
+    Граница списаний по ended_at (конец дня окончания, локальное время подписки)
+    """
+    if sub.ended_at is None:
+        return None
+    return timezone.make_aware(datetime.combine(sub.ended_at + timedelta(days=1), time.min), tzone)
+
+
+def _version_occurrences(schedule: BillingSchedule, *, start: datetime, end: Optional[datetime],
+                         date_from: datetime, date_to: datetime, tzone) -> Iterator[datetime]:
+    """
+    Списания одной версии расписания на [date_from, date_to) ∩ [start, end).
+
+    Перемотка к date_from — за O(1) через calculate_catch_up (без прохода по всем периодам с начала).
+    """
+    until = date_to if end is None else min(date_to, end)
+    current = calculate_next_run_at(schedule, from_dt=start, tzone=tzone)
+    if current < date_from:
+        series = copy.copy(schedule)
+        series.next_run_at = current
+        current = calculate_catch_up(series, now=date_from - _ONE_US).next_run_at
+
+    while current < until:
+        yield current
+        current = calculate_next_run_at(schedule, from_dt=current, tzone=tzone)
+
+
+def _subscription_occurrences(sub: Subscription, versions: Sequence[BillingSchedule], *,
+                              date_from: datetime, date_to: datetime) -> list[datetime]:
+    """
+    Списания подписки по всем версиям расписания (по возрастанию)
+    """
+    tzone = get_tzinfo(sub)
+    sub_end = _subscription_end(sub, tzone)
+    result = []
+    for i, schedule in enumerate(versions):
+        end = versions[i + 1].create_at if i + 1 < len(versions) else None
+        if sub_end is not None:
+            end = sub_end if end is None else min(end, sub_end)
+        if end is not None and end <= schedule.create_at:
+            continue
+        result.extend(_version_occurrences(schedule, start=schedule.create_at, end=end,
+                                           date_from=date_from, date_to=date_to, tzone=tzone))
+    return result
+
+
+def _merge_prices(sub: Subscription, occurrences: list[datetime],
+                  prices: list[PriceHistory]) -> Iterator[Charge]:
+    """
+    Цены списаний — sweep-line по интервалам (prices_for_moments); без истории — текущая цена подписки
+    """
+    for occurs_at, price in zip(occurrences, prices_for_moments(occurrences, prices)):
+        if price is not None:
+            amount, currency = price.amount, price.currency
+        else:
+            amount, currency = sub.current_price_amount, sub.current_price_currency
+        yield Charge(subscription_id=sub.pk, user_id=sub.user_id, category_id=sub.category_id,
+                     provider_id=sub.provider_id, occurs_at=occurs_at, amount=amount, currency=currency)
+
+
+def iter_charges(*, date_from: datetime, date_to: datetime, user=None, subscription_ids=None,
+                 now: Optional[datetime] = None, chunk_size: int = 500) -> Iterator[Charge]:
+    """
+    Потоковый расчет фактических списаний за [date_from, date_to).
+
+    user=None — по всем пользователям (годовой отчет по всей базе).
+    Подписки обходятся keyset-чанками по id: 3 запроса на чанк (подписки, расписания, цены),
+    память ограничена размером чанка. date_to ограничивается текущим моментом (только прошедшие списания).
+    """
+    now = now or timezone.now()
+    date_to = min(date_to, now)
+    if date_to <= date_from:
+        return
+
+    subs = Subscription.objects.filter(create_at__lt=date_to)
+    if user is not None:
+        subs = subs.filter(user=user)
+    if subscription_ids is not None:
+        subs = subs.filter(pk__in=list(subscription_ids))
+
+    last_id = 0
+    while True:
+        chunk = list(subs.filter(pk__gt=last_id).order_by("pk")[:chunk_size])
+        if not chunk:
+            return
+        last_id = chunk[-1].pk
+        sub_ids = [sub.pk for sub in chunk]
+
+        versions: dict[int, list[BillingSchedule]] = {}
+        for schedule in BillingSchedule.objects.filter(subscription_id__in=sub_ids,
+                                                       create_at__lt=date_to).order_by("create_at", "id"):
+            versions.setdefault(schedule.subscription_id, []).append(schedule)
+
+        prices: dict[int, list[PriceHistory]] = {}
+        for price in price_intervals(sub_ids, date_from=date_from, date_to=date_to):
+            prices.setdefault(price.subscription_id, []).append(price)
+
+        for sub in chunk:
+            sub_versions = versions.get(sub.pk)
+            if not sub_versions:
+                continue
+            for schedule in sub_versions:
+                # calculate_next_run_at берет timezone из подписки — без дополнительных запросов
+                schedule.subscription = sub
+            occurrences = _subscription_occurrences(sub, sub_versions, date_from=date_from, date_to=date_to)
+            yield from _merge_prices(sub, occurrences, prices.get(sub.pk, []))
+
+
+def spend_history(*, date_from: datetime, date_to: datetime, group_by: str = "category", user=None,
+                  currency: Optional[str] = None, now: Optional[datetime] = None,
+                  chunk_size: int = 500) -> list[dict]:
+    """
+    Итоги фактических списаний за период по группе и валюте:
+    [{"group": id | None, "currency": "USD", "amount": Decimal, "count": int}, ...]
+
+    currency — пересчитать все списания в одну валюту (по курсу FxRate на дату каждого списания,
+    векторно по пачкам из chunk_size списаний: память не растет с длиной периода и числом подписок).
+    """
+    if group_by not in GROUP_BY_FIELDS:
+        raise ValueError(f"Группировка не поддерживается: {group_by}")
+    field = GROUP_BY_FIELDS[group_by]
+    charges = iter_charges(date_from=date_from, date_to=date_to, user=user, now=now, chunk_size=chunk_size)
+
+    totals: dict[tuple, list] = {}
+    if currency is None:
+        for charge in charges:
+            total = totals.setdefault((getattr(charge, field), charge.currency), [Decimal(0), 0])
+            total[0] += charge.amount
+            total[1] += 1
+    else:
+        while batch := list(islice(charges, chunk_size)):
+            converted = convert_many([charge.amount for charge in batch], [charge.currency for charge in batch],
+                                     [charge.occurs_at for charge in batch], to=currency)
+            for charge, amount in zip(batch, converted):
+                total = totals.setdefault((getattr(charge, field), currency), [Decimal(0), 0])
+                total[0] += amount
+                total[1] += 1
+
+    return [{"group": group, "currency": code, "amount": amount.quantize(Decimal("0.01")), "count": count}
+            for (group, code), (amount, count)
+            in sorted(totals.items(), key=lambda item: (item[0][1], item[0][0] is None, item[0][0] or 0))]
@@ -0,0 +1,18 @@
+"""
+Сигналы приложения analytics
+
+- перенос агрегатов расходов удаляемой категории в группу "без категории"
+"""
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from apps.analytics.services.aggregations import merge_category_spend
+from apps.subscriptions.models import Category
+
+
+@receiver(pre_delete, sender=Category, dispatch_uid="analytics_merge_category_spend")
+def merge_deleted_category_spend(sender, instance, **kwargs):
+    """
+    До SET_NULL: строки агрегата сливаются с существующей NULL-группой (уникальность user + category + currency)
+    """
+    merge_category_spend(instance.pk)
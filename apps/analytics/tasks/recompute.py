@@ -0,0 +1,23 @@
+from django.contrib.auth import get_user_model
+
+from apps.analytics.services.aggregations import rebuild_user_spend
+
+User = get_user_model()
+
+
+def recompute_spend_aggregates(batch_size: int = 500) -> int:
+    """
+    Полный пересчет MonthlySpend по всем пользователям (пачками по batch_size)
+
+    Нужен для первичного заполнения и восстановления после обхода сервисного слоя.
+    В штатном режиме агрегаты поддерживаются инкрементально.
+    """
+    processed = 0
+    last_id = 0
+    while True:
+        user_ids = list(User.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not user_ids:
+            break
+        processed += rebuild_user_spend(user_ids)
+        last_id = user_ids[-1]
+    return processed
@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from apps.subscriptions.models import Category
+from apps.subscriptions.services.subscription_service import (PriceInput, ScheduleInput,
+    create_subscription_with_defaults,
+)
+
+from utils.enums import PeriodUnit
+
+User = get_user_model()
+
+
+@pytest.fixture()
+def user(db):
+    """
+    Тестовый пользователь для аналитики
+    """
+    return User.objects.create_user(email="analytics_user@test.com", username="analytics_user",
+                                    password="StrongTestPass123!")
+
+
+@pytest.fixture()
+def category(db):
+    """
+    Тестовая категория
+    """
+    return Category.objects.create(name="Video", slug="video")
+
+
+@pytest.fixture()
+def create_subscription(user):
+    """
+    Создание подписки через сервисный слой:
+    subX = create_subscription(amount=Decimal("120.00"), period_unit=PeriodUnit.YEAR)
+    """
+    def _create_subscription(*, amount: Decimal = Decimal("10.00"), currency: str = "USD",
+                             period_unit: str = PeriodUnit.MONTH, period_interval: int = 1, **kwargs):
+        return create_subscription_with_defaults(user=kwargs.pop("owner", user),
+                                                 title=kwargs.pop("title", "Test subscription"),
+                                                 price=PriceInput(amount=amount, currency=currency),
+                                                 schedule=ScheduleInput(period_unit=period_unit,
+                                                                        period_interval=period_interval,
+                                                                        anchor_day=1, anchor_weekday=0),
+                                                 **kwargs)
+    return _create_subscription
@@ -0,0 +1,111 @@
+from decimal import Decimal
+
+import pytest
+from rest_framework.test import APIClient
+
+from apps.analytics.models import MonthlySpend
+from apps.analytics.services.aggregations import monthly_amount, rebuild_user_spend, user_spend_summary
+from apps.subscriptions.services.subscription_service import change_subscription_status, set_subscription_price
+
+from utils.enums import PeriodUnit, Status
+
+
+def _summary(user):
+    summary = user_spend_summary(user)
+    totals = {row["currency"]: row["monthly_amount"] for row in summary["totals"]}
+    groups = {(row.currency, row.category_id): row.monthly_amount for row in summary["by_category"]}
+    return totals, groups
+
+
+def test_monthly_amount_normalization():
+    """
+    Нормализация цены к месяцу по PeriodUnit
+    """
+    assert monthly_amount(Decimal("120.00"), PeriodUnit.YEAR, 1) == Decimal("10.0000")
+    assert monthly_amount(Decimal("30.00"), PeriodUnit.MONTH, 3) == Decimal("10.0000")
+    assert monthly_amount(Decimal("7.00"), PeriodUnit.WEEK, 1) == Decimal("30.4375")
+    assert monthly_amount(Decimal("1.00"), PeriodUnit.DAY, 2) == Decimal("15.2188")
+
+
+@pytest.mark.django_db
+def test_spend_updated_incrementally(user, category, create_subscription):
+    """
+    Создание, смена цены и статуса меняют агрегат дельтой
+    """
+    video = create_subscription(amount=Decimal("12.00"), category=category)
+    create_subscription(amount=Decimal("120.00"), period_unit=PeriodUnit.YEAR)
+    create_subscription(amount=Decimal("5.00"), currency="EUR")
+
+    totals, groups = _summary(user)
+    assert totals == {"EUR": Decimal("5.0000"), "USD": Decimal("22.0000")}
+    assert groups[("USD", category.pk)] == Decimal("12.0000")
+    assert groups[("USD", None)] == Decimal("10.0000")
+
+    set_subscription_price(subscription=video, amount=Decimal("15.00"), currency="USD")
+    totals, _ = _summary(user)
+    assert totals["USD"] == Decimal("25.0000")
+
+    change_subscription_status(subscription=video, status=Status.PAUSED)
+    totals, groups = _summary(user)
+    assert totals["USD"] == Decimal("10.0000")
+    assert ("USD", category.pk) not in groups
+
+    change_subscription_status(subscription=video, status=Status.ACTIVE)
+    totals, _ = _summary(user)
+    assert totals["USD"] == Decimal("25.0000")
+
+
+@pytest.mark.django_db
+def test_rebuild_matches_incremental(user, category, create_subscription):
+    """
+    Полный пересчет дает тот же результат, что и инкрементальное обновление
+    """
+    sub = create_subscription(amount=Decimal("9.99"), category=category, period_unit=PeriodUnit.WEEK)
+    create_subscription(amount=Decimal("3.00"), period_unit=PeriodUnit.DAY, period_interval=3)
+    set_subscription_price(subscription=sub, amount=Decimal("8.49"), currency="EUR")
+    incremental = _summary(user)
+
+    assert rebuild_user_spend([user.pk]) == 2
+    assert _summary(user) == incremental
+
+
+@pytest.mark.django_db
+def test_category_delete_moves_spend_to_no_category(user, category, create_subscription):
+    """
+    Удаление категории: агрегат сливается в группу "без категории" (как подписки и вклады), дельты не расходятся
+    """
+    video = create_subscription(amount=Decimal("12.00"), category=category)
+    create_subscription(amount=Decimal("10.00"))
+
+    category.delete()
+
+    totals, groups = _summary(user)
+    assert totals == {"USD": Decimal("22.0000")}
+    assert groups == {("USD", None): Decimal("22.0000")}
+
+    # Следующая дельта вычитает вклад из той же группы, куда он перенесен
+    video.refresh_from_db()
+    set_subscription_price(subscription=video, amount=Decimal("15.00"), currency="USD")
+    change_subscription_status(subscription=video, status=Status.PAUSED)
+    incremental = _summary(user)
+    assert incremental[0] == {"USD": Decimal("10.0000")}
+    rebuild_user_spend([user.pk])
+    assert _summary(user) == incremental
+
+
+@pytest.mark.django_db
+def test_spend_summary_endpoint(user, create_subscription):
+    """
+    GET /api/analytics/spend-summary/ и удаление подписки через API
+    """
+    sub = create_subscription(amount=Decimal("20.00"))
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get("/api/analytics/spend-summary/")
+    assert response.status_code == 200
+    assert response.data["totals"][0]["currency"] == "USD"
+    assert Decimal(response.data["totals"][0]["monthly_amount"]) == Decimal("20")
+
+    client.delete(f"/api/subscriptions/subscriptions/{sub.pk}/")
+    assert not MonthlySpend.objects.filter(user=user, subscriptions_count__gt=0).exists()
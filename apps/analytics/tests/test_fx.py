@@ -0,0 +1,125 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.analytics.models import FxRate
+from apps.analytics.services.fx import convert, convert_many, invalidate_fx_cache, load_rates
+from apps.subscriptions.services.forecast_service import upcoming_total_in
+
+RATES_CSV = """date,currency,rate
+2025-01-01,EUR,1.10
+2025-01-01,RUB,0.010
+2025-02-01,EUR,1.20
+"""
+
+
+@pytest.fixture()
+def rates(db, tmp_path):
+    invalidate_fx_cache()
+    path = tmp_path / "rates.csv"
+    path.write_text(RATES_CSV, encoding="utf-8")
+    call_command("load_fx_rates", str(path))
+    yield
+    invalidate_fx_cache()
+
+
+@pytest.mark.django_db
+def test_convert_uses_last_known_rate(rates, django_assert_num_queries):
+    """
+    Курс на дату без записи — последний известный; повторные вызовы — из кеша
+    """
+    assert FxRate.objects.count() == 3
+    assert convert(Decimal("10.00"), "EUR", "USD", on=date(2025, 1, 15)) == Decimal("11.00")
+    assert convert(Decimal("10.00"), "EUR", "USD", on=date(2025, 3, 1)) == Decimal("12.00")
+    assert convert(Decimal("11.00"), "USD", "EUR", on=date(2025, 1, 1)) == Decimal("10.00")
+    assert convert(Decimal("1100.00"), "RUB", "EUR", on=date(2025, 1, 2)) == Decimal("10.00")
+
+    with django_assert_num_queries(0):
+        assert convert(Decimal("10.00"), "EUR", "USD", on=date(2025, 1, 20)) == Decimal("11.00")
+        assert convert(Decimal("5.00"), "USD", "USD", on=date(2020, 1, 1)) == Decimal("5.00")
+
+    with pytest.raises(ValueError):
+        convert(Decimal("1.00"), "EUR", "USD", on=date(2024, 12, 31))
+
+
+@pytest.mark.django_db
+def test_convert_many_matches_scalar(rates, django_assert_max_num_queries):
+    """
+    Векторная конвертация совпадает с поштучной (Decimal, без ошибки float в сумме)
+    """
+    amounts = [Decimal("10.00"), Decimal("1000.00"), Decimal("3.50"), Decimal("7.00")]
+    currencies = ["EUR", "RUB", "USD", "EUR"]
+    dates = [date(2025, 1, 10), date(2025, 2, 10), date(2025, 1, 1), date(2025, 2, 1)]
+
+    with django_assert_max_num_queries(1):
+        result = convert_many(amounts, currencies, dates, to="EUR")
+
+    expected = [convert(a, c, "EUR", on=d) for a, c, d in zip(amounts, currencies, dates)]
+    assert list(result) == expected
+    assert convert_many([], [], [], to="USD").size == 0
+    # 0.1 + 0.2 в float64 дает 0.30000000000000004 — суммы остаются точными
+    assert convert_many([Decimal("0.10")] * 3 + [Decimal("0.20")], ["USD"] * 4, dates, to="USD").sum() == \
+           Decimal("0.50")
+
+
+@pytest.mark.django_db
+def test_convert_many_skips_target_rate_for_same_currency(rates):
+    """
+    Строки уже в валюте отчета не требуют курса: даты раньше первого курса EUR не ошибка
+    """
+    dates = [date(2024, 6, 1), date(2024, 12, 31)]
+    result = convert_many([Decimal("4.00"), Decimal("6.00")], ["EUR", "EUR"], dates, to="EUR")
+    assert list(result) == [Decimal("4.00"), Decimal("6.00")]
+
+    with pytest.raises(ValueError, match="Нет курса EUR"):
+        convert_many([Decimal("4.00"), Decimal("1.00")], ["EUR", "USD"], dates, to="EUR")
+
+
+@pytest.mark.django_db
+def test_load_rates_upserts(rates):
+    """
+    Повторная загрузка обновляет курс на ту же дату
+    """
+    load_rates([{"date": "2025-01-01", "currency": "eur", "rate": "1.15"}])
+    assert FxRate.objects.get(currency="EUR", date=date(2025, 1, 1)).rate == Decimal("1.15")
+    assert convert(Decimal("100.00"), "EUR", "USD", on=date(2025, 1, 2)) == Decimal("115.00")
+
+    # Повтор (currency, date) в одной пачке — действует последняя строка, без ошибки ON CONFLICT
+    assert load_rates([{"date": "2025-03-01", "currency": "EUR", "rate": "1.30"},
+                       {"date": "2025-03-01", "currency": "eur", "rate": "1.25"}]) == 1
+    assert FxRate.objects.get(currency="EUR", date=date(2025, 3, 1)).rate == Decimal("1.25")
+
+    with pytest.raises(ValueError):
+        load_rates([{"date": "2025-01-01", "currency": "XXQ", "rate": "1"}])
+
+
+@pytest.mark.django_db
+def test_reports_in_base_currency(user, rates, create_subscription):
+    """
+    Сводка и прогноз в одной валюте (?currency=)
+    """
+    FxRate.objects.create(date=timezone.localdate() - timedelta(days=1), currency="EUR", rate=Decimal("2"))
+    invalidate_fx_cache()
+    create_subscription(amount=Decimal("10.00"), currency="EUR")
+    create_subscription(amount=Decimal("5.00"), currency="USD")
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get("/api/analytics/spend-summary/", {"currency": "USD"})
+    assert response.status_code == 200
+    assert response.data["total"] == {"currency": "USD", "monthly_amount": Decimal("25.00")}
+
+    now = timezone.now()
+    assert upcoming_total_in(user, date_from=now, date_to=now + timedelta(days=365), currency="USD") == \
+           Decimal("300.00")
+
+    response = client.get("/api/subscriptions/forecast/", {"days": 365, "currency": "EUR"})
+    assert response.status_code == 200
+    assert response.data["total"] == {"currency": "EUR", "amount": Decimal("150.00")}
+
+    assert client.get("/api/analytics/spend-summary/", {"currency": "RUB"}).status_code == 200
+    assert client.get("/api/analytics/spend-summary/", {"currency": "JPY"}).status_code == 400
@@ -0,0 +1,128 @@
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+from rest_framework.test import APIClient
+
+from apps.analytics.models import FxRate
+from apps.analytics.services import spend_history as spend_history_module
+from apps.analytics.services.fx import convert_many, invalidate_fx_cache
+from apps.analytics.services.spend_history import iter_charges, spend_history
+from apps.subscriptions.models import BillingSchedule, PriceHistory
+from apps.subscriptions.services.subscription_service import set_subscription_price
+
+from utils.enums import PeriodUnit
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+@pytest.fixture()
+def history(user, category, create_subscription):
+    """
+    music: 10 USD с 2025-01-10 (каждое 1-е число), 12 USD с 2025-04-15,
+           с 2025-06-20 новая версия расписания — каждое 15-е число
+    storage: 50 EUR в год с 2024-03-01, ended_at 2025-03-05
+    """
+    music = create_subscription(title="music", amount=Decimal("10.00"), category=category)
+    music.__class__.objects.filter(pk=music.pk).update(create_at=_utc(2025, 1, 10, 6))
+    BillingSchedule.objects.filter(subscription=music).update(create_at=_utc(2025, 1, 10, 6))
+    PriceHistory.objects.filter(subscription=music).update(effective_from=_utc(2025, 1, 10, 6))
+    set_subscription_price(subscription=music, amount=Decimal("12.00"), currency="USD",
+                           effective_from=_utc(2025, 4, 15))
+    BillingSchedule.objects.filter(subscription=music).update(is_current=False)
+    v2 = BillingSchedule.objects.create(subscription=music, period_unit=PeriodUnit.MONTH, anchor_day=15,
+                                        next_run_at=_utc(2025, 7, 15), is_current=True)
+    BillingSchedule.objects.filter(pk=v2.pk).update(create_at=_utc(2025, 6, 20))
+
+    storage = create_subscription(title="storage", amount=Decimal("50.00"), currency="EUR",
+                                  period_unit=PeriodUnit.YEAR, ended_at=date(2025, 3, 5))
+    storage.__class__.objects.filter(pk=storage.pk).update(create_at=_utc(2024, 3, 1, 6))
+    BillingSchedule.objects.filter(subscription=storage).update(create_at=_utc(2024, 3, 1, 6))
+    PriceHistory.objects.filter(subscription=storage).update(effective_from=_utc(2024, 3, 1, 6))
+    return music, storage
+
+
+@pytest.mark.django_db
+def test_charges_follow_schedule_versions_and_prices(history):
+    """
+    Списания идут по версиям расписания, цена — по интервалам PriceHistory
+    """
+    music, storage = history
+
+    charges = list(iter_charges(date_from=_utc(2025, 1, 1), date_to=_utc(2026, 1, 1), now=_utc(2026, 1, 1)))
+    music_charges = [(c.occurs_at.astimezone(dt_timezone.utc).date(), c.amount)
+                     for c in charges if c.subscription_id == music.pk]
+
+    assert [d.day for d, _ in music_charges] == [1] * 5 + [15] * 6
+    assert [d.month for d, _ in music_charges] == [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12]
+    assert [amount for _, amount in music_charges] == [Decimal("10.00")] * 3 + [Decimal("12.00")] * 8
+
+    storage_charges = [c for c in charges if c.subscription_id == storage.pk]
+    assert [(c.occurs_at.date(), c.amount, c.currency) for c in storage_charges] == \
+           [(date(2025, 3, 1), Decimal("50.00"), "EUR")]
+
+
+@pytest.mark.django_db
+def test_grouped_totals(history, category, django_assert_max_num_queries):
+    """
+    Итоги по категории и валюте; запросы — на чанк, а не на подписку/списание
+    """
+    with django_assert_max_num_queries(4):
+        rows = spend_history(date_from=_utc(2025, 1, 1), date_to=_utc(2026, 1, 1), group_by="category",
+                             now=_utc(2026, 1, 1))
+
+    assert rows == [
+        {"group": None, "currency": "EUR", "amount": Decimal("50.00"), "count": 1},
+        {"group": category.pk, "currency": "USD", "amount": Decimal("126.00"), "count": 11},
+    ]
+
+    # Окно внутри периода: только списания в [date_from, date_to)
+    rows = spend_history(date_from=_utc(2025, 4, 1), date_to=_utc(2025, 8, 1), group_by="subscription",
+                         now=_utc(2026, 1, 1))
+    assert [(row["amount"], row["count"]) for row in rows] == [(Decimal("46.00"), 4)]
+
+
+@pytest.mark.django_db
+def test_converted_totals_by_batches(history, category, monkeypatch):
+    """
+    Пересчет в одну валюту — пачками по chunk_size списаний, а не одним массивом за весь период
+    """
+    FxRate.objects.create(date=date(2024, 1, 1), currency="EUR", rate=Decimal("1.10"))
+    invalidate_fx_cache()
+    batches = []
+
+    def recording_convert_many(amounts, *args, **kwargs):
+        batches.append(len(amounts))
+        return convert_many(amounts, *args, **kwargs)
+
+    monkeypatch.setattr(spend_history_module, "convert_many", recording_convert_many)
+    rows = spend_history(date_from=_utc(2025, 1, 1), date_to=_utc(2026, 1, 1), group_by="category",
+                         currency="USD", now=_utc(2026, 1, 1), chunk_size=4)
+    invalidate_fx_cache()
+
+    assert rows == [
+        {"group": category.pk, "currency": "USD", "amount": Decimal("126.00"), "count": 11},
+        {"group": None, "currency": "USD", "amount": Decimal("55.00"), "count": 1},
+    ]
+    assert sum(batches) == 12 and max(batches) <= 4
+
+
+@pytest.mark.django_db
+def test_spend_history_endpoint(user, history):
+    """
+    GET /api/analytics/spend-history/ — только прошедшие списания текущего пользователя
+    """
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get("/api/analytics/spend-history/", {"date_from": "2025-01-01T00:00:00Z",
+                                                            "date_to": "2025-03-02T00:00:00Z",
+                                                            "group_by": "provider"})
+
+    assert response.status_code == 200
+    assert response.data["rows"] == [{"group": None, "currency": "EUR", "amount": "50.00", "count": 1},
+                                     {"group": None, "currency": "USD", "amount": "20.00", "count": 2}]
+    assert client.get("/api/analytics/spend-history/", {"date_from": "2025-01-01T00:00:00Z",
+                                                        "date_to": "2024-01-01T00:00:00Z"}).status_code == 400
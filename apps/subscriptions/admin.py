@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Subscription, Provider, ProviderLink, Category, BillingSchedule, PriceHistory
+from .models import (Subscription, Provider, ProviderLink, Category, BillingSchedule, PriceHistory, BillingOccurrence,
+                     VerifiedPrice, BillingEvent)
 
 # Register your models here.
 @admin.register(Subscription)
@@ -52,6 +53,18 @@ class BillingScheduleAdmin(admin.ModelAdmin):
     search_fields = ('subscription__title',)
     list_filter = ('period_unit', 'is_current',)
 
+@admin.register(VerifiedPrice)
+class VerifiedPriceAdmin(admin.ModelAdmin):
+    """
+    Админка справочника подтвержденных цен (распространение — propagate_verified_price)
+    """
+    list_display = ('id', 'provider', 'plan', 'region', 'platform', 'period_unit', 'period_interval',
+                    'amount', 'currency', 'valid_from', 'valid_to')
+    readonly_fields = ('create_at',)
+    search_fields = ('provider__name', 'plan',)
+    list_filter = ('currency', 'platform', 'region', 'period_unit',)
+    autocomplete_fields = ('provider',)
+
 @admin.register(PriceHistory)
 class PriceHistoryAdmin(admin.ModelAdmin):
     """
@@ -61,3 +74,23 @@ class PriceHistoryAdmin(admin.ModelAdmin):
     readonly_fields = ('create_at',)
     search_fields = ('subscription__title',)
     list_filter = ('source', 'currency',)
+
+@admin.register(BillingOccurrence)
+class BillingOccurrenceAdmin(admin.ModelAdmin):
+    """
+    Админка прогноза будущих списаний (только просмотр)
+    """
+    list_display = ('id', 'subscription', 'occurs_at', 'amount', 'currency')
+    readonly_fields = ('subscription', 'user', 'occurs_at', 'amount', 'currency', 'create_at')
+    search_fields = ('subscription__title',)
+    list_filter = ('currency',)
+
+@admin.register(BillingEvent)
+class BillingEventAdmin(admin.ModelAdmin):
+    """
+    Админка журнала фактических списаний (только просмотр)
+    """
+    list_display = ('id', 'subscription', 'occurrence_at', 'amount', 'currency')
+    readonly_fields = ('subscription', 'schedule', 'occurrence_at', 'amount', 'currency', 'create_at')
+    search_fields = ('subscription__title',)
+    list_filter = ('currency',)
@@ -0,0 +1,60 @@
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from utils.enums import Status
+
+
+class SubscriptionFilterSerializer(serializers.Serializer):
+    """
+    Параметры фильтрации списка подписок
+
+    - status — один или несколько статусов через запятую (индекс user + status)
+    - category — id категории
+    - next_billing_from/next_billing_to — окно даты списания [from, to) (индекс user + next_billing_at)
+    """
+    status = serializers.CharField(required=False)
+    category = serializers.IntegerField(required=False, min_value=1)
+    next_billing_from = serializers.DateTimeField(required=False)
+    next_billing_to = serializers.DateTimeField(required=False)
+
+    def validate_status(self, value):
+        statuses = [item.strip() for item in value.split(',') if item.strip()]
+        unknown = set(statuses) - set(Status.values)
+        if unknown:
+            raise serializers.ValidationError(f'Неизвестный статус: {", ".join(sorted(unknown))}')
+        return statuses
+
+    def validate(self, attrs):
+        date_from = attrs.get('next_billing_from')
+        date_to = attrs.get('next_billing_to')
+        if date_from and date_to and date_to <= date_from:
+            raise serializers.ValidationError('next_billing_to должна быть позже next_billing_from')
+        return attrs
+
+
+class SubscriptionFilterBackend(BaseFilterBackend):
+    """
+    Серверные фильтры списка подписок (только для list)
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if getattr(view, 'action', None) != 'list':
+            return queryset
+
+        params = SubscriptionFilterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+
+        if data.get('status'):
+            queryset = queryset.filter(status__in=data['status'])
+        if data.get('category'):
+            queryset = queryset.filter(category_id=data['category'])
+        if data.get('next_billing_from'):
+            queryset = queryset.filter(next_billing_at__gte=data['next_billing_from'])
+        if data.get('next_billing_to'):
+            queryset = queryset.filter(next_billing_at__lt=data['next_billing_to'])
+
+        # Cursor по nullable полю: подписки без даты списания исключаются
+        if request.query_params.get('ordering', '').lstrip('-') == 'next_billing_at':
+            queryset = queryset.filter(next_billing_at__isnull=False)
+        return queryset
@@ -0,0 +1,27 @@
+from rest_framework.pagination import CursorPagination
+
+
+class SubscriptionCursorPagination(CursorPagination):
+    """
+    Cursor-пагинация списка подписок
+
+    Сортировки совпадают с индексами:
+    - id / -id (по умолчанию) — вместе с фильтром status работает по индексу (user, status)
+    - next_billing_at / -next_billing_at — индекс (user, next_billing_at);
+      подписки без даты списания в такую выборку не попадают (см. SubscriptionFilterBackend)
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = '-id'
+
+    ordering_query_param = 'ordering'
+    ORDERINGS = {
+        'id': ('id',),
+        '-id': ('-id',),
+        'next_billing_at': ('next_billing_at', 'id'),
+        '-next_billing_at': ('-next_billing_at', '-id'),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        return self.ORDERINGS.get(request.query_params.get(self.ordering_query_param), (self.ordering,))
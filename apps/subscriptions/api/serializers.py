@@ -1,12 +1,47 @@
-from apps.subscriptions.models import Subscription
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
 
+from apps.subscriptions.models import BillingOccurrence, BillingSchedule, PriceHistory, ProviderLink, Subscription
+from apps.subscriptions.services.catalog_cache import get_provider_links
+from apps.subscriptions.services.export_service import EXPORT_FIELDS, EXPORT_FORMATS
+from apps.subscriptions.services.forecast_service import FORECAST_HORIZON_DAYS
+from apps.subscriptions.services.link_resolver import pick_best_link
+
+from utils.enums import LinkType, Platform
+from utils.validators import GLOBAL_REGION, validator_currency, validator_region
+
+class BillingScheduleSerializer(serializers.ModelSerializer):
+    """
+    Актуальное расписание подписки (только чтение)
+    """
+    class Meta:
+        model = BillingSchedule
+        fields = [
+            'period_unit',
+            'period_interval',
+            'anchor_day',
+            'anchor_weekday',
+            'trial_ends_at',
+            'grace_days',
+            'next_run_at',
+        ]
+        read_only_fields = fields
+
+
 class SubscriptionSerializer(serializers.ModelSerializer):
     """
     Сериализатор подписки
 
     next_billing_at/last_billed_at - расчетные поля, поэтому только read_only
+    current_price_* при изменении применяются во view через set_subscription_price (PriceHistory, price_version)
+    billing_link - лучшая ссылка оплаты провайдера, разрешается пакетно во view (context['billing_links'])
+    schedule - актуальное расписание (Subscription.current_schedule, JOIN во view)
     """
+    billing_link = serializers.SerializerMethodField()
+    schedule = BillingScheduleSerializer(source='current_schedule', read_only=True)
+
     class Meta:
         model = Subscription
         fields = [
@@ -23,16 +58,187 @@ class SubscriptionSerializer(serializers.ModelSerializer):
             'is_shared',              # Флаг "Делится/общая/семейная подписка"
             'current_price_amount',   # Текущая цена
             'current_price_currency', # Код валюты
+            'price_version',          # Версия цены (optimistic concurrency)
             'next_billing_at',        # Дата ближайшего списания
             'billing_timezone',       # IANA timezone
             'last_billed_at',         # Факт последнего списания
+            'billing_link',           # Ссылка управления оплатой (регион/платформа клиента)
+            'schedule',               # Актуальное расписание
             'create_at',
             'update_at',
         ]
         read_only_fields = [
             'id',
+            'price_version',
             'next_billing_at',
             'last_billed_at',
             'create_at',
             'update_at',
-        ]
\ No newline at end of file
+        ]
+
+    def update(self, instance, validated_data):
+        # Только переданные поля: полный save() затер бы цену/версию, измененные параллельно сервисным слоем
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'update_at'])
+        return instance
+
+    def get_billing_link(self, obj):
+        links = self.context.get('billing_links') or {}
+        link = links.get(obj.pk)
+        return link.url if link else None
+
+
+class ProviderLinkSerializer(serializers.ModelSerializer):
+    """
+    Ссылка провайдера (регион/платформа/тип)
+    """
+    class Meta:
+        model = ProviderLink
+        fields = [
+            'region',
+            'platform',
+            'link_type',
+            'url',
+        ]
+        read_only_fields = fields
+
+
+class SubscriptionDetailSerializer(SubscriptionSerializer):
+    """
+    Детальная карточка подписки: + активные ссылки провайдера (из кеша каталога, без запроса к БД)
+    """
+    provider_links = serializers.SerializerMethodField()
+
+    class Meta(SubscriptionSerializer.Meta):
+        fields = SubscriptionSerializer.Meta.fields + ['provider_links']
+
+    def get_provider_links(self, obj):
+        if obj.provider_id is None:
+            return []
+        return ProviderLinkSerializer(get_provider_links(obj.provider_id), many=True).data
+
+    def get_billing_link(self, obj):
+        if obj.provider_id is None:
+            return None
+        link_query = self.context.get('link_query') or {}
+        link = pick_best_link(get_provider_links(obj.provider_id, link_type=LinkType.BILLING),
+                              region=link_query.get('region', GLOBAL_REGION),
+                              platform=link_query.get('platform', Platform.WEB))
+        return link.url if link else None
+
+
+class BillingOccurrenceSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор будущего списания (прогноз)
+    """
+    subscription_title = serializers.CharField(source='subscription.title', read_only=True)
+
+    class Meta:
+        model = BillingOccurrence
+        fields = [
+            'subscription',         # Подписка
+            'subscription_title',
+            'occurs_at',            # Дата списания
+            'amount',
+            'currency',
+        ]
+        read_only_fields = fields
+
+
+class LinkQuerySerializer(serializers.Serializer):
+    """
+    Регион/платформа клиента для выбора ссылок провайдера (billing_link)
+    """
+    region = serializers.CharField(required=False, default=GLOBAL_REGION, validators=[validator_region])
+    platform = serializers.ChoiceField(choices=Platform.choices, required=False, default=Platform.WEB)
+
+
+class PriceHistorySerializer(serializers.ModelSerializer):
+    """
+    Интервал цены подписки [effective_from, effective_to)
+    """
+    class Meta:
+        model = PriceHistory
+        fields = [
+            'subscription',
+            'amount',
+            'currency',
+            'effective_from',
+            'effective_to',
+        ]
+        read_only_fields = fields
+
+
+class PriceAtQuerySerializer(serializers.Serializer):
+    """
+    Момент времени для цен подписок (по умолчанию — сейчас)
+    """
+    at = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        return {'at': attrs.get('at') or timezone.now()}
+
+
+class BulkPriceChangeSerializer(serializers.Serializer):
+    """
+    Пакетная смена цены: одна новая цена на набор подписок
+
+    expected_versions - {subscription_id: price_version}, которые видел клиент (конфликт при несовпадении)
+    """
+    subscription_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False,
+                                             max_length=10000)
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0)
+    currency = serializers.CharField(max_length=3, validators=[validator_currency])
+    effective_from = serializers.DateTimeField(required=False)
+    reason = serializers.CharField(max_length=255, required=False)
+    expected_versions = serializers.DictField(child=serializers.IntegerField(min_value=0), required=False)
+
+    def validate_expected_versions(self, value):
+        try:
+            return {int(pk): version for pk, version in value.items()}
+        except ValueError:
+            raise serializers.ValidationError('Ключи expected_versions должны быть id подписок')
+
+
+class ForecastQuerySerializer(serializers.Serializer):
+    """
+    Параметры прогноза: горизонт в днях (30/90/365) или явный интервал date_from/date_to
+    """
+    days = serializers.IntegerField(required=False, min_value=1, max_value=FORECAST_HORIZON_DAYS, default=30)
+    date_from = serializers.DateTimeField(required=False)
+    date_to = serializers.DateTimeField(required=False)
+    # Итог в одной валюте (по курсам FxRate)
+    currency = serializers.CharField(max_length=3, required=False, validators=[validator_currency])
+
+    def validate(self, attrs):
+        date_from = attrs.get('date_from') or timezone.now()
+        date_to = attrs.get('date_to') or date_from + timedelta(days=attrs['days'])
+        if date_to <= date_from:
+            raise serializers.ValidationError('date_to должна быть позже date_from')
+        return {'date_from': date_from, 'date_to': date_to, 'currency': attrs.get('currency')}
+
+
+class ImportFileSerializer(serializers.Serializer):
+    """
+    Файл импорта подписок (CSV / JSON / JSON Lines)
+    """
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=['csv', 'json', 'jsonl'], required=False)
+    batch_size = serializers.IntegerField(required=False, min_value=1, max_value=5000, default=1000)
+
+    def validate(self, attrs):
+        if not attrs.get('format'):
+            suffix = attrs['file'].name.rsplit('.', 1)[-1].lower()
+            if suffix not in ('csv', 'json', 'jsonl'):
+                raise serializers.ValidationError('Не удалось определить формат файла, укажите format')
+            attrs['format'] = suffix
+        return attrs
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    """
+    Параметры выгрузки: тип данных и формат (output, т.к. format занят DRF)
+    """
+    kind = serializers.ChoiceField(choices=list(EXPORT_FIELDS), default='subscriptions')
+    output = serializers.ChoiceField(choices=list(EXPORT_FORMATS), default='csv')
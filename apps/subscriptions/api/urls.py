@@ -1,10 +1,23 @@
 from django.urls import path, include
 from  rest_framework import routers
-from .views import SubscriptionViewSet
+from .views import (BulkPriceChangeView,
+    ForecastView,
+    PricesAtView,
+    SubscriptionExportView,
+    SubscriptionImportView,
+    SubscriptionViewSet,
+    TenantExportView,
+)
 
 routers = routers.DefaultRouter()
 routers.register(r'subscriptions', SubscriptionViewSet, basename='subscriptions')
 
 urlpatterns = [
+    path('forecast/', ForecastView.as_view(), name='subscriptions-forecast'),
+    path('prices-at/', PricesAtView.as_view(), name='subscriptions-prices-at'),
+    path('import/', SubscriptionImportView.as_view(), name='subscriptions-import'),
+    path('export/', SubscriptionExportView.as_view(), name='subscriptions-export'),
+    path('admin/export/', TenantExportView.as_view(), name='subscriptions-admin-export'),
+    path('admin/bulk-price/', BulkPriceChangeView.as_view(), name='subscriptions-admin-bulk-price'),
     path('', include(routers.urls)),
-]
\ No newline at end of file
+]
@@ -1,7 +1,53 @@
-from rest_framework.permissions import IsAuthenticated
+import io
+
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
-from .serializers import SubscriptionSerializer
+from .filters import SubscriptionFilterBackend
+from .pagination import SubscriptionCursorPagination
+from .serializers import (BillingOccurrenceSerializer,
+    BulkPriceChangeSerializer,
+    ExportQuerySerializer,
+    ForecastQuerySerializer,
+    ImportFileSerializer,
+    LinkQuerySerializer,
+    PriceAtQuerySerializer,
+    PriceHistorySerializer,
+    SubscriptionDetailSerializer,
+    SubscriptionSerializer,
+)
+from apps.analytics.services.aggregations import apply_subscription_spend, discard_subscription_spend
 from apps.subscriptions.models import Subscription
+from apps.subscriptions.services.export_service import export_filename, stream_export
+from apps.subscriptions.services.forecast_service import (refresh_subscription_occurrences,
+    upcoming_occurrences,
+    upcoming_total_in,
+    upcoming_totals,
+)
+from apps.subscriptions.services.import_service import import_subscriptions, open_rows
+from apps.subscriptions.services.link_resolver import resolve_subscription_links
+from apps.subscriptions.services.pricing_service import user_prices_at
+from apps.subscriptions.services.subscription_service import (PriceInput,
+    PriceVersionConflict,
+    bulk_change_price,
+    change_subscription_status,
+    set_subscription_price,
+)
+
+from utils.enums import Source
+
+
+class PriceConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Цена подписки изменена параллельно, обновите данные и повторите'
+    default_code = 'price_conflict'
+
 
 class SubscriptionViewSet(ModelViewSet):
     """
@@ -10,12 +56,207 @@ class SubscriptionViewSet(ModelViewSet):
     Важно:
     - queryset ограничен текущим пользователем
     - создание привязывается к request.user
+    - список: cursor-пагинация и фильтры status/category/next_billing_from/next_billing_to
+    - billing_link выбирается по ?region=&platform= (для страницы списка — одним запросом)
     """
     permission_classes = [IsAuthenticated]
     serializer_class = SubscriptionSerializer
+    pagination_class = SubscriptionCursorPagination
+    filter_backends = [SubscriptionFilterBackend]
 
     def get_queryset(self):
-        return Subscription.objects.filter(user=self.request.user).select_related('provider', 'category')
+        return (Subscription.objects.filter(user=self.request.user)
+                .select_related('provider', 'category', 'current_schedule'))
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return SubscriptionDetailSerializer
+        return super().get_serializer_class()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve'):
+            link_query = LinkQuerySerializer(data=self.request.query_params)
+            link_query.is_valid(raise_exception=True)
+            context['link_query'] = link_query.validated_data
+        return context
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        context = self.get_serializer_context()
+        context['billing_links'] = resolve_subscription_links(page, **context['link_query'])
+        serializer = self.get_serializer(page, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
\ No newline at end of file
+        serializer.save(user=self.request.user)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        data = serializer.validated_data
+        sub = serializer.instance
+        amount = data.pop('current_price_amount', sub.current_price_amount)
+        currency = data.pop('current_price_currency', sub.current_price_currency)
+        new_status = data.pop('status', sub.status)
+        sub = serializer.save()
+
+        # Цена и статус — только через сервисный слой (PriceHistory/price_version, события outbox,
+        # прогноз и агрегаты расходов пересчитываются внутри)
+        price_changed = (amount, currency) != (sub.current_price_amount, sub.current_price_currency)
+        if price_changed:
+            try:
+                set_subscription_price(subscription=sub, amount=amount, currency=currency, reason='api')
+            except PriceVersionConflict:
+                raise PriceConflict()
+            except ValueError as e:
+                raise ValidationError({'current_price_amount': str(e)})
+        if new_status != sub.status:
+            change_subscription_status(subscription=sub, status=new_status)
+        elif not price_changed:
+            # Категория/даты могли измениться — пересобираем прогноз и агрегаты расходов
+            refresh_subscription_occurrences(sub)
+            apply_subscription_spend(sub)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        discard_subscription_spend(instance)
+        instance.delete()
+
+
+class ForecastView(APIView):
+    """
+    Прогноз будущих списаний пользователя ("сколько я заплачу за 30/90/365 дней")
+
+    Читает материализованную таблицу BillingOccurrence (range-запрос по user + occurs_at).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = ForecastQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        date_from = query.validated_data['date_from']
+        date_to = query.validated_data['date_to']
+
+        currency = query.validated_data['currency']
+
+        occurrences = upcoming_occurrences(request.user, date_from=date_from, date_to=date_to)
+        data = {
+            'date_from': date_from,
+            'date_to': date_to,
+            'totals': upcoming_totals(request.user, date_from=date_from, date_to=date_to),
+            'occurrences': BillingOccurrenceSerializer(occurrences, many=True).data,
+        }
+        if currency:
+            try:
+                amount = upcoming_total_in(request.user, date_from=date_from, date_to=date_to, currency=currency)
+            except ValueError as e:
+                return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            data['total'] = {'currency': currency, 'amount': amount}
+        return Response(data)
+
+
+class PricesAtView(APIView):
+    """
+    Цены всех подписок пользователя на момент ?at= (одним запросом по интервальному индексу)
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = PriceAtQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        at = query.validated_data['at']
+
+        prices = sorted(user_prices_at(request.user, at).values(), key=lambda price: price.subscription_id)
+        return Response({'at': at, 'prices': PriceHistorySerializer(prices, many=True).data})
+
+
+class BulkPriceChangeView(APIView):
+    """
+    Пакетная смена цены (изменение тарифа провайдера) — только для администраторов
+
+    Без блокировок строк: подписки, цена которых изменилась параллельно, возвращаются в conflicts.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        params = BulkPriceChangeSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+
+        result = bulk_change_price(data['subscription_ids'],
+                                   price=PriceInput(amount=data['amount'], currency=data['currency'],
+                                                    effective_from=data.get('effective_from'),
+                                                    reason=data.get('reason'), source=Source.INTEGRATION),
+                                   expected_versions=data.get('expected_versions'))
+        return Response({
+            'updated': len(result.updated),
+            'conflicts': result.conflicts,
+            'rejected': result.rejected,
+        })
+
+
+class SubscriptionImportView(APIView):
+    """
+    Импорт подписок текущего пользователя из файла (CSV / JSON / JSON Lines)
+
+    Файл читается потоково, подписки создаются пачками (см. services/import_service.py).
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        params = ImportFileSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        upload = params.validated_data['file']
+
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            result = import_subscriptions(request.user, open_rows(stream, params.validated_data['format']),
+                                          batch_size=params.validated_data['batch_size'])
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'created': result.created,
+            'failed': result.failed,
+            'errors': [{'row': row, 'errors': errors} for row, errors in result.errors],
+        }, status=status.HTTP_201_CREATED if result.created else status.HTTP_200_OK)
+
+
+_EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class SubscriptionExportView(APIView):
+    """
+    Потоковая выгрузка данных текущего пользователя (подписки/история цен/расписания)
+
+    ?kind=subscriptions|price_history|schedules&output=csv|ndjson
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_export_user(self, request):
+        return request.user
+
+    def get(self, request):
+        params = ExportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        kind = params.validated_data['kind']
+        fmt = params.validated_data['output']
+        user = self.get_export_user(request)
+
+        response = StreamingHttpResponse(stream_export(kind, fmt, user=user), content_type=_EXPORT_CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(kind, fmt, user)}"'
+        return response
+
+
+class TenantExportView(SubscriptionExportView):
+    """
+    Полная выгрузка по всем пользователям (compliance) — только для администраторов
+    """
+    permission_classes = [IsAdminUser]
+
+    def get_export_user(self, request):
+        return None
@@ -6,3 +6,6 @@ class SubscriptionsConfig(AppConfig):
     name = 'apps.subscriptions'
     verbose_name = 'Subscriptions'
     label = 'subscriptions'
+
+    def ready(self):
+        from apps.subscriptions import signals  # noqa: F401
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from apps.subscriptions.models import ProviderLink
+from apps.subscriptions.services.link_health import (DEFAULT_CONCURRENCY, DEFAULT_PER_HOST, DEFAULT_TIMEOUT,
+    check_provider_links,
+)
+from apps.subscriptions.tasks.health import check_stale_provider_links
+
+
+class Command(BaseCommand):
+    """
+    Health-check ссылок провайдеров (ProviderLink)
+
+    По умолчанию проверяются активные ссылки, не проверявшиеся более суток.
+
+    Пример:
+        python manage.py check_provider_links --concurrency 200 --per-host 8 --timeout 5
+        python manage.py check_provider_links --all --provider netflix
+    """
+    help = "Проверка доступности ссылок провайдеров"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="Максимум ссылок за запуск")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Размер пачки (одна запись результатов в БД)")
+        parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                            help="Общий лимит одновременных запросов")
+        parser.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST,
+                            help="Лимит одновременных запросов к одному host")
+        parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Таймаут запроса (сек)")
+        parser.add_argument("--all", action="store_true",
+                            help="Проверить все активные ссылки, а не только устаревшие")
+        parser.add_argument("--provider", default=None, help="Slug провайдера (только с --all)")
+
+    def handle(self, *args, **options):
+        params = dict(limit=options["limit"], batch_size=options["batch_size"],
+                      concurrency=options["concurrency"], per_host=options["per_host"], timeout=options["timeout"])
+
+        if options["all"]:
+            links = ProviderLink.objects.filter(is_active=True)
+            if options["provider"]:
+                links = links.filter(provider__slug=options["provider"])
+            summary = check_provider_links(links, **params)
+        else:
+            summary = check_stale_provider_links(**params)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Проверено ссылок: {summary.checked} (ok: {summary.ok}, ошибок: {summary.failed}, "
+            f"деактивировано: {summary.deactivated})"))
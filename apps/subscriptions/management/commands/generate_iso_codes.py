@@ -0,0 +1,63 @@
+import textwrap
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Шапка генерируемого модуля
+_HEADER = '''"""
+Справочники ISO-кодов для валидаторов (utils.validators).
+
+Файл сгенерирован командой `python manage.py generate_iso_codes` из pycountry {version}.
+Не редактировать вручную — перегенерировать при обновлении pycountry.
+"""
+
+'''
+
+
+def _frozenset_literal(name: str, comment: str, codes: list[str]) -> str:
+    body = textwrap.fill(", ".join(f'"{code}"' for code in sorted(codes)), width=100,
+                         initial_indent="    ", subsequent_indent="    ")
+    return f"# {comment}\n{name} = frozenset({{\n{body}\n}})\n"
+
+
+class Command(BaseCommand):
+    """
+    Генерация utils/iso_codes.py (валюты ISO 4217, регионы ISO 3166-1 alpha-2) из pycountry
+
+    pycountry нужен только на этапе сборки: в рантайме валидаторы используют готовые frozenset.
+
+    Пример:
+        python manage.py generate_iso_codes
+        python manage.py generate_iso_codes --check
+    """
+    help = "Генерация справочников ISO-кодов (utils/iso_codes.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=str(Path(settings.BASE_DIR) / "utils" / "iso_codes.py"),
+                            help="Путь к генерируемому модулю")
+        parser.add_argument("--check", action="store_true",
+                            help="Только проверить, что модуль актуален (exit code 1 при расхождении)")
+
+    def handle(self, *args, **options):
+        import pycountry
+        from importlib.metadata import version
+
+        content = (_HEADER.format(version=version("pycountry"))
+                   + _frozenset_literal("CURRENCY_CODES", "ISO 4217 (USD/EUR/RUB...)",
+                                        [c.alpha_3 for c in pycountry.currencies])
+                   + "\n"
+                   + _frozenset_literal("REGION_CODES", "ISO 3166-1 alpha-2 (US, DE, RU, ...)",
+                                        [c.alpha_2 for c in pycountry.countries]))
+
+        output = Path(options["output"])
+        if options["check"]:
+            current = output.read_text(encoding="utf-8") if output.exists() else ""
+            if current != content:
+                self.stderr.write(self.style.ERROR(f"{output} устарел, запустите generate_iso_codes"))
+                raise SystemExit(1)
+            self.stdout.write(self.style.SUCCESS(f"{output} актуален"))
+            return
+
+        output.write_text(content, encoding="utf-8")
+        self.stdout.write(self.style.SUCCESS(f"Записан {output}"))
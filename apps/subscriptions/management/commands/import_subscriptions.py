@@ -0,0 +1,44 @@
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.subscriptions.services.import_service import import_subscriptions, open_rows
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Потоковый импорт подписок пользователя из CSV / JSON / JSON Lines
+
+    Пример:
+        python manage.py import_subscriptions partner.csv --user partner@example.com --batch-size 2000
+    """
+    help = "Импорт подписок пользователя из файла (CSV/JSON)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к файлу")
+        parser.add_argument("--user", required=True, help="Email владельца подписок")
+        parser.add_argument("--format", choices=["csv", "json", "jsonl"], default=None,
+                            help="Формат файла (по умолчанию — по расширению)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Размер пачки (одна транзакция)")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        fmt = options["format"] or path.suffix.lstrip(".").lower()
+
+        try:
+            user = User.objects.get(email=options["user"])
+        except User.DoesNotExist as e:
+            raise CommandError(f"Пользователь не найден: {options['user']}") from e
+
+        try:
+            with path.open(encoding="utf-8-sig", newline="") as stream:
+                result = import_subscriptions(user, open_rows(stream, fmt), batch_size=options["batch_size"])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e)) from e
+
+        for row_number, errors in result.errors:
+            self.stderr.write(f"Строка {row_number}: {errors}")
+        self.stdout.write(self.style.SUCCESS(f"Создано: {result.created}, с ошибками: {result.failed}"))
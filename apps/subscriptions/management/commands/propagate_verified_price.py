@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from apps.subscriptions.services.verified_price_service import DEFAULT_BATCH_SIZE
+from apps.subscriptions.tasks.pricing import propagate_verified_price_task
+
+
+class Command(BaseCommand):
+    """
+    Распространение версии VerifiedPrice на активные подписки, следующие ее ключу
+
+    Пример:
+        python manage.py propagate_verified_price 42 --batch-size 2000
+    """
+    help = "Распространение подтвержденной цены на подписки"
+
+    def add_arguments(self, parser):
+        parser.add_argument("verified_price_id", type=int)
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                            help="Подписок в одной транзакции")
+
+    def handle(self, *args, **options):
+        def report(state):
+            self.stdout.write(f"{state.processed}/{state.total} подписок, {state.rate:.0f}/с")
+
+        state = propagate_verified_price_task(options["verified_price_id"], batch_size=options["batch_size"],
+                                              progress=report)
+        self.stdout.write(self.style.SUCCESS(
+            f"Обновлено подписок: {state.updated} (конфликтов: {state.conflicts}, отклонено: {state.rejected}) "
+            f"за {state.elapsed:.1f} с"))
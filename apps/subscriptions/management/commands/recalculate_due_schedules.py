@@ -0,0 +1,55 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.subscriptions.tasks.maintenance import recalculate_due_schedules, recalculate_due_schedules_bulk
+
+
+def _init_worker():
+    """
+    Инициализация процесса пула: Django setup + свои соединения с БД (не наследуем от родителя)
+    """
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    """
+    Пересчет просроченных расписаний (next_run_at <= now) и синхронизация Subscription.next_billing_at
+
+    Режимы:
+    - по умолчанию: bulk-воркер (чанки, SKIP LOCKED, commit после каждого чанка)
+    - --workers N: N процессов разбирают очередь параллельно
+    - --row-by-row: исходный построчный режим в одной транзакции
+    """
+    help = "Пересчет next_run_at просроченных расписаний"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None,
+                            help="Максимум расписаний на процесс (по умолчанию вся очередь)")
+        parser.add_argument("--chunk-size", type=int, default=500,
+                            help="Размер чанка (одна транзакция)")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Количество процессов-воркеров")
+        parser.add_argument("--row-by-row", action="store_true",
+                            help="Построчный режим (без bulk и параллельности)")
+
+    def handle(self, *args, **options):
+        limit = options["limit"]
+        chunk_size = options["chunk_size"]
+        workers = options["workers"]
+
+        if options["row_by_row"]:
+            processed = recalculate_due_schedules(limit=limit or 500)
+        elif workers <= 1:
+            processed = recalculate_due_schedules_bulk(limit=limit, chunk_size=chunk_size)
+        else:
+            # Соединения родителя не должны попасть в дочерние процессы
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [pool.submit(recalculate_due_schedules_bulk, limit, chunk_size) for _ in range(workers)]
+                processed = sum(future.result() for future in futures)
+
+        self.stdout.write(self.style.SUCCESS(f"Обработано расписаний: {processed}"))
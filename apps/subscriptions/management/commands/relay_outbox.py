@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from apps.subscriptions.services.outbox import DEFAULT_BATCH_SIZE
+from apps.subscriptions.tasks.outbox import relay_subscription_events
+
+
+class Command(BaseCommand):
+    """
+    Передача событий подписок из outbox потребителям (settings.OUTBOX_PUBLISHER)
+
+    Пример:
+        python manage.py relay_outbox --batch-size 1000 --name worker-1
+    """
+    help = "Передача событий outbox потребителям"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--name", default="default", help="Имя relay (контрольная точка)")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                            help="Событий в одной транзакции")
+        parser.add_argument("--limit", type=int, default=None, help="Максимум событий за запуск")
+
+    def handle(self, *args, **options):
+        published = relay_subscription_events(name=options["name"], batch_size=options["batch_size"],
+                                              limit=options["limit"])
+        self.stdout.write(self.style.SUCCESS(f"Передано событий: {published}"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from apps.subscriptions.services.drift_service import DEFAULT_CHUNK_SIZE
+from apps.subscriptions.tasks.drift import repair_denormalization_drift
+
+
+class Command(BaseCommand):
+    """
+    Сверка и исправление денормализованных полей подписок
+
+    Пример:
+        python manage.py repair_denormalization --dry-run
+        python manage.py repair_denormalization --chunk-size 10000
+    """
+    help = "Сверка денормализации подписок (current_schedule, next_billing_at, current_price_*)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Только подсчитать расхождения")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="Подписок в одном чанке (и одной транзакции при исправлении)")
+
+    def handle(self, *args, **options):
+        report = repair_denormalization_drift(dry_run=options["dry_run"], chunk_size=options["chunk_size"])
+        for name, value in report.as_metrics().items():
+            self.stdout.write(f"{name} {value}")
+        self.stdout.write(self.style.SUCCESS(f"Расхождений: {report.total}"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.subscriptions.services.lifecycle_service import DEFAULT_CHUNK_SIZE
+from apps.subscriptions.tasks.lifecycle import sweep_lifecycle_transitions
+
+
+class Command(BaseCommand):
+    """
+    Переходы статусов подписок: trial -> active, окончание + льготный период -> expired
+
+    Пример:
+        python manage.py sweep_subscription_lifecycle --chunk-size 2000
+    """
+    help = "Переходы статусов подписок (trial/grace)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="Подписок в одной транзакции")
+
+    def handle(self, *args, **options):
+        result = sweep_lifecycle_transitions(chunk_size=options["chunk_size"])
+        for (from_status, to_status), count in sorted(result.transitions.items()):
+            self.stdout.write(f"{from_status} -> {to_status}: {count}")
+        self.stdout.write(self.style.SUCCESS(f"Переходов: {result.total}"))
@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-17 18:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0003_alter_pricehistory_currency_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='providerlink',
+            name='last_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='BillingOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('occurs_at', models.DateTimeField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('currency', models.CharField(max_length=3)),
+                ('create_at', models.DateTimeField(auto_now_add=True)),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='subscriptions.subscription')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='billing_occurrences', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'billing_occurrences',
+                'ordering': ['occurs_at'],
+                'indexes': [models.Index(fields=['user', 'occurs_at'], name='billing_occ_user_id_ba5f4e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('subscription', 'occurs_at'), name='uniq_billing_occurrence_subscription_occurs_at')],
+            },
+        ),
+    ]
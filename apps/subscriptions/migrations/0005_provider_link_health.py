@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-17 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0004_billing_occurrences'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='providerlink',
+            name='etag',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='providerlink',
+            name='failure_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='providerlink',
+            name='last_modified',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='providerlink',
+            name='last_status_code',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-17 19:01
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+import utils.db_functions
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0005_provider_link_health'),
+    ]
+
+    operations = [
+        # GiST по bigint (subscription_id) требует btree_gist
+        BtreeGistExtension(),
+        migrations.AddIndex(
+            model_name='pricehistory',
+            index=django.contrib.postgres.indexes.GistIndex(models.F('subscription'), utils.db_functions.TsTzRange('effective_from', 'effective_to', django.contrib.postgres.fields.ranges.RangeBoundary()), name='price_history_period_gist'),
+        ),
+    ]
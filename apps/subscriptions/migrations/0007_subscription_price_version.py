@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0006_price_history_period_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscription',
+            name='price_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
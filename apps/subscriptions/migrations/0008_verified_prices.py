@@ -0,0 +1,62 @@
+# Generated by Django 6.0 on 2026-10-17 19:11
+
+import django.core.validators
+import django.db.models.deletion
+import utils.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0007_subscription_price_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerifiedPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(default='GLOBAL', max_length=8, validators=[utils.validators.validator_region])),
+                ('currency', models.CharField(max_length=3, validators=[utils.validators.validator_currency])),
+                ('period_unit', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month'), ('year', 'Year')], default='month', max_length=10)),
+                ('period_interval', models.PositiveSmallIntegerField(default=1)),
+                ('platform', models.CharField(choices=[('web', 'Web'), ('ios', 'IOS'), ('android', 'Android'), ('desktop', 'Desktop'), ('tv', 'TV'), ('unknown', 'Unknown')], default='web', max_length=10)),
+                ('plan', models.SlugField(max_length=64)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12, validators=[django.core.validators.MinValueValidator(0)])),
+                ('source', models.CharField(choices=[('manual', 'Manual'), ('import', 'Import'), ('integration', 'Integration')], default='integration', max_length=16)),
+                ('valid_from', models.DateTimeField()),
+                ('valid_to', models.DateTimeField(blank=True, null=True)),
+                ('create_at', models.DateTimeField(auto_now_add=True)),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='verified_prices', to='subscriptions.provider')),
+            ],
+            options={
+                'db_table': 'verified_prices',
+            },
+        ),
+        migrations.AddField(
+            model_name='pricehistory',
+            name='verified_price',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='price_history', to='subscriptions.verifiedprice'),
+        ),
+        migrations.AddIndex(
+            model_name='pricehistory',
+            index=models.Index(condition=models.Q(('effective_to__isnull', True)), fields=['verified_price', 'subscription'], name='price_history_open_verified'),
+        ),
+        migrations.AddIndex(
+            model_name='verifiedprice',
+            index=models.Index(fields=['provider', 'region', 'currency', 'period_unit', 'period_interval', 'platform', 'plan', '-valid_from'], name='verified_price_key_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='verifiedprice',
+            constraint=models.UniqueConstraint(condition=models.Q(('valid_to__isnull', True)), fields=('provider', 'region', 'currency', 'period_unit', 'period_interval', 'platform', 'plan'), name='uniq_verified_price_current_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='verifiedprice',
+            constraint=models.CheckConstraint(condition=models.Q(('amount__gte', 0)), name='verified_price_amount_nonnegative'),
+        ),
+        migrations.AddConstraint(
+            model_name='verifiedprice',
+            constraint=models.CheckConstraint(condition=models.Q(('valid_to__isnull', True), ('valid_to__gt', models.F('valid_from')), _connector='OR'), name='verified_price_valid_to_gt_from'),
+        ),
+    ]
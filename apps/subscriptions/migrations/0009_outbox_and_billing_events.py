@@ -0,0 +1,63 @@
+# Generated by Django 6.0 on 2026-10-17 19:40
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0008_verified_prices'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('published_count', models.BigIntegerField(default=0)),
+                ('update_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'outbox_checkpoints',
+            },
+        ),
+        migrations.CreateModel(
+            name='BillingEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('occurrence_at', models.DateTimeField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('currency', models.CharField(max_length=3)),
+                ('create_at', models.DateTimeField(auto_now_add=True)),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='billing_events', to='subscriptions.billingschedule')),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='billing_events', to='subscriptions.subscription')),
+            ],
+            options={
+                'db_table': 'billing_events',
+                'indexes': [models.Index(fields=['subscription', '-occurrence_at'], name='billing_eve_subscri_76fbb9_idx')],
+                'constraints': [models.UniqueConstraint(fields=('schedule', 'occurrence_at'), name='uniq_billing_event_schedule_occurrence')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('price_changed', 'Price changed'), ('status_changed', 'Status changed'), ('next_billing_changed', 'Next billing changed')], max_length=32)),
+                ('subscription_id', models.BigIntegerField()),
+                ('payload', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('create_at', models.DateTimeField(auto_now_add=True)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='outbox_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'outbox_events',
+                'indexes': [models.Index(condition=models.Q(('published_at__isnull', True)), fields=['id'], name='outbox_unpublished_idx'), models.Index(condition=models.Q(('published_at__isnull', False)), fields=['published_at'], name='outbox_published_at_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-17 20:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0009_outbox_and_billing_events'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(condition=models.Q(('status', 'trial')), fields=['id'], name='subscription_trial_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(condition=models.Q(('ended_at__isnull', False), ('status__in', ['active', 'paused', 'canceled'])), fields=['ended_at'], name='subscription_ending_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-17 20:30
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def demote_duplicate_current(apps, schema_editor):
+    """
+    Перед уникальным индексом: у подписки остается одно актуальное расписание (самое новое),
+    как в sync_subscription_next_billing
+    """
+    BillingSchedule = apps.get_model('subscriptions', 'BillingSchedule')
+    duplicated = (BillingSchedule.objects.filter(is_current=True).values('subscription_id')
+                  .annotate(versions=Count('id')).filter(versions__gt=1).values_list('subscription_id', flat=True))
+    for subscription_id in list(duplicated):
+        current = BillingSchedule.objects.filter(subscription_id=subscription_id, is_current=True)
+        newest = current.order_by('-create_at', '-id').values_list('pk', flat=True).first()
+        current.exclude(pk=newest).update(is_current=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0010_subscription_lifecycle_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(demote_duplicate_current, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='billingschedule',
+            index=models.Index(condition=models.Q(('is_current', True)), fields=['next_run_at'], name='billing_schedule_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='billingschedule',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_current', True)), fields=('subscription',), name='uniq_billing_schedule_current'),
+        ),
+        migrations.RemoveIndex(
+            model_name='billingschedule',
+            name='billing_sch_subscri_197bc8_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='billingschedule',
+            name='billing_sch_is_curr_582641_idx',
+        ),
+        migrations.AlterField(
+            model_name='billingschedule',
+            name='is_current',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='billingschedule',
+            name='next_run_at',
+            field=models.DateTimeField(),
+        ),
+    ]
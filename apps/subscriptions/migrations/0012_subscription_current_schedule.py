@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-17 20:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_current_schedule(apps, schema_editor):
+    """
+    Указатель на актуальное расписание — одним UPDATE (актуальное расписание уникально, см. 0011)
+    """
+    Subscription = apps.get_model('subscriptions', 'Subscription')
+    BillingSchedule = apps.get_model('subscriptions', 'BillingSchedule')
+    Subscription.objects.update(current_schedule=Subquery(
+        BillingSchedule.objects.filter(subscription=OuterRef('pk'), is_current=True).values('pk')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0011_billing_schedule_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscription',
+            name='current_schedule',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='subscriptions.billingschedule'),
+        ),
+        migrations.RunPython(fill_current_schedule, migrations.RunPython.noop),
+    ]
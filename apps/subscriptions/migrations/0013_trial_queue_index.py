@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-17 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0012_subscription_current_schedule'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='subscription',
+            name='subscription_trial_idx',
+        ),
+        migrations.AddIndex(
+            model_name='billingschedule',
+            index=models.Index(condition=models.Q(('is_current', True), ('trial_ends_at__isnull', False)), fields=['trial_ends_at', 'subscription'], name='billing_schedule_trial_idx'),
+        ),
+    ]
@@ -2,7 +2,11 @@ from .category import Category
 from .provider import Provider, ProviderLink
 from .subscription import Subscription
 from .billing_schedule import BillingSchedule
+from .verified_price import VerifiedPrice
 from .price_history import PriceHistory
+from .billing_occurrence import BillingOccurrence
+from .billing_event import BillingEvent
+from .outbox import OutboxCheckpoint, OutboxEvent
 
 __all__ = [
     'Category',
@@ -10,5 +14,10 @@ __all__ = [
     'ProviderLink',
     'Subscription',
     'BillingSchedule',
+    'VerifiedPrice',
     'PriceHistory',
+    'BillingOccurrence',
+    'BillingEvent',
+    'OutboxEvent',
+    'OutboxCheckpoint',
 ]
\ No newline at end of file
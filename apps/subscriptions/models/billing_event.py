@@ -0,0 +1,41 @@
+from django.db import models
+
+from .billing_schedule import BillingSchedule
+from .subscription import Subscription
+
+
+class BillingEvent(models.Model):
+    """
+    BillingEvent - журнал фактических списаний (ledger)
+
+    Одна запись = одно наступившее списание по расписанию с ценой, действовавшей в этот момент.
+    Пишется пакетно задачей пересчета просроченных расписаний (services/ledger_service.py);
+    уникальный ключ (schedule, occurrence_at) делает повторные прогоны no-op.
+
+    В отличие от BillingOccurrence (прогноз будущего) — факт прошлого, не пересобирается.
+    """
+
+    subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE, related_name="billing_events")
+    schedule = models.ForeignKey(BillingSchedule, on_delete=models.CASCADE, related_name="billing_events")
+
+    # Момент списания (UTC)
+    occurrence_at = models.DateTimeField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    currency = models.CharField(max_length=3)
+
+    create_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "billing_events"
+        indexes = [
+            # История списаний подписки (последние — первыми)
+            models.Index(fields=["subscription", "-occurrence_at"]),
+        ]
+        constraints = [
+            # Одно списание расписания на момент времени (идемпотентность прогонов)
+            models.UniqueConstraint(fields=["schedule", "occurrence_at"],
+                                    name="uniq_billing_event_schedule_occurrence"),
+        ]
+
+    def __str__(self):
+        return f"{self.subscription_id}: {self.occurrence_at} {self.amount} {self.currency}"
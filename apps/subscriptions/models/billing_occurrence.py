@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import models
+
+from .subscription import Subscription
+
+
+class BillingOccurrence(models.Model):
+    """
+    BillingOccurrence - материализованные будущие списания по подписке (прогноз)
+
+    Назначение:
+    - быстрые ответы на "сколько я заплачу за 30/90/365 дней" без разворачивания правил BillingSchedule
+    - одна запись = одно будущее списание с суммой и валютой
+
+    Таблица производная (источник истины — BillingSchedule + PriceHistory),
+    поддерживается инкрементально в services/forecast_service.py
+    """
+
+    subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE, related_name="occurrences")
+    # Денормализация владельца для range-запросов по пользователю
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="billing_occurrences")
+
+    # Дата списания
+    occurs_at = models.DateTimeField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    currency = models.CharField(max_length=3)
+
+    create_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "billing_occurrences"
+        ordering = ["occurs_at"]
+        indexes = [
+            # Range-запросы прогноза по пользователю
+            models.Index(fields=["user", "occurs_at"]),
+        ]
+        constraints = [
+            # Одно списание подписки на момент времени
+            models.UniqueConstraint(fields=["subscription", "occurs_at"],
+                                    name="uniq_billing_occurrence_subscription_occurs_at"),
+        ]
+
+    def __str__(self):
+        return f"{self.subscription_id}: {self.occurs_at} {self.amount} {self.currency}"
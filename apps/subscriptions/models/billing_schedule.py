@@ -36,11 +36,11 @@ class BillingSchedule(models.Model):
     grace_days = models.PositiveSmallIntegerField(default=0)
 
     # Дата следующего списание
-    next_run_at = models.DateTimeField(db_index=True)
+    next_run_at = models.DateTimeField()
 
     # Актуальность расписания (версионность)
     # При изменении правила - создаем новое is_current=True, старое помечаем False
-    is_current = models.BooleanField(default=True, db_index=True)
+    is_current = models.BooleanField(default=True)
 
     create_at = models.DateTimeField(auto_now_add=True)
     update_at = models.DateTimeField(auto_now=True)
@@ -48,12 +48,20 @@ class BillingSchedule(models.Model):
     class Meta:
         db_table = "billing_schedules"
         indexes = [
-            # Быстрое получение актуального расписания
-            models.Index(fields=["subscription", "is_current"]),
-            # Быстрое получение расписаний по дате списания
-            models.Index(fields=["is_current", "next_run_at"]),
+            # Очередь просроченных расписаний (next_run_at <= now): только актуальные версии,
+            # история расписаний в индекс не попадает
+            models.Index(fields=["next_run_at"], condition=models.Q(is_current=True),
+                         name="billing_schedule_due_idx"),
+            # Очередь окончания trial (services/lifecycle_service.py): только актуальные версии с trial,
+            # subscription в индексе — кандидаты выбираются без чтения таблицы
+            models.Index(fields=["trial_ends_at", "subscription"],
+                         condition=models.Q(is_current=True, trial_ends_at__isnull=False),
+                         name="billing_schedule_trial_idx"),
         ]
         constraints = [
+            # Одно актуальное расписание на подписку (и индекс поиска актуального расписания)
+            models.UniqueConstraint(fields=["subscription"], condition=models.Q(is_current=True),
+                                    name="uniq_billing_schedule_current"),
             # Интервал не может быть меньше 1
             models.CheckConstraint(condition=models.Q(period_interval__gte=1),
                                    name="billing_schedule_interval_gte_1"),
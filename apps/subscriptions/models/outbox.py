@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+from utils.enums import EventType
+
+
+class OutboxEvent(models.Model):
+    """
+    OutboxEvent - transactional outbox событий подписок
+
+    Назначение:
+    - сервисный слой пишет событие в той же транзакции, что и изменение подписки
+      (цена, статус, next_billing_at) — событие существует тогда и только тогда, когда изменение закоммичено
+    - relay (services/outbox.py) пачками передает события потребителям (уведомления, аналитика, Telegram)
+      вместо периодического опроса subscriptions по update_at
+
+    Доставка at-least-once: потребители используют id события как ключ идемпотентности.
+    """
+
+    event_type = models.CharField(max_length=32, choices=EventType.choices)
+    # Без FK: событие удаления/изменения должно пережить подписку
+    subscription_id = models.BigIntegerField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="outbox_events",
+                             db_index=False)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+
+    create_at = models.DateTimeField(auto_now_add=True)
+    # Момент передачи потребителям (NULL — еще не передано)
+    published_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "outbox_events"
+        indexes = [
+            # Очередь relay: только непереданные события
+            models.Index(fields=["id"], condition=models.Q(published_at__isnull=True),
+                         name="outbox_unpublished_idx"),
+            # Очистка переданных событий
+            models.Index(fields=["published_at"], condition=models.Q(published_at__isnull=False),
+                         name="outbox_published_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.event_type} subscription={self.subscription_id}"
+
+
+class OutboxCheckpoint(models.Model):
+    """
+    OutboxCheckpoint - контрольная точка relay
+
+    Обновляется в той же транзакции, что и отметка published_at пачки:
+    последний переданный id и счетчик (мониторинг отставания: max(OutboxEvent.id) - last_event_id).
+    """
+
+    name = models.CharField(max_length=64, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    published_count = models.BigIntegerField(default=0)
+    update_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "outbox_checkpoints"
+
+    def __str__(self):
+        return f"{self.name}: {self.last_event_id}"
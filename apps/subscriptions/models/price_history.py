@@ -1,10 +1,14 @@
+from django.contrib.postgres.fields import RangeBoundary
+from django.contrib.postgres.indexes import GistIndex
 from django.core.validators import MinValueValidator
 from django.db import models
 
 from .subscription import Subscription
+from .verified_price import VerifiedPrice
 
+from utils.db_functions import TsTzRange
 from utils.validators import validator_currency
-from utils.enum import Source
+from utils.enums import Source
 
 
 class PriceHistory(models.Model):
@@ -17,12 +21,19 @@ class PriceHistory(models.Model):
     - Отчеты
 
     Для быстрого поиска current_price_* хранится в Subscription
+
+    verified_price - подписка следует официальной цене (VerifiedPrice); amount/currency
+    копируются из версии справочника, чтобы расчеты не зависели от JOIN.
+    Без ссылки — ручная цена (manual override), обновления справочника ее не затрагивают.
     """
 
     subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE, related_name="price_history")
 
     amount = models.DecimalField(max_digits=12, decimal_places=2, validators=[MinValueValidator(0)])
     currency = models.CharField(max_length=3, validators=[validator_currency])
+    # Версия справочника цен, которой следует подписка (NULL — ручная цена)
+    verified_price = models.ForeignKey(VerifiedPrice, on_delete=models.PROTECT, blank=True, null=True,
+                                       related_name="price_history")
 
     # Дата начала действия
     effective_from = models.DateTimeField(db_index=True)
@@ -40,6 +51,13 @@ class PriceHistory(models.Model):
         indexes = [
             # Быстрое получение последней цены по подписке
             models.Index(fields=["subscription", "-effective_from"]),
+            # Интервальный индекс "цена на момент T": (subscription, [effective_from, effective_to)), btree_gist
+            GistIndex(models.F("subscription"),
+                      TsTzRange("effective_from", "effective_to", RangeBoundary()),
+                      name="price_history_period_gist"),
+            # Подписки, следующие версии справочника: только открытые интервалы (распространение цен)
+            models.Index(fields=["verified_price", "subscription"], condition=models.Q(effective_to__isnull=True),
+                         name="price_history_open_verified"),
         ]
         constraints = [
             # Цена не может быть отрицательной
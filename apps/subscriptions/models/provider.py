@@ -59,6 +59,13 @@ class ProviderLink(models.Model):
 
     # Дата последней проверки ссылки
     last_checked_at = models.DateTimeField(blank=True, null=True)
+    # Результат последней проверки (HTTP статус, None — ошибка соединения/таймаут)
+    last_status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    # Подряд идущие неудачные проверки (сбрасывается при успешной)
+    failure_count = models.PositiveSmallIntegerField(default=0)
+    # Валидаторы для условных запросов (If-None-Match / If-Modified-Since)
+    etag = models.CharField(max_length=255, blank=True, null=True)
+    last_modified = models.CharField(max_length=64, blank=True, null=True)
     is_active = models.BooleanField(default=True, db_index=True)
     create_at = models.DateTimeField(auto_now_add=True)
     update_at = models.DateTimeField(auto_now=True)
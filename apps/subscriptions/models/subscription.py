@@ -52,6 +52,8 @@ class Subscription(models.Model):
     # Код валюты (по началу для упрощения Char, в дальнейшем переработается в справочник)
     # ISO 4217 (USD/EUR/RUB...)
     current_price_currency = models.CharField(max_length=3, validators=[validator_currency])
+    # Версия цены (optimistic concurrency): увеличивается при каждой смене цены через сервисный слой
+    price_version = models.PositiveIntegerField(default=0)
 
     # Денормализация ближайшего списания (для удобства запросов, истина — BillingSchedule.next_run_at)
     next_billing_at = models.DateTimeField(blank=True, null=True, db_index=True)
@@ -63,6 +65,11 @@ class Subscription(models.Model):
     # Факт последнего списания
     last_billed_at = models.DateTimeField(blank=True, null=True)
 
+    # Актуальное расписание (BillingSchedule с is_current=True): поиск по PK/JOIN вместо сортировки версий.
+    # Поддерживается сервисным слоем (create_subscription_with_defaults, replace_schedule)
+    current_schedule = models.OneToOneField("BillingSchedule", on_delete=models.SET_NULL, null=True, blank=True,
+                                            related_name="+")
+
     create_at = models.DateTimeField(auto_now_add=True)
     update_at = models.DateTimeField(auto_now=True)
 
@@ -73,6 +80,11 @@ class Subscription(models.Model):
             models.Index(fields=["user", "status"]),
             # Индекс для ускорения поиска списка ближайших списаний
             models.Index(fields=["user", "next_billing_at"]),
+            # Очередь истечения по ended_at + grace: только закончившиеся и еще не истекшие подписки
+            models.Index(fields=["ended_at"],
+                         condition=models.Q(ended_at__isnull=False,
+                                            status__in=[Status.ACTIVE, Status.PAUSED, Status.CANCELED]),
+                         name="subscription_ending_idx"),
         ]
         constraints = [
             # Цена не может быть отрицательной
@@ -0,0 +1,70 @@
+from django.core.validators import MinValueValidator
+from django.db import models
+
+from .provider import Provider
+
+from utils.validators import validator_currency, validator_region
+from utils.enums import PeriodUnit, Platform, Source
+
+
+class VerifiedPrice(models.Model):
+    """
+    VerifiedPrice - справочник подтвержденных цен провайдера
+
+    Цена зависит от контекста, поэтому хранится как набор версий по ключу:
+    провайдер + регион/валюта/период/платформа/план.
+    Версия действует в интервале [valid_from, valid_to), valid_to = NULL — текущая версия ключа.
+
+    Новая версия не перезаписывает прошлые данные: она закрывает предыдущую и
+    распространяется только на будущие интервалы цен активных подписок
+    (см. services/verified_price_service.py).
+    """
+
+    provider = models.ForeignKey(Provider, on_delete=models.CASCADE, related_name="verified_prices")
+
+    # ISO 3166-1 alpha-2 (US, DE, RU, ...) или GLOBAL
+    region = models.CharField(max_length=8, default="GLOBAL", validators=[validator_region])
+    # ISO 4217 (USD/EUR/RUB...)
+    currency = models.CharField(max_length=3, validators=[validator_currency])
+    # Период тарифа (1 month, 1 year, ...)
+    period_unit = models.CharField(max_length=10, choices=PeriodUnit.choices, default=PeriodUnit.MONTH)
+    period_interval = models.PositiveSmallIntegerField(default=1)
+    platform = models.CharField(max_length=10, choices=Platform.choices, default=Platform.WEB)
+    # Тариф/план провайдера ("basic", "premium", "family", ...)
+    plan = models.SlugField(max_length=64)
+
+    amount = models.DecimalField(max_digits=12, decimal_places=2, validators=[MinValueValidator(0)])
+    # Источник обновления цены
+    source = models.CharField(max_length=16, choices=Source.choices, default=Source.INTEGRATION)
+
+    # Интервал действия версии
+    valid_from = models.DateTimeField()
+    valid_to = models.DateTimeField(blank=True, null=True)
+
+    create_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "verified_prices"
+        indexes = [
+            # Поиск версий по ключу (последняя версия — первой)
+            models.Index(fields=["provider", "region", "currency", "period_unit", "period_interval",
+                                 "platform", "plan", "-valid_from"],
+                         name="verified_price_key_idx"),
+        ]
+        constraints = [
+            # Одна текущая версия на ключ
+            models.UniqueConstraint(fields=["provider", "region", "currency", "period_unit", "period_interval",
+                                            "platform", "plan"],
+                                    condition=models.Q(valid_to__isnull=True),
+                                    name="uniq_verified_price_current_key"),
+            # Цена не может быть отрицательной
+            models.CheckConstraint(condition=models.Q(amount__gte=0),
+                                   name="verified_price_amount_nonnegative"),
+            # Дата начала (valid_from) не может быть позже Дата окончания (valid_to)
+            models.CheckConstraint(condition=models.Q(valid_to__isnull=True) | models.Q(valid_to__gt=models.F("valid_from")),
+                                   name="verified_price_valid_to_gt_from"),
+        ]
+
+    def __str__(self):
+        return (f"{self.provider} [{self.region}/{self.platform}/{self.plan}] "
+                f"{self.amount} {self.currency} / {self.period_interval} {self.period_unit}")
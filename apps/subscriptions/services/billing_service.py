@@ -5,20 +5,30 @@ Billing service
 - валидация расписаний
 - расчет next_run_at
 - обновление Subscription.next_billing_at
+- догоняющий расчет (catch-up) пропущенных списаний
+- пакетный (векторный) расчет next_run_at и пересчет расписаний (bulk)
+- события изменения next_billing_at в outbox (в той же транзакции)
 """
 from __future__ import annotations
 
-from datetime import timedelta, datetime
-from typing import Optional
+from dataclasses import dataclass
+from datetime import timedelta, datetime, timezone as dt_timezone
+from typing import Iterable, Optional, Sequence
 
+import numpy as np
 from django.db import transaction
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 
 from apps.subscriptions.models import BillingSchedule, Subscription
+from apps.subscriptions.services.outbox import record_event, record_events
 
-from utils.enums import PeriodUnit
-from utils.date_calculator import get_tzinfo, add_months, clamp_day_to_month, next_week
+from utils.enums import EventType, PeriodUnit
+from utils.date_calculator import get_tzinfo, add_months, clamp_day_to_month, dst_gaps, next_week
+from utils.batch_date_calculator import NO_ANCHOR, NO_TRIAL, PERIOD_UNIT_CODES, US_PER_SEC, next_run_batch
+from utils.instrumentation import instrumented
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
 
 
 def validate_billing_schedule_params(*, period_unit: str, period_interval: int, anchor_day: Optional[int],
@@ -56,7 +66,7 @@ def _next_for_week(dtime: datetime, interval: int, anchor_weekday: int) -> datet
     """
     Вычисляем следующую дату для "каждые N недель" на конкретный день недели.
     """
-    return next_week(dtime, interval, anchor_weekday)
+    return next_week(dtime, anchor_weekday, interval)
 
 
 def _next_for_month(dtime: datetime, interval: int, anchor_day: int) -> datetime:
@@ -81,16 +91,17 @@ def _next_for_year(dtime: datetime, interval: int) -> datetime:
     return dtime.replace(year=year, day=day)
 
 
-@transaction.atomic
-def recalculate_schedule_next_run(schedule: BillingSchedule, *, from_dt: datetime) -> BillingSchedule:
+def calculate_next_run_at(schedule: BillingSchedule, *, from_dt: datetime,
+                          tzone: Optional[timezone.tzinfo] = None) -> datetime:
     """
-    Пересчитывает schedule.next_run_at, учитывая timezone подписки.
+    Чистый расчет следующего next_run_at (без записи в БД), учитывая timezone подписки.
 
     from_dt — “опорный момент”, от которого считаем следующий run.
-    Обычно это timezone.now().
+    tzone — timezone подписки (если уже известна, чтобы не вычислять повторно).
+    Возвращает дату в UTC (для хранения).
     """
-    sub = schedule.subscription
-    tzone = get_tzinfo(sub)
+    if tzone is None:
+        tzone = get_tzinfo(schedule.subscription)
 
     # Переводим опорный момент в локальную зону “подписки”
     local_dtime = timezone.localtime(from_dt, tzone)
@@ -120,8 +131,18 @@ def recalculate_schedule_next_run(schedule: BillingSchedule, *, from_dt: datetim
         raise ValidationError(f"Период не найден: {schedule.period_unit}")
 
     # Возвращаем в UTC (для хранения)
-    next_utc = next_dtime.astimezone(timezone.utc)
-    schedule.next_run_at = next_utc
+    return next_dtime.astimezone(dt_timezone.utc)
+
+
+@transaction.atomic
+def recalculate_schedule_next_run(schedule: BillingSchedule, *, from_dt: datetime) -> BillingSchedule:
+    """
+    Пересчитывает schedule.next_run_at, учитывая timezone подписки.
+
+    from_dt — “опорный момент”, от которого считаем следующий run.
+    Обычно это timezone.now().
+    """
+    schedule.next_run_at = calculate_next_run_at(schedule, from_dt=from_dt)
     schedule.save(update_fields=["next_run_at", "update_at"])
     return schedule
 
@@ -129,8 +150,294 @@ def recalculate_schedule_next_run(schedule: BillingSchedule, *, from_dt: datetim
 @transaction.atomic
 def sync_subscription_next_billing(sub: Subscription) -> None:
     """
-    Синхронизирует Subscription.next_billing_at из актуального BillingSchedule.next_run_at.
+    Синхронизирует Subscription.next_billing_at из актуального BillingSchedule.next_run_at
+    (поиск по PK через Subscription.current_schedule).
+    """
+    previous = sub.next_billing_at
+    sub.next_billing_at = (BillingSchedule.objects.filter(pk=sub.current_schedule_id)
+                           .values_list("next_run_at", flat=True).first())
+    sub.save(update_fields=["next_billing_at", "update_at"])
+    if sub.next_billing_at != previous:
+        record_event(sub, EventType.NEXT_BILLING_CHANGED,
+                     {"next_billing_at": sub.next_billing_at, "previous": previous})
+
+
+@dataclass(frozen=True)
+class CatchUpResult:
+    """
+    Результат догоняющего пересчета (catch-up) расписания
     """
-    current = BillingSchedule.objects.filter(subscription=sub, is_current=True).order_by("-create_at").first()
-    sub.next_billing_at = current.next_run_at if current else None
-    sub.save(update_fields=["next_billing_at", "update_at"])
\ No newline at end of file
+    # Количество пропущенных списаний (next_run_at <= now)
+    missed_count: int
+    # Ближайшее будущее списание (> now)
+    next_run_at: datetime
+    # Даты пропущенных списаний (UTC), заполняется только при with_missed=True
+    missed: tuple[datetime, ...] = ()
+
+
+def _wall_occurrence(base: datetime, schedule: BillingSchedule, step: int) -> datetime:
+    """
+    step-е списание серии по локальным "настенным" часам (naive), начиная с выровненного по правилу base.
+
+    Серия "якорная": время суток берется из base, день — по правилу периода (с clamp),
+    поэтому дата считается за O(1) без прохода по промежуточным периодам.
+    """
+    interval = schedule.period_interval * step
+    if schedule.period_unit == PeriodUnit.DAY:
+        return base + timedelta(days=interval)
+    if schedule.period_unit == PeriodUnit.WEEK:
+        return base + timedelta(weeks=interval)
+    if schedule.period_unit == PeriodUnit.MONTH:
+        total = base.year * 12 + (base.month - 1) + interval
+        year, month = total // 12, total % 12 + 1
+        return base.replace(year=year, month=month, day=clamp_day_to_month(year, month, schedule.anchor_day or 1))
+    if schedule.period_unit == PeriodUnit.YEAR:
+        year = base.year + interval
+        return base.replace(year=year, day=clamp_day_to_month(year, base.month, base.day))
+    raise ValidationError(f"Период не найден: {schedule.period_unit}")
+
+
+def _estimate_steps(base: datetime, local_now: datetime, schedule: BillingSchedule) -> int:
+    """
+    Оценка количества шагов от base до now по локальному календарю (naive, точность ±1 шаг)
+    """
+    interval = schedule.period_interval
+    if schedule.period_unit == PeriodUnit.DAY:
+        return (local_now - base).days // interval
+    if schedule.period_unit == PeriodUnit.WEEK:
+        return (local_now - base).days // (7 * interval)
+    if schedule.period_unit == PeriodUnit.MONTH:
+        return ((local_now.year - base.year) * 12 + (local_now.month - base.month)) // interval
+    return (local_now.year - base.year) // interval
+
+
+class _WallSeries:
+    """
+    Серия списаний по локальным часам с переводом в UTC один раз на результат.
+
+    Пошаговый calculate_next_run_at каждый раз берет локальное время из UTC: если списание попало
+    в несуществующий интервал (перевод часов вперед), оно сдвигается на размер перехода, и все следующие
+    списания идут уже со сдвинутым временем суток. Серия поэтому хранится сегментами [(первый шаг, база)]:
+    новый сегмент начинается на списании, попавшем в переход. Переходов — не больше нескольких в год
+    (dst_gaps, кеш на tz + год), поэтому шаг по-прежнему считается без прохода по периодам.
+    """
+
+    def __init__(self, base: datetime, schedule: BillingSchedule, tzone):
+        self.schedule = schedule
+        self.tzone = tzone
+        self.segments: list[tuple[int, datetime]] = [(0, base)]
+        self._gaps_until = base.year - 1
+
+    def _extend(self, year: int) -> None:
+        """
+        Сегменты по переходам часов до конца year включительно
+        """
+        while self._gaps_until < year:
+            self._gaps_until += 1
+            for gap_start, gap_end in dst_gaps(self.tzone, self._gaps_until):
+                first, base = self.segments[-1]
+                if gap_end <= base:
+                    continue
+                # Первое списание сегмента не раньше начала перехода
+                step = max(_estimate_steps(base, gap_start, self.schedule), 0)
+                while step > 0 and _wall_occurrence(base, self.schedule, step - 1) >= gap_start:
+                    step -= 1
+                while _wall_occurrence(base, self.schedule, step) < gap_start:
+                    step += 1
+                wall = _wall_occurrence(base, self.schedule, step)
+                if wall < gap_end:
+                    self.segments.append((first + step, wall + (gap_end - gap_start)))
+
+    def wall(self, step: int) -> datetime:
+        """
+        Локальное время (naive) step-го списания
+        """
+        while True:
+            first, base = next(segment for segment in reversed(self.segments) if segment[0] <= step)
+            wall = _wall_occurrence(base, self.schedule, step - first)
+            # +1 год: переход в начале года по UTC может приходиться на конец прошлого года по местному времени
+            if self._gaps_until > wall.year:
+                return wall
+            self._extend(wall.year + 1)
+
+    def at(self, step: int) -> datetime:
+        """
+        step-е списание серии в UTC
+        """
+        return self.wall(step).replace(tzinfo=self.tzone).astimezone(dt_timezone.utc)
+
+    def steps_until(self, moment: datetime) -> int:
+        """
+        Последний шаг серии с списанием <= moment (-1, если такого нет)
+        """
+        local = timezone.localtime(moment, self.tzone).replace(tzinfo=None)
+        self._extend(local.year + 1)
+        first, base = next((segment for segment in reversed(self.segments) if segment[1] <= local),
+                           self.segments[0])
+        steps = first + max(_estimate_steps(base, local, self.schedule), 0)
+        # Коррекция оценки на границах (время суток, clamp)
+        while steps >= 0 and self.at(steps) > moment:
+            steps -= 1
+        while self.at(steps + 1) <= moment:
+            steps += 1
+        return steps
+
+
+def calculate_catch_up(schedule: BillingSchedule, *, now: datetime, with_missed: bool = False) -> CatchUpResult:
+    """
+    Догоняющий расчет для отстающего расписания (простой сервиса, возобновление паузы).
+
+    Серия списаний начинается с текущего schedule.next_run_at:
+    - первый шаг считается обычным calculate_next_run_at (выравнивание по якорю и trial)
+    - дальше количество пропущенных периодов считается арифметически по PeriodUnit (O(1)),
+      с учетом anchor_day/clamp для MONTH и 29 февраля для YEAR
+    - шаги считаются по локальным часам подписки, переходы на летнее время — так же,
+      как при пошаговом calculate_next_run_at (_WallSeries)
+    - результат — количество пропущенных списаний (<= now) и ближайшее будущее списание
+
+    with_missed=True дополнительно возвращает список пропущенных дат (O(missed_count)).
+    Ничего не сохраняет.
+    """
+    first = schedule.next_run_at
+    if first > now:
+        return CatchUpResult(missed_count=0, next_run_at=first)
+
+    tzone = get_tzinfo(schedule.subscription)
+    second = calculate_next_run_at(schedule, from_dt=first, tzone=tzone)
+    if second > now:
+        return CatchUpResult(missed_count=1, next_run_at=second, missed=(first,) if with_missed else ())
+
+    # base — выровненное списание (локальное время), от него шаги считаются в O(1)
+    series = _WallSeries(timezone.localtime(second, tzone).replace(tzinfo=None), schedule, tzone)
+    steps = series.steps_until(now)
+
+    missed = ()
+    if with_missed:
+        missed = (first, second) + tuple(series.at(step) for step in range(1, steps + 1))
+
+    return CatchUpResult(missed_count=steps + 2, next_run_at=series.at(steps + 1), missed=missed)
+
+
+@instrumented
+@transaction.atomic
+def catch_up_schedule(schedule: BillingSchedule, *, now: Optional[datetime] = None,
+                      with_missed: bool = False) -> CatchUpResult:
+    """
+    Перематывает расписание на ближайшее будущее списание за один шаг
+    и синхронизирует Subscription.next_billing_at.
+    """
+    now = now or timezone.now()
+    result = calculate_catch_up(schedule, now=now, with_missed=with_missed)
+    if result.missed_count:
+        schedule.next_run_at = result.next_run_at
+        schedule.save(update_fields=["next_run_at", "update_at"])
+        sync_subscription_next_billing(schedule.subscription)
+    return result
+
+
+def _to_epoch_us(dtime: datetime) -> int:
+    """
+    Aware datetime -> epoch микросекунды (без потери точности float)
+    """
+    delta = dtime - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * US_PER_SEC + delta.microseconds
+
+
+def calculate_next_run_at_batch(schedules: Sequence[BillingSchedule], *, from_dt: datetime) -> list[datetime]:
+    """
+    Векторный аналог calculate_next_run_at для списка расписаний.
+
+    Расписания раскладываются в колонки NumPy и считаются одним вызовом next_run_batch.
+    Ожидает расписания с select_related("subscription"). Возвращает даты в UTC в порядке schedules.
+    """
+    if not schedules:
+        return []
+
+    tz_index: dict[Optional[str], int] = {}
+    tzinfos: list[timezone.tzinfo] = []
+    size = len(schedules)
+    period_units = np.empty(size, dtype=np.int64)
+    intervals = np.empty(size, dtype=np.int64)
+    anchors = np.empty(size, dtype=np.int64)
+    tz_ids = np.empty(size, dtype=np.int64)
+    trial_ends_us = np.empty(size, dtype=np.int64)
+
+    for i, schedule in enumerate(schedules):
+        if schedule.grace_days < 0:
+            raise ValidationError("Льготный период должен быть >= 0")
+        if schedule.period_unit not in PERIOD_UNIT_CODES:
+            raise ValidationError(f"Период не найден: {schedule.period_unit}")
+
+        tz_name = schedule.subscription.billing_timezone
+        if tz_name not in tz_index:
+            tz_index[tz_name] = len(tzinfos)
+            tzinfos.append(get_tzinfo(tz_name))
+
+        period_units[i] = PERIOD_UNIT_CODES[schedule.period_unit]
+        intervals[i] = schedule.period_interval
+        if schedule.period_unit == PeriodUnit.MONTH:
+            anchor = schedule.anchor_day
+        elif schedule.period_unit == PeriodUnit.WEEK:
+            anchor = schedule.anchor_weekday
+        else:
+            anchor = None
+        anchors[i] = NO_ANCHOR if anchor is None else anchor
+        tz_ids[i] = tz_index[tz_name]
+        trial_ends_us[i] = _to_epoch_us(schedule.trial_ends_at) if schedule.trial_ends_at else NO_TRIAL
+
+    result_us = next_run_batch(from_us=np.full(size, _to_epoch_us(from_dt), dtype=np.int64),
+                               period_units=period_units,
+                               intervals=intervals,
+                               anchors=anchors,
+                               tz_ids=tz_ids,
+                               tzinfos=tzinfos,
+                               trial_ends_us=trial_ends_us)
+    return [_EPOCH + timedelta(microseconds=int(value)) for value in result_us]
+
+
+@instrumented
+@transaction.atomic
+def bulk_recalculate_schedules(schedules: Iterable[BillingSchedule], *, from_dt: datetime,
+                               batch_size: int = 500) -> int:
+    """
+    Пакетный пересчет next_run_at + синхронизация Subscription.next_billing_at.
+
+    Назначение:
+    - все новые next_run_at считаются в памяти одним векторным расчетом (calculate_next_run_at_batch)
+    - запись идет через bulk_update: одно UPDATE на BillingSchedule и одно на Subscription (на batch_size строк)
+      вместо UPDATE + SELECT + UPDATE на каждую строку
+
+    Ожидает актуальные расписания (is_current=True) с select_related("subscription").
+    Subscription.last_billed_at записывается тем же bulk_update (значение выставляет журнал списаний,
+    см. services/ledger_service.py). Изменения next_billing_at — одним bulk_create в outbox.
+    Возвращает количество пересчитанных расписаний.
+    """
+    schedules = list(schedules)
+    if not schedules:
+        return 0
+
+    now = timezone.now()
+    next_runs = calculate_next_run_at_batch(schedules, from_dt=from_dt)
+    # Актуальное расписание у подписки одно (uniq_billing_schedule_current): одна подписка на расписание
+    subs: list[Subscription] = []
+    # subscription_id -> next_billing_at до пересчета
+    previous: dict[int, Optional[datetime]] = {}
+
+    for schedule, next_run_at in zip(schedules, next_runs):
+        schedule.next_run_at = next_run_at
+        # bulk_update не обрабатывает auto_now, проставляем вручную
+        schedule.update_at = now
+
+        sub = schedule.subscription
+        previous[sub.pk] = sub.next_billing_at
+        sub.next_billing_at = next_run_at
+        sub.update_at = now
+        subs.append(sub)
+
+    BillingSchedule.objects.bulk_update(schedules, ["next_run_at", "update_at"], batch_size=batch_size)
+    Subscription.objects.bulk_update(subs, ["next_billing_at", "last_billed_at", "update_at"], batch_size=batch_size)
+    record_events(((sub, EventType.NEXT_BILLING_CHANGED,
+                    {"next_billing_at": sub.next_billing_at, "previous": previous[sub.pk]})
+                   for sub in subs if sub.next_billing_at != previous[sub.pk]),
+                  batch_size=batch_size)
+    return len(schedules)
@@ -0,0 +1,191 @@
+"""
+Catalog cache
+
+Функционал:
+- read-through кеш справочника Provider / ProviderLink
+- два уровня: process-local LRU -> Django cache (locmem в тестах, Redis-совместимый backend в проде) -> БД
+- версионирование: все ключи содержат версию каталога, инвалидация = инкремент версии
+- инвалидация по сигналам post_save/post_delete (apps.subscriptions.signals)
+
+Единица кеширования — провайдер и все его активные ссылки: выборки "ссылки провайдера X
+в регионе R на платформе P" фильтруются в памяти из закешированного списка.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+
+from django.core.cache import cache
+
+from apps.subscriptions.models import Provider, ProviderLink
+
+# TTL записей в Django cache (сек) — страховка на случай потерянной инвалидации
+CATALOG_CACHE_TIMEOUT = 60 * 60
+# Размер process-local LRU
+LOCAL_CACHE_SIZE = 2048
+# Сколько секунд процесс доверяет локально запомненной версии каталога
+# (изменения из других процессов становятся видны не позже чем через это время)
+LOCAL_VERSION_TTL = 5.0
+
+_VERSION_KEY = "catalog:version"
+_MISSING = object()
+
+
+class _LocalLRU:
+    """
+    Потокобезопасный LRU-кеш процесса (OrderedDict)
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_local = _LocalLRU(LOCAL_CACHE_SIZE)
+# (версия, момент до которого ей можно доверять)
+_local_version: list = [None, 0.0]
+
+
+def catalog_version() -> int:
+    """
+    Текущая версия каталога (локально запоминается на LOCAL_VERSION_TTL секунд)
+    """
+    version, valid_until = _local_version
+    now = time.monotonic()
+    if version is not None and now < valid_until:
+        return version
+
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        cache.add(_VERSION_KEY, 1, timeout=None)
+        version = cache.get(_VERSION_KEY, 1)
+    _local_version[:] = [version, now + LOCAL_VERSION_TTL]
+    return version
+
+
+def invalidate_catalog() -> None:
+    """
+    Инвалидация всего каталога: инкремент версии (старые ключи истекут по TTL) + очистка LRU процесса
+    """
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        # Ключа версии еще нет (или вытеснен) — любое новое значение отличается от закешированных
+        cache.set(_VERSION_KEY, int(time.time()), timeout=None)
+    _local.clear()
+    _local_version[:] = [None, 0.0]
+
+
+def _key(kind: str, ident, version: int) -> str:
+    return f"catalog:v{version}:{kind}:{ident}"
+
+
+def _load_providers(provider_ids: Iterable[int]) -> dict[int, Optional[tuple[Provider, list[ProviderLink]]]]:
+    """
+    Загрузка провайдеров и их активных ссылок из БД (2 запроса на любой набор id)
+    """
+    provider_ids = list(provider_ids)
+    result: dict[int, Optional[tuple[Provider, list[ProviderLink]]]] = dict.fromkeys(provider_ids)
+    providers = {p.pk: p for p in Provider.objects.filter(pk__in=provider_ids)}
+    links: dict[int, list[ProviderLink]] = {pk: [] for pk in providers}
+    for link in (ProviderLink.objects.filter(provider_id__in=providers, is_active=True)
+                 .order_by("provider_id", "region", "platform", "link_type")):
+        links[link.provider_id].append(link)
+    for pk, provider in providers.items():
+        result[pk] = (provider, links[pk])
+    return result
+
+
+def get_catalog_entries(provider_ids: Iterable[int]) -> dict[int, Optional[tuple[Provider, list[ProviderLink]]]]:
+    """
+    Read-through чтение (провайдер, активные ссылки) для набора id.
+
+    LRU процесса -> Django cache (get_many) -> БД (одна пачка запросов на все промахи).
+    Несуществующий провайдер -> None (тоже кешируется).
+    """
+    provider_ids = list(dict.fromkeys(provider_ids))
+    version = catalog_version()
+    result = {}
+
+    remote_keys = {}
+    for pk in provider_ids:
+        key = _key("provider", pk, version)
+        value = _local.get(key, _MISSING)
+        if value is _MISSING:
+            remote_keys[key] = pk
+        else:
+            result[pk] = value
+
+    if remote_keys:
+        for key, value in cache.get_many(list(remote_keys)).items():
+            pk = remote_keys.pop(key)
+            _local.set(key, value)
+            result[pk] = value
+
+    if remote_keys:
+        loaded = _load_providers(remote_keys.values())
+        cache.set_many({key: loaded[pk] for key, pk in remote_keys.items()}, timeout=CATALOG_CACHE_TIMEOUT)
+        for key, pk in remote_keys.items():
+            _local.set(key, loaded[pk])
+            result[pk] = loaded[pk]
+
+    return result
+
+
+def get_provider(provider_id: int) -> Optional[Provider]:
+    """
+    Провайдер по id из кеша (None если не найден)
+    """
+    entry = get_catalog_entries([provider_id])[provider_id]
+    return entry[0] if entry else None
+
+
+def get_provider_links(provider_id: int, *, region: Optional[str] = None, platform: Optional[str] = None,
+                       link_type: Optional[str] = None) -> list[ProviderLink]:
+    """
+    Активные ссылки провайдера с фильтрами region/platform/link_type (None — без фильтра)
+    """
+    entry = get_catalog_entries([provider_id])[provider_id]
+    if entry is None:
+        return []
+    return [link for link in entry[1]
+            if (region is None or link.region == region)
+            and (platform is None or link.platform == platform)
+            and (link_type is None or link.link_type == link_type)]
+
+
+def local_cache_info() -> dict:
+    """
+    Статистика LRU процесса (для метрик/тестов)
+    """
+    return {"hits": _local.hits, "misses": _local.misses, "size": len(_local), "maxsize": _local.maxsize}
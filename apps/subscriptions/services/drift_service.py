@@ -0,0 +1,204 @@
+"""
+Drift service
+
+Функционал:
+- поиск расхождений денормализованных полей Subscription с источниками истины:
+    * current_schedule — актуальная версия BillingSchedule (is_current=True)
+    * next_billing_at — next_run_at актуальной версии расписания (нет расписания — NULL)
+    * current_price_amount/current_price_currency — открытый интервал PriceHistory (effective_to = NULL)
+- исправление найденного пакетно (UPDATE ... SET поле = (подзапрос) по набору id), без поштучной синхронизации
+  через sync_subscription_next_billing / set_subscription_price
+- режим dry-run (только подсчет) и метрики прогона (gauges через sinks utils.instrumentation)
+
+Таблица обходится keyset-чанками по id; расхождения чанка ищутся anti-join'ами (NOT EXISTS) по диапазону id,
+с клиента уходят только id расходящихся подписок. В режиме исправления чанк — одна транзакция:
+SELECT ... FOR UPDATE SKIP LOCKED (строки, которые сейчас меняет сервисный слой, пропускаются до следующего
+прогона) + UPDATE + события outbox + пересчеты прогноза/агрегатов.
+"""
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, QuerySet, Subquery
+from django.utils import timezone
+
+from apps.analytics.services.aggregations import rebuild_user_spend
+from apps.subscriptions.models import BillingSchedule, PriceHistory, Subscription
+from apps.subscriptions.services.forecast_service import sync_occurrences
+from apps.subscriptions.services.outbox import record_events
+
+from utils.enums import EventType
+from utils.instrumentation import emit_gauges, instrumented
+
+logger = logging.getLogger(__name__)
+
+# Проверки в порядке исправления (next_billing_at и цена не зависят от указателя, но агрегаты расходов — да)
+DRIFT_KINDS = ("current_schedule", "next_billing_at", "current_price")
+DEFAULT_CHUNK_SIZE = 5000
+METRICS_PREFIX = "subscriptions.denormalization"
+
+
+@dataclass
+class DriftReport:
+    """
+    Итог прогона: просмотрено подписок, найдено/исправлено расхождений по видам
+    """
+    dry_run: bool = False
+    scanned: int = 0
+    chunks: int = 0
+    drift: Counter = field(default_factory=Counter)
+    repaired: Counter = field(default_factory=Counter)
+
+    @property
+    def total(self) -> int:
+        return sum(self.drift.values())
+
+    def as_metrics(self, prefix: str = METRICS_PREFIX) -> dict[str, int]:
+        """
+        Плоский словарь метрик {"<prefix>.drift.next_billing_at": n, ...}
+        """
+        metrics = {f"{prefix}.scanned": self.scanned}
+        for kind in DRIFT_KINDS:
+            metrics[f"{prefix}.drift.{kind}"] = self.drift[kind]
+            if not self.dry_run:
+                metrics[f"{prefix}.repaired.{kind}"] = self.repaired[kind]
+        return metrics
+
+
+def _current_schedules() -> QuerySet:
+    return BillingSchedule.objects.filter(subscription=OuterRef("pk"), is_current=True)
+
+
+def _open_prices() -> QuerySet:
+    return PriceHistory.objects.filter(subscription=OuterRef("pk"), effective_to__isnull=True)
+
+
+def _latest_open_price(field_name: str) -> Subquery:
+    # При нескольких открытых интервалах (ошибка данных) истина — более поздний, как в pricing_service
+    return Subquery(_open_prices().order_by("-effective_from", "-id").values(field_name)[:1])
+
+
+def schedule_pointer_drift(queryset: QuerySet) -> QuerySet:
+    """
+    Подписки, current_schedule которых не указывает на актуальную версию расписания
+    (указатель пуст при наличии версии, указывает на старую/чужую версию или версии нет вовсе)
+    """
+    return (queryset.filter(~Exists(_current_schedules().filter(pk=OuterRef("current_schedule_id"))))
+            .filter(Exists(_current_schedules()) | Q(current_schedule__isnull=False)))
+
+
+def next_billing_drift(queryset: QuerySet) -> QuerySet:
+    """
+    Подписки, next_billing_at которых не совпадает с next_run_at актуальной версии расписания
+    """
+    return (queryset.filter(~Exists(_current_schedules().filter(next_run_at=OuterRef("next_billing_at"))))
+            .filter(Exists(_current_schedules()) | Q(next_billing_at__isnull=False)))
+
+
+def price_drift(queryset: QuerySet) -> QuerySet:
+    """
+    Подписки, current_price_* которых не совпадает с открытым интервалом PriceHistory
+    (подписки без открытого интервала не проверяются — исправлять не из чего)
+    """
+    return queryset.filter(Exists(_open_prices()),
+                           ~Exists(_open_prices().filter(amount=OuterRef("current_price_amount"),
+                                                         currency=OuterRef("current_price_currency"))))
+
+
+_DETECTORS = {
+    "current_schedule": schedule_pointer_drift,
+    "next_billing_at": next_billing_drift,
+    "current_price": price_drift,
+}
+
+
+def _locked(queryset: QuerySet) -> QuerySet:
+    return queryset.select_for_update(skip_locked=True, of=("self",))
+
+
+def _repair_chunk(chunk: QuerySet, now: datetime, report: DriftReport) -> None:
+    """
+    Исправление расхождений одного чанка (вызывать внутри транзакции)
+    """
+    spend_users: set[int] = set()
+
+    rows = list(_locked(schedule_pointer_drift(chunk)).values_list("pk", "user_id"))
+    report.drift["current_schedule"] += len(rows)
+    if rows:
+        report.repaired["current_schedule"] += (
+            Subscription.objects.filter(pk__in=[pk for pk, _ in rows])
+            .update(current_schedule=Subquery(_current_schedules().values("pk")[:1]), update_at=now))
+        spend_users.update(user_id for _, user_id in rows)
+
+    rows = list(_locked(next_billing_drift(chunk))
+                .annotate(actual=Subquery(_current_schedules().values("next_run_at")[:1]))
+                .values_list("pk", "user_id", "next_billing_at", "actual"))
+    report.drift["next_billing_at"] += len(rows)
+    if rows:
+        report.repaired["next_billing_at"] += (
+            Subscription.objects.filter(pk__in=[row[0] for row in rows])
+            .update(next_billing_at=Subquery(_current_schedules().values("next_run_at")[:1]), update_at=now))
+        record_events((Subscription(pk=pk, user_id=user_id), EventType.NEXT_BILLING_CHANGED,
+                       {"next_billing_at": actual, "previous": previous, "repair": True})
+                      for pk, user_id, previous, actual in rows)
+
+    rows = list(_locked(price_drift(chunk))
+                .annotate(amount=_latest_open_price("amount"), currency=_latest_open_price("currency"))
+                .values_list("pk", "user_id", "amount", "currency", "price_version"))
+    report.drift["current_price"] += len(rows)
+    if rows:
+        price_ids = [row[0] for row in rows]
+        # Версия цены увеличивается: клиент, видевший неверную цену, получит конфликт (PriceVersionConflict)
+        report.repaired["current_price"] += (
+            Subscription.objects.filter(pk__in=price_ids)
+            .update(current_price_amount=_latest_open_price("amount"),
+                    current_price_currency=_latest_open_price("currency"),
+                    price_version=F("price_version") + 1, update_at=now))
+        record_events((Subscription(pk=pk, user_id=user_id), EventType.PRICE_CHANGED,
+                       {"amount": amount, "currency": currency, "price_version": version + 1, "repair": True})
+                      for pk, user_id, amount, currency, version in rows)
+        sync_occurrences(price_ids, now=now, rebuild=True)
+        spend_users.update(row[1] for row in rows)
+
+    if spend_users:
+        rebuild_user_spend(spend_users)
+
+
+@instrumented
+def audit_denormalization(*, dry_run: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                          now: Optional[datetime] = None) -> DriftReport:
+    """
+    Прогон по всем подпискам: поиск (dry_run=True) или поиск + исправление расхождений денормализации.
+
+    На чанк: 1 запрос id (keyset) + 3 anti-join запроса; при исправлении — UPDATE на вид расхождения
+    и пересчеты только для затронутых подписок.
+    """
+    now = now or timezone.now()
+    report = DriftReport(dry_run=dry_run)
+
+    last_id = 0
+    while True:
+        ids = list(Subscription.objects.filter(pk__gt=last_id).order_by("pk")
+                   .values_list("pk", flat=True)[:chunk_size])
+        if not ids:
+            break
+        last_id = ids[-1]
+        report.scanned += len(ids)
+        report.chunks += 1
+        # Диапазон по PK вместо IN (...) — range scan по первичному ключу
+        chunk = Subscription.objects.filter(pk__gte=ids[0], pk__lte=ids[-1])
+
+        if dry_run:
+            for kind, detector in _DETECTORS.items():
+                report.drift[kind] += detector(chunk).count()
+        else:
+            with transaction.atomic():
+                _repair_chunk(chunk, now, report)
+
+    emit_gauges(report.as_metrics())
+    return report
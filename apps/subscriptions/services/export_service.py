@@ -0,0 +1,107 @@
+"""
+Export service
+
+Функционал:
+- потоковая выгрузка подписок, истории цен и расписаний (CSV / NDJSON)
+- выгрузка пользователя и полная выгрузка (для администратора/compliance)
+
+Строки читаются server-side курсором (QuerySet.iterator(chunk_size=...)) через values(),
+без создания моделей и сериализаторов — память не зависит от объема выгрузки.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from typing import Iterable, Iterator, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+
+from apps.subscriptions.models import BillingSchedule, PriceHistory, Subscription
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Набор полей по типу выгрузки
+EXPORT_FIELDS = {
+    'subscriptions': ['id', 'user_id', 'title', 'description', 'status', 'provider_id', 'category_id',
+                      'started_at', 'ended_at', 'payment_method_label', 'owner_note', 'is_shared',
+                      'current_price_amount', 'current_price_currency', 'next_billing_at',
+                      'billing_timezone', 'last_billed_at', 'create_at', 'update_at'],
+    'price_history': ['id', 'subscription_id', 'amount', 'currency', 'effective_from', 'effective_to',
+                      'change_reason', 'source', 'create_at'],
+    'schedules': ['id', 'subscription_id', 'period_unit', 'period_interval', 'anchor_day', 'anchor_weekday',
+                  'trial_ends_at', 'grace_days', 'next_run_at', 'is_current', 'create_at', 'update_at'],
+}
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+
+def _export_queryset(kind: str, user=None) -> QuerySet:
+    if kind == 'subscriptions':
+        queryset = Subscription.objects.all()
+        user_filter = {'user': user}
+    elif kind == 'price_history':
+        queryset = PriceHistory.objects.all()
+        user_filter = {'subscription__user': user}
+    elif kind == 'schedules':
+        queryset = BillingSchedule.objects.all()
+        user_filter = {'subscription__user': user}
+    else:
+        raise ValueError(f'Неизвестный тип выгрузки: {kind}')
+
+    if user is not None:
+        queryset = queryset.filter(**user_filter)
+    return queryset.order_by('id')
+
+
+def iter_export_rows(kind: str, *, user=None, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Строки выгрузки (dict) по типу; user=None — по всем пользователям
+    """
+    return _export_queryset(kind, user).values(*EXPORT_FIELDS[kind]).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """
+    "Файл" для csv.writer, который возвращает строку вместо записи
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows: Iterable[dict], fields: list[str]) -> Iterator[str]:
+    """
+    CSV построчно: заголовок, затем строки
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([row[name] for name in fields])
+
+
+def iter_ndjson(rows: Iterable[dict]) -> Iterator[str]:
+    """
+    NDJSON (JSON Lines): объект на строку
+    """
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def stream_export(kind: str, fmt: str, *, user=None, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Генератор содержимого выгрузки для StreamingHttpResponse
+    """
+    if kind not in EXPORT_FIELDS:
+        raise ValueError(f'Неизвестный тип выгрузки: {kind}')
+    rows = iter_export_rows(kind, user=user, chunk_size=chunk_size)
+    if fmt == 'csv':
+        return iter_csv(rows, EXPORT_FIELDS[kind])
+    if fmt == 'ndjson':
+        return iter_ndjson(rows)
+    raise ValueError(f'Неподдерживаемый формат выгрузки: {fmt}')
+
+
+def export_filename(kind: str, fmt: str, user: Optional[object] = None) -> str:
+    scope = f'user_{user.pk}' if user is not None else 'all'
+    return f'{kind}_{scope}.{fmt}'
@@ -0,0 +1,171 @@
+"""
+Forecast service
+
+Функционал:
+- материализация будущих списаний (BillingOccurrence) из BillingSchedule + PriceHistory
+- инкрементальное обновление при смене расписания/цены/статуса и при сдвиге горизонта
+- range-запросы прогноза по пользователю
+"""
+from __future__ import annotations
+
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, QuerySet, Sum
+from django.utils import timezone
+
+from apps.analytics.services.fx import convert_many
+from apps.subscriptions.models import BillingOccurrence, BillingSchedule, PriceHistory, Subscription
+from apps.subscriptions.services.billing_service import calculate_next_run_at
+
+from utils.date_calculator import get_tzinfo
+from utils.enums import Status
+from utils.instrumentation import instrumented
+
+# Горизонт материализации (дней вперед)
+FORECAST_HORIZON_DAYS = 365
+# Статусы, по которым ожидаются будущие списания
+FORECAST_STATUSES = (Status.ACTIVE, Status.TRIAL)
+
+
+class _PriceTimeline:
+    """
+    Цена подписки во времени по интервалам PriceHistory [effective_from, effective_to)
+    """
+
+    def __init__(self, sub: Subscription, prices: list[PriceHistory]):
+        self.sub = sub
+        self.prices = sorted(prices, key=lambda p: p.effective_from)
+        self.starts = [p.effective_from for p in self.prices]
+
+    def at(self, moment: datetime) -> tuple[Decimal, str]:
+        idx = bisect_right(self.starts, moment) - 1
+        if idx >= 0:
+            price = self.prices[idx]
+            if price.effective_to is None or moment < price.effective_to:
+                return price.amount, price.currency
+        # Нет интервала на этот момент — берем денормализованную текущую цену
+        return self.sub.current_price_amount, self.sub.current_price_currency
+
+
+def _generate(schedule: BillingSchedule, timeline: _PriceTimeline, *, after: Optional[datetime],
+              until: datetime) -> list[BillingOccurrence]:
+    """
+    Разворачивает правило расписания в список списаний на интервале (after, until].
+    after=None — начиная с schedule.next_run_at включительно.
+    """
+    sub = schedule.subscription
+    tzone = get_tzinfo(sub)
+    current = schedule.next_run_at
+    if after is not None:
+        current = calculate_next_run_at(schedule, from_dt=after, tzone=tzone)
+
+    result = []
+    while current <= until:
+        amount, currency = timeline.at(current)
+        result.append(BillingOccurrence(subscription=sub, user_id=sub.user_id, occurs_at=current,
+                                        amount=amount, currency=currency))
+        current = calculate_next_run_at(schedule, from_dt=current, tzone=tzone)
+    return result
+
+
+@instrumented
+@transaction.atomic
+def sync_occurrences(subscription_ids: Iterable[int], *, now: Optional[datetime] = None,
+                     rebuild: bool = False) -> int:
+    """
+    Инкрементальное обновление материализованных списаний для набора подписок.
+
+    - прошедшие списания (< now) удаляются одним DELETE
+    - если первое будущее списание совпадает с BillingSchedule.next_run_at — достраивается только "хвост"
+      от последнего материализованного списания до горизонта
+    - иначе (сменилось расписание/цена/статус или rebuild=True) серия подписки строится заново
+
+    Количество запросов не зависит от числа подписок. Возвращает количество созданных записей.
+    """
+    subscription_ids = list(subscription_ids)
+    if not subscription_ids:
+        return 0
+
+    now = now or timezone.now()
+    until = now + timedelta(days=FORECAST_HORIZON_DAYS)
+
+    BillingOccurrence.objects.filter(subscription_id__in=subscription_ids, occurs_at__lt=now).delete()
+
+    bounds = {}
+    if not rebuild:
+        bounds = {row["subscription_id"]: (row["first"], row["last"])
+                  for row in BillingOccurrence.objects.filter(subscription_id__in=subscription_ids)
+                  .values("subscription_id").annotate(first=Min("occurs_at"), last=Max("occurs_at"))}
+
+    # Актуальное расписание подписки единственно (uniq_billing_schedule_current)
+    schedules = {schedule.subscription_id: schedule
+                 for schedule in (BillingSchedule.objects.select_related("subscription")
+                                  .filter(subscription_id__in=subscription_ids, is_current=True))}
+
+    prices: dict[int, list[PriceHistory]] = {}
+    for price in PriceHistory.objects.filter(Q(effective_to__isnull=True) | Q(effective_to__gt=now),
+                                             subscription_id__in=subscription_ids):
+        prices.setdefault(price.subscription_id, []).append(price)
+
+    rebuild_ids = []
+    to_create = []
+    for sub_id in subscription_ids:
+        schedule = schedules.get(sub_id)
+        first, last = bounds.get(sub_id, (None, None))
+        if schedule is None or schedule.subscription.status not in FORECAST_STATUSES:
+            if first is not None or rebuild:
+                rebuild_ids.append(sub_id)
+            continue
+
+        timeline = _PriceTimeline(schedule.subscription, prices.get(sub_id, []))
+        if first is not None and first == schedule.next_run_at:
+            to_create.extend(_generate(schedule, timeline, after=last, until=until))
+        else:
+            rebuild_ids.append(sub_id)
+            to_create.extend(_generate(schedule, timeline, after=None, until=until))
+
+    if rebuild_ids:
+        BillingOccurrence.objects.filter(subscription_id__in=rebuild_ids).delete()
+    BillingOccurrence.objects.bulk_create(to_create, batch_size=1000)
+    return len(to_create)
+
+
+def refresh_subscription_occurrences(sub: Subscription, *, now: Optional[datetime] = None) -> int:
+    """
+    Полная пересборка прогноза подписки (смена расписания, цены или статуса)
+    """
+    return sync_occurrences([sub.pk], now=now, rebuild=True)
+
+
+def upcoming_occurrences(user, *, date_from: datetime, date_to: datetime) -> QuerySet:
+    """
+    Будущие списания пользователя на интервале [date_from, date_to) (индекс user + occurs_at)
+    """
+    return (BillingOccurrence.objects.select_related("subscription")
+            .filter(user=user, occurs_at__gte=date_from, occurs_at__lt=date_to)
+            .order_by("occurs_at"))
+
+
+def upcoming_totals(user, *, date_from: datetime, date_to: datetime) -> list[dict]:
+    """
+    Итоги прогноза по валютам: [{"currency": "USD", "amount": Decimal, "count": int}, ...]
+    """
+    return list(BillingOccurrence.objects.filter(user=user, occurs_at__gte=date_from, occurs_at__lt=date_to)
+                .values("currency").annotate(amount=Sum("amount"), count=Count("id")).order_by("currency"))
+
+
+def upcoming_total_in(user, *, date_from: datetime, date_to: datetime, currency: str) -> Decimal:
+    """
+    Итог прогноза в одной валюте: каждое списание пересчитывается по курсу на свою дату
+    (после последнего известного курса — по последнему), векторно по всем списаниям
+    """
+    rows = list(BillingOccurrence.objects.filter(user=user, occurs_at__gte=date_from, occurs_at__lt=date_to)
+                .values_list("amount", "currency", "occurs_at"))
+    if not rows:
+        return Decimal("0.00")
+    amounts, currencies, dates = zip(*rows)
+    return convert_many(amounts, currencies, dates, to=currency).sum()
@@ -0,0 +1,284 @@
+"""
+Import service
+
+Функционал:
+- потоковое чтение CSV / JSON (массив или JSON Lines) построчно
+- пакетная валидация строк
+- пакетное создание Subscription + PriceHistory + BillingSchedule (bulk_create)
+- пакетный расчет next_run_at
+
+Память ограничена размером пачки (batch_size), а не размером файла.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import IO, Iterable, Iterator
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from apps.analytics.services.aggregations import rebuild_user_spend
+from apps.subscriptions.models import BillingSchedule, Category, PriceHistory, Provider, Subscription
+from apps.subscriptions.services.billing_service import calculate_next_run_at_batch, validate_billing_schedule_params
+from apps.subscriptions.services.forecast_service import sync_occurrences
+from apps.subscriptions.services.outbox import record_events
+
+from utils.enums import EventType, PeriodUnit, Source, Status
+from utils.instrumentation import instrumented
+from utils.validators import invalid_currencies, validator_timezone
+
+# Максимум сообщений об ошибках в результате импорта
+MAX_REPORTED_ERRORS = 100
+_JSON_CHUNK_SIZE = 64 * 1024
+# Максимальный размер одного JSON-объекта в буфере: дальше — ошибка формата, а не чтение файла до конца
+_JSON_MAX_BUFFER = 16 * _JSON_CHUNK_SIZE
+
+
+class ImportRowSerializer(serializers.Serializer):
+    """
+    Строка импорта подписки
+
+    category/provider — slug справочника
+    """
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False, allow_null=True)
+    status = serializers.ChoiceField(choices=Status.choices, default=Status.ACTIVE)
+    category = serializers.SlugField(required=False, allow_null=True)
+    provider = serializers.SlugField(required=False, allow_null=True)
+    started_at = serializers.DateField(required=False, allow_null=True)
+    ended_at = serializers.DateField(required=False, allow_null=True)
+    payment_method_label = serializers.CharField(max_length=64, required=False, allow_null=True)
+    owner_note = serializers.CharField(max_length=255, required=False, allow_null=True)
+
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0)
+    # Валюта проверяется пакетно в import_subscriptions (invalid_currencies)
+    currency = serializers.CharField(max_length=3)
+    price_effective_from = serializers.DateTimeField(required=False, allow_null=True)
+
+    period_unit = serializers.ChoiceField(choices=PeriodUnit.choices)
+    period_interval = serializers.IntegerField(min_value=1, default=1)
+    anchor_day = serializers.IntegerField(min_value=1, max_value=31, required=False, allow_null=True)
+    anchor_weekday = serializers.IntegerField(min_value=0, max_value=6, required=False, allow_null=True)
+    trial_ends_at = serializers.DateTimeField(required=False, allow_null=True)
+    grace_days = serializers.IntegerField(min_value=0, default=0)
+    billing_timezone = serializers.CharField(max_length=64, required=False, allow_null=True,
+                                             validators=[validator_timezone])
+
+    def validate(self, attrs):
+        try:
+            validate_billing_schedule_params(period_unit=attrs['period_unit'],
+                                             period_interval=attrs['period_interval'],
+                                             anchor_day=attrs.get('anchor_day'),
+                                             anchor_weekday=attrs.get('anchor_weekday'),
+                                             grace_days=attrs['grace_days'])
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return attrs
+
+
+@dataclass
+class ImportResult:
+    """
+    Итог импорта
+    """
+    created: int = 0
+    failed: int = 0
+    # (номер строки, ошибки) — первые MAX_REPORTED_ERRORS
+    errors: list[tuple[int, dict]] = field(default_factory=list)
+
+
+def iter_csv_rows(stream: IO[str]) -> Iterator[dict]:
+    """
+    Построчное чтение CSV с заголовком; пустые ячейки -> None
+    """
+    for row in csv.DictReader(stream):
+        yield {key.strip(): (value if value != '' else None) for key, value in row.items() if key}
+
+
+def iter_json_rows(stream: IO[str]) -> Iterator[dict]:
+    """
+    Потоковое чтение JSON: массив объектов или JSON Lines (объект на строку).
+
+    Объекты декодируются по одному из буфера, весь файл в память не загружается.
+    Объект, который не декодируется и в буфере _JSON_MAX_BUFFER, — ошибка формата (ValueError с номером строки):
+    поврежденный элемент не дочитывает остаток файла в память. Уже созданные пачки импорта остаются.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    row_number = 0
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,[')
+        if buffer.startswith(']'):
+            buffer = buffer[1:]
+            continue
+        if not buffer:
+            if eof:
+                return
+            chunk = stream.read(_JSON_CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError as e:
+            if eof or len(buffer) > _JSON_MAX_BUFFER:
+                raise ValueError(f'Строка {row_number + 1}: некорректный JSON ({e.msg})') from e
+            chunk = stream.read(_JSON_CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        row_number += 1
+        yield obj
+
+
+def _batches(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _resolve_slugs(model, slugs: set[str], cache: dict[str, int]) -> None:
+    """
+    Догружает id справочника по slug одним запросом на пачку
+    """
+    missing = slugs - cache.keys()
+    if missing:
+        cache.update(model.objects.filter(slug__in=missing).values_list('slug', 'pk'))
+
+
+@transaction.atomic
+def _import_batch(user, rows: list[dict], *, now) -> list[int]:
+    """
+    Создание одной пачки: 3 INSERT (Subscription, BillingSchedule, PriceHistory)
+    + UPDATE указателей Subscription.current_schedule + события outbox (bulk) + прогноз.
+    Возвращает id созданных подписок.
+    """
+    subs = []
+    schedules = []
+    for row in rows:
+        sub = Subscription(user=user,
+                           provider_id=row.get('provider_id'),
+                           category_id=row.get('category_id'),
+                           title=row['title'],
+                           description=row.get('description'),
+                           status=row['status'],
+                           started_at=row.get('started_at'),
+                           ended_at=row.get('ended_at'),
+                           payment_method_label=row.get('payment_method_label'),
+                           owner_note=row.get('owner_note'),
+                           current_price_amount=row['amount'],
+                           current_price_currency=row['currency'],
+                           billing_timezone=row.get('billing_timezone'))
+        subs.append(sub)
+        schedules.append(BillingSchedule(subscription=sub,
+                                         period_unit=row['period_unit'],
+                                         period_interval=row['period_interval'],
+                                         anchor_day=row.get('anchor_day'),
+                                         anchor_weekday=row.get('anchor_weekday'),
+                                         trial_ends_at=row.get('trial_ends_at'),
+                                         grace_days=row['grace_days'],
+                                         is_current=True))
+
+    # next_run_at считаем до вставки — next_billing_at уходит в том же INSERT
+    for sub, schedule, next_run_at in zip(subs, schedules, calculate_next_run_at_batch(schedules, from_dt=now)):
+        schedule.next_run_at = next_run_at
+        sub.next_billing_at = next_run_at
+
+    # subscription_id расписаний и цен берется из pk подписок после вставки
+    Subscription.objects.bulk_create(subs)
+    BillingSchedule.objects.bulk_create(schedules)
+    for sub, schedule in zip(subs, schedules):
+        sub.current_schedule = schedule
+    Subscription.objects.bulk_update(subs, ["current_schedule"])
+    PriceHistory.objects.bulk_create([PriceHistory(subscription=sub,
+                                                   amount=row['amount'],
+                                                   currency=row['currency'],
+                                                   effective_from=row.get('price_effective_from') or now,
+                                                   change_reason='import',
+                                                   source=Source.IMPORT)
+                                      for sub, row in zip(subs, rows)])
+    # Как при создании через create_subscription_with_defaults: первое next_billing_at
+    record_events((sub, EventType.NEXT_BILLING_CHANGED, {"next_billing_at": sub.next_billing_at, "previous": None})
+                  for sub in subs)
+
+    sub_ids = [sub.pk for sub in subs]
+    sync_occurrences(sub_ids, now=now, rebuild=True)
+    return sub_ids
+
+
+@instrumented
+def import_subscriptions(user, rows: Iterable[dict], *, batch_size: int = 1000) -> ImportResult:
+    """
+    Импорт подписок пользователя из потока строк (iter_csv_rows / iter_json_rows).
+
+    - строки валидируются пачками (ImportRowSerializer)
+    - ошибочные строки пропускаются и попадают в отчет
+    - каждая пачка создается в отдельной транзакции
+    - агрегаты расходов пересчитываются один раз в конце
+    """
+    result = ImportResult()
+    categories: dict[str, int] = {}
+    providers: dict[str, int] = {}
+    row_number = 0
+
+    for batch in _batches(rows, batch_size):
+        valid_rows = []
+        for raw in batch:
+            row_number += 1
+            serializer = ImportRowSerializer(data=raw)
+            if serializer.is_valid():
+                valid_rows.append((row_number, serializer.validated_data))
+            else:
+                result.failed += 1
+                if len(result.errors) < MAX_REPORTED_ERRORS:
+                    result.errors.append((row_number, serializer.errors))
+
+        _resolve_slugs(Category, {row['category'] for _, row in valid_rows if row.get('category')}, categories)
+        _resolve_slugs(Provider, {row['provider'] for _, row in valid_rows if row.get('provider')}, providers)
+
+        bad_currencies = invalid_currencies(row['currency'] for _, row in valid_rows)
+
+        ready = []
+        for number, row in valid_rows:
+            errors = {}
+            if row['currency'] in bad_currencies:
+                errors['currency'] = [f'Валюта не найдена: {row["currency"]}']
+            if row.get('category'):
+                row['category_id'] = categories.get(row['category'])
+                if row['category_id'] is None:
+                    errors['category'] = [f'Категория не найдена: {row["category"]}']
+            if row.get('provider'):
+                row['provider_id'] = providers.get(row['provider'])
+                if row['provider_id'] is None:
+                    errors['provider'] = [f'Провайдер не найден: {row["provider"]}']
+            if errors:
+                result.failed += 1
+                if len(result.errors) < MAX_REPORTED_ERRORS:
+                    result.errors.append((number, errors))
+            else:
+                ready.append(row)
+
+        if ready:
+            result.created += len(_import_batch(user, ready, now=timezone.now()))
+
+    if result.created:
+        rebuild_user_spend([user.pk])
+    return result
+
+
+def open_rows(stream: IO[str], fmt: str) -> Iterator[dict]:
+    """
+    Итератор строк по формату файла: csv | json | jsonl
+    """
+    if fmt == 'csv':
+        return iter_csv_rows(stream)
+    if fmt in ('json', 'jsonl', 'ndjson'):
+        return iter_json_rows(stream)
+    raise ValueError(f'Неподдерживаемый формат импорта: {fmt}')
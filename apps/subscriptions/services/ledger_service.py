@@ -0,0 +1,62 @@
+"""
+Ledger service
+
+Функционал:
+- журнал фактических списаний (BillingEvent) по просроченным расписаниям
+- все наступившие списания расписания (включая пропущенные при простое) — calculate_catch_up
+- цена каждого списания — из интервалов PriceHistory (один запрос на пачку, sweep-line)
+- запись одним bulk_create с ignore_conflicts: ключ (schedule, occurrence_at) делает повторы no-op
+
+Subscription.last_billed_at выставляется в памяти; сохраняет его вызывающий
+тем же пакетным UPDATE, что и next_billing_at (bulk_recalculate_schedules).
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Sequence
+
+from apps.subscriptions.models import BillingEvent, BillingSchedule, PriceHistory
+from apps.subscriptions.services.billing_service import calculate_catch_up
+from apps.subscriptions.services.pricing_service import price_intervals, prices_for_moments
+
+from utils.enums import Status
+from utils.instrumentation import instrumented
+
+# Статусы подписок, по которым фиксируются списания
+BILLABLE_STATUSES = (Status.ACTIVE,)
+_ONE_US = timedelta(microseconds=1)
+
+
+@instrumented
+def record_due_charges(schedules: Sequence[BillingSchedule], *, now: datetime, batch_size: int = 1000) -> int:
+    """
+    Списания просроченных расписаний (next_run_at <= now) -> BillingEvent.
+
+    Вызывать до пересчета next_run_at. Ожидает расписания с select_related("subscription").
+    Возвращает количество списаний (включая уже записанные ранее).
+    """
+    due: list[tuple[BillingSchedule, tuple[datetime, ...]]] = []
+    for schedule in schedules:
+        if schedule.subscription.status not in BILLABLE_STATUSES or schedule.next_run_at > now:
+            continue
+        due.append((schedule, calculate_catch_up(schedule, now=now, with_missed=True).missed))
+    if not due:
+        return 0
+
+    prices: dict[int, list[PriceHistory]] = {}
+    for price in price_intervals({schedule.subscription_id for schedule, _ in due},
+                                 date_from=min(missed[0] for _, missed in due), date_to=now + _ONE_US):
+        prices.setdefault(price.subscription_id, []).append(price)
+
+    events = []
+    for schedule, missed in due:
+        sub = schedule.subscription
+        for occurrence_at, price in zip(missed, prices_for_moments(missed, prices.get(sub.pk, []))):
+            events.append(BillingEvent(subscription=sub, schedule=schedule, occurrence_at=occurrence_at,
+                                       amount=price.amount if price else sub.current_price_amount,
+                                       currency=price.currency if price else sub.current_price_currency))
+        if sub.last_billed_at is None or sub.last_billed_at < missed[-1]:
+            sub.last_billed_at = missed[-1]
+
+    BillingEvent.objects.bulk_create(events, ignore_conflicts=True, batch_size=batch_size)
+    return len(events)
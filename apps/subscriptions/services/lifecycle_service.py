@@ -0,0 +1,141 @@
+"""
+Lifecycle service
+
+Функционал:
+- TRIAL -> ACTIVE: пробный период актуального расписания закончился (trial_ends_at <= now),
+  первое списание уже рассчитано от конца trial (calculate_next_run_at)
+- ACTIVE/PAUSED/CANCELED -> EXPIRED: подписка закончилась (ended_at) и льготный период
+  актуального расписания (grace_days) истек
+
+Кандидаты выбираются через частичные индексы (billing_schedule_trial_idx, subscription_ending_idx),
+чанками по id с SELECT ... FOR UPDATE SKIP LOCKED; переходы применяются UPDATE по набору id
+(один запрос на исходный статус). Для переведенных подписок — события outbox, прогноз и агрегаты расходов.
+"""
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.analytics.services.aggregations import rebuild_user_spend
+from apps.subscriptions.models import BillingSchedule, Subscription
+from apps.subscriptions.services.forecast_service import sync_occurrences
+from apps.subscriptions.services.outbox import record_events
+
+from utils.db_functions import AddDays
+from utils.enums import EventType, Status
+from utils.instrumentation import instrumented
+
+logger = logging.getLogger(__name__)
+
+# Статусы, из которых подписка истекает по ended_at + grace_days
+EXPIRING_STATUSES = (Status.ACTIVE, Status.PAUSED, Status.CANCELED)
+DEFAULT_CHUNK_SIZE = 1000
+
+
+@dataclass
+class LifecycleSweepResult:
+    """
+    Итог прогона: количество подписок по переходам {(из, в): n}
+    """
+    transitions: Counter = field(default_factory=Counter)
+
+    @property
+    def total(self) -> int:
+        return sum(self.transitions.values())
+
+
+def trial_candidates(now: datetime) -> QuerySet:
+    """
+    Актуальные расписания TRIAL-подписок, пробный период которых закончился
+
+    Запрос начинается с BillingSchedule: диапазон trial_ends_at <= now читается из частичного индекса
+    billing_schedule_trial_idx, подписка присоединяется по FK (JOIN, а не подзапрос pk IN (...)),
+    поэтому TRIAL-подписки не перебираются.
+    """
+    return BillingSchedule.objects.filter(is_current=True, trial_ends_at__isnull=False, trial_ends_at__lte=now,
+                                          subscription__status=Status.TRIAL)
+
+
+def ending_candidates(today: date) -> QuerySet:
+    """
+    Подписки, закончившиеся вместе с льготным периодом (ended_at + grace_days < today) — кандидаты на EXPIRED
+
+    ended_at < today отбирает по индексу subscription_ending_idx, льготный период проверяется в том же запросе —
+    подписки внутри grace не захватываются (FOR UPDATE) и не читаются.
+    """
+    return (Subscription.objects.filter(status__in=EXPIRING_STATUSES, ended_at__isnull=False, ended_at__lt=today)
+            .alias(grace_end=AddDays("ended_at", Coalesce("current_schedule__grace_days", 0)))
+            .filter(grace_end__lt=today))
+
+
+def _apply(rows: list[tuple[int, int, str]], to_status: str, now: datetime,
+           result: LifecycleSweepResult) -> None:
+    """
+    Переход набора подписок [(id, user_id, статус)] в to_status: UPDATE на каждый исходный статус + события outbox
+    """
+    by_status: dict[str, list[tuple[int, int]]] = {}
+    for pk, user_id, status in rows:
+        by_status.setdefault(status, []).append((pk, user_id))
+
+    for status, subs in by_status.items():
+        updated = (Subscription.objects.filter(pk__in=[pk for pk, _ in subs], status=status)
+                   .update(status=to_status, update_at=now))
+        result.transitions[(status, to_status)] += updated
+        record_events((Subscription(pk=pk, user_id=user_id), EventType.STATUS_CHANGED,
+                       {"status": to_status, "previous": status})
+                      for pk, user_id in subs)
+
+
+def _sweep(candidates: QuerySet, to_status: str, now: datetime, chunk_size: int,
+           result: LifecycleSweepResult, *, via: Optional[str] = None) -> None:
+    """
+    Keyset-обход кандидатов чанками по id подписки; каждый чанк — одна транзакция
+    (захват SKIP LOCKED + UPDATE + пересчеты)
+
+    via — FK на подписку, если кандидаты — не Subscription (например, BillingSchedule):
+    подписка присоединяется select_related, блокируются только ее строки.
+    """
+    key = f"{via}_id" if via else "pk"
+    locked = candidates.select_for_update(skip_locked=True, of=(via or "self",))
+    if via:
+        locked = locked.select_related(via)
+
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(locked.filter(**{f"{key}__gt": last_id}).order_by(key)[:chunk_size])
+            if not chunk:
+                return
+            last_id = getattr(chunk[-1], key)
+            subs = [getattr(row, via) for row in chunk] if via else chunk
+            rows = [(sub.pk, sub.user_id, sub.status) for sub in subs]
+
+            _apply(rows, to_status, now, result)
+            sync_occurrences([pk for pk, _, _ in rows], now=now, rebuild=True)
+            rebuild_user_spend({user_id for _, user_id, _ in rows})
+
+
+@instrumented
+def sweep_subscription_lifecycle(*, now: Optional[datetime] = None,
+                                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> LifecycleSweepResult:
+    """
+    Периодический прогон переходов статусов (trial -> active, окончание + grace -> expired)
+    """
+    now = now or timezone.now()
+    today = now.date()
+    result = LifecycleSweepResult()
+
+    _sweep(trial_candidates(now), Status.ACTIVE, now, chunk_size, result, via="subscription")
+    _sweep(ending_candidates(today), Status.EXPIRED, now, chunk_size, result)
+
+    for (from_status, to_status), count in sorted(result.transitions.items()):
+        logger.info("Subscription lifecycle: %s -> %s: %s", from_status, to_status, count)
+    return result
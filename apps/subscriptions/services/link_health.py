@@ -0,0 +1,225 @@
+"""
+Link health service
+
+Функционал:
+- асинхронная проверка ссылок провайдеров (ProviderLink) через пул соединений httpx
+- ограничение параллельности: общее и на один host
+- HEAD, при 405/501 (и других отказах HEAD) — GET без чтения тела
+- условные запросы (If-None-Match / If-Modified-Since): 304 — ссылка жива
+- запись результатов bulk_update, деактивация "мертвых" ссылок
+- обновление Provider.last_links_checked_at
+
+Сеть используется только внутри asyncio.run(), вся работа с БД — синхронная, вне event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.subscriptions.models import Provider, ProviderLink
+from apps.subscriptions.services.catalog_cache import invalidate_catalog
+
+logger = logging.getLogger(__name__)
+
+# Параметры проверки по умолчанию
+DEFAULT_CONCURRENCY = 100
+DEFAULT_PER_HOST = 4
+DEFAULT_TIMEOUT = 10.0
+# Ссылка перепроверяется не чаще, чем раз в STALE_AFTER
+STALE_AFTER = timedelta(hours=24)
+# Столько неудачных проверок подряд — ссылка деактивируется
+DEAD_AFTER_FAILURES = 3
+# Статусы, при которых ссылка деактивируется сразу
+GONE_STATUSES = frozenset({404, 410})
+# Ответы на HEAD, после которых повторяем запрос через GET (сервер не поддерживает/блокирует HEAD)
+HEAD_FALLBACK_STATUSES = frozenset({400, 403, 405, 501})
+
+USER_AGENT = "SubFlux-LinkChecker/1.0"
+
+
+@dataclass(frozen=True)
+class LinkCheckResult:
+    """
+    Результат проверки одной ссылки
+    """
+    link_id: int
+    status_code: Optional[int]
+    error: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def is_ok(self) -> bool:
+        return self.status_code is not None and (self.status_code < 400)
+
+    @property
+    def is_gone(self) -> bool:
+        return self.status_code in GONE_STATUSES
+
+
+@dataclass
+class LinkCheckSummary:
+    """
+    Итог прогона проверки
+    """
+    checked: int = 0
+    ok: int = 0
+    failed: int = 0
+    deactivated: int = 0
+
+
+def _conditional_headers(link: ProviderLink) -> dict[str, str]:
+    headers = {}
+    if link.etag:
+        headers["If-None-Match"] = link.etag
+    if link.last_modified:
+        headers["If-Modified-Since"] = link.last_modified
+    return headers
+
+
+async def _request(client: httpx.AsyncClient, method: str, url: str, headers: dict) -> httpx.Response:
+    """
+    Запрос без чтения тела ответа (для GET тело не нужно — достаточно статуса и заголовков)
+    """
+    async with client.stream(method, url, headers=headers) as response:
+        return response
+
+
+async def check_link(client: httpx.AsyncClient, link: ProviderLink, *,
+                     host_limits: dict[str, asyncio.Semaphore], per_host: int,
+                     global_limit: Optional[asyncio.Semaphore] = None) -> LinkCheckResult:
+    """
+    Проверка одной ссылки: HEAD -> (при отказе) GET, с учетом лимита на host и общего лимита.
+
+    Общий слот берется только после слота host: задача, ждущая занятый host, не держит общий слот,
+    и пачка, где преобладает один провайдер, не ограничивается per_host.
+    """
+    headers = _conditional_headers(link)
+
+    try:
+        host = urlsplit(link.url).netloc.lower()
+        async with host_limits.setdefault(host, asyncio.Semaphore(per_host)), global_limit or nullcontext():
+            response = await _request(client, "HEAD", link.url, headers)
+            if response.status_code in HEAD_FALLBACK_STATUSES:
+                response = await _request(client, "GET", link.url, headers)
+    except httpx.TimeoutException:
+        return LinkCheckResult(link_id=link.pk, status_code=None, error="timeout")
+    except (httpx.HTTPError, httpx.InvalidURL, ValueError) as e:
+        # Некорректный URL (InvalidURL не наследует HTTPError) — неудачная проверка, а не падение всей пачки
+        return LinkCheckResult(link_id=link.pk, status_code=None, error=f"{type(e).__name__}: {e}"[:255])
+
+    if response.status_code == 304:
+        # Не изменилась — сохраняем прежние валидаторы
+        return LinkCheckResult(link_id=link.pk, status_code=304, etag=link.etag, last_modified=link.last_modified)
+    return LinkCheckResult(link_id=link.pk, status_code=response.status_code,
+                           etag=response.headers.get("ETag"),
+                           last_modified=response.headers.get("Last-Modified"))
+
+
+async def check_links_async(links: Iterable[ProviderLink], *, concurrency: int = DEFAULT_CONCURRENCY,
+                            per_host: int = DEFAULT_PER_HOST,
+                            timeout: float = DEFAULT_TIMEOUT) -> list[LinkCheckResult]:
+    """
+    Параллельная проверка набора ссылок одним пулом соединений.
+
+    concurrency — общий лимит одновременных запросов (и размер пула),
+    per_host — лимит одновременных запросов к одному host.
+    """
+    links = list(links)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    host_limits: dict[str, asyncio.Semaphore] = {}
+    global_limit = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(timeout), follow_redirects=True,
+                                 headers={"User-Agent": USER_AGENT}) as client:
+        return list(await asyncio.gather(*(check_link(client, link, host_limits=host_limits, per_host=per_host,
+                                                      global_limit=global_limit) for link in links)))
+
+
+def _apply_results(links: list[ProviderLink], results: list[LinkCheckResult], *,
+                   now: datetime) -> LinkCheckSummary:
+    """
+    Запись результатов: один bulk_update по ссылкам + один UPDATE по провайдерам
+    """
+    summary = LinkCheckSummary()
+    by_id = {result.link_id: result for result in results}
+
+    for link in links:
+        result = by_id[link.pk]
+        summary.checked += 1
+        link.last_checked_at = now
+        link.last_status_code = result.status_code
+        link.update_at = now
+        if result.is_ok:
+            summary.ok += 1
+            link.failure_count = 0
+            link.etag = result.etag
+            link.last_modified = result.last_modified
+            continue
+
+        summary.failed += 1
+        link.failure_count = min(link.failure_count + 1, 32767)
+        if result.is_gone or link.failure_count >= DEAD_AFTER_FAILURES:
+            link.is_active = False
+            summary.deactivated += 1
+        logger.info("Link %s (%s) check failed: %s", link.pk, link.url, result.error or result.status_code)
+
+    with transaction.atomic():
+        ProviderLink.objects.bulk_update(links, ["last_checked_at", "last_status_code", "failure_count", "etag",
+                                                 "last_modified", "is_active", "update_at"], batch_size=500)
+        Provider.objects.filter(pk__in={link.provider_id for link in links}).update(last_links_checked_at=now)
+
+    # bulk_update/update не отправляют сигналы — сбрасываем кеш каталога вручную
+    if summary.deactivated:
+        invalidate_catalog()
+    return summary
+
+
+def stale_links(*, now: Optional[datetime] = None, stale_after: timedelta = STALE_AFTER):
+    """
+    Активные ссылки, которые не проверялись дольше stale_after (или ни разу)
+    """
+    now = now or timezone.now()
+    return (ProviderLink.objects.filter(is_active=True)
+            .filter(Q(last_checked_at__isnull=True) | Q(last_checked_at__lt=now - stale_after))
+            .order_by("id"))
+
+
+def check_provider_links(links=None, *, limit: Optional[int] = None, batch_size: int = 1000,
+                         concurrency: int = DEFAULT_CONCURRENCY, per_host: int = DEFAULT_PER_HOST,
+                         timeout: float = DEFAULT_TIMEOUT) -> LinkCheckSummary:
+    """
+    Проверка ссылок пачками по batch_size: сеть — параллельно, запись — bulk после каждой пачки.
+
+    links — queryset ссылок (по умолчанию stale_links()); обход keyset по id,
+    поэтому уже проверенные пачки не перечитываются.
+    """
+    queryset = links if links is not None else stale_links()
+    summary = LinkCheckSummary()
+    last_id = 0
+
+    while limit is None or summary.checked < limit:
+        size = batch_size if limit is None else min(batch_size, limit - summary.checked)
+        batch = list(queryset.filter(id__gt=last_id).order_by("id")[:size])
+        if not batch:
+            break
+        last_id = batch[-1].pk
+
+        results = asyncio.run(check_links_async(batch, concurrency=concurrency, per_host=per_host, timeout=timeout))
+        batch_summary = _apply_results(batch, results, now=timezone.now())
+        summary.checked += batch_summary.checked
+        summary.ok += batch_summary.ok
+        summary.failed += batch_summary.failed
+        summary.deactivated += batch_summary.deactivated
+
+    return summary
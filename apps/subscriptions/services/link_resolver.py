@@ -0,0 +1,78 @@
+"""
+Link resolver
+
+Функционал:
+- выбор "лучшей" ссылки провайдера для региона/платформы пользователя
+- приоритет: точное совпадение region+platform -> GLOBAL+platform -> region+WEB -> GLOBAL+WEB
+- все кандидаты для одного или многих провайдеров выбираются одним запросом,
+  выбор по приоритету — в памяти
+- пакетная форма для списка подписок (без N×4 запросов в list-эндпоинтах)
+"""
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from apps.subscriptions.models import ProviderLink, Subscription
+
+from utils.enums import LinkType, Platform
+from utils.validators import GLOBAL_REGION
+
+
+def link_priorities(region: str, platform: str) -> list[tuple[str, str]]:
+    """
+    Пары (region, platform) в порядке убывания приоритета (без дублей)
+    """
+    pairs = [(region, platform), (GLOBAL_REGION, platform), (region, Platform.WEB), (GLOBAL_REGION, Platform.WEB)]
+    return list(dict.fromkeys(pairs))
+
+
+def pick_best_link(candidates: Iterable[ProviderLink], *, region: str, platform: str) -> Optional[ProviderLink]:
+    """
+    Лучшая ссылка среди кандидатов одного провайдера (и одного link_type) по приоритету
+    """
+    by_pair = {(link.region, link.platform): link for link in candidates}
+    for pair in link_priorities(region, platform):
+        link = by_pair.get(pair)
+        if link is not None:
+            return link
+    return None
+
+
+def resolve_links(provider_ids: Iterable[int], *, region: str = GLOBAL_REGION, platform: str = Platform.WEB,
+                  link_type: str = LinkType.BILLING) -> dict[int, Optional[ProviderLink]]:
+    """
+    Лучшая активная ссылка для каждого провайдера: {provider_id: ProviderLink | None}.
+
+    Один запрос на любое количество провайдеров (индекс provider + region + platform + link_type).
+    """
+    provider_ids = {pk for pk in provider_ids if pk is not None}
+    if not provider_ids:
+        return {}
+
+    priorities = link_priorities(region, platform)
+    candidates: dict[int, list[ProviderLink]] = {pk: [] for pk in provider_ids}
+    for link in ProviderLink.objects.filter(provider_id__in=provider_ids, link_type=link_type, is_active=True,
+                                            region__in={r for r, _ in priorities},
+                                            platform__in={p for _, p in priorities}):
+        candidates[link.provider_id].append(link)
+
+    return {pk: pick_best_link(links, region=region, platform=platform) for pk, links in candidates.items()}
+
+
+def resolve_link(provider_id: int, **kwargs) -> Optional[ProviderLink]:
+    """
+    Лучшая ссылка одного провайдера (см. resolve_links)
+    """
+    return resolve_links([provider_id], **kwargs).get(provider_id)
+
+
+def resolve_subscription_links(subscriptions: Iterable[Subscription], *, region: str = GLOBAL_REGION,
+                               platform: str = Platform.WEB,
+                               link_type: str = LinkType.BILLING) -> dict[int, Optional[ProviderLink]]:
+    """
+    Пакетная форма для списка подписок: {subscription_id: ProviderLink | None} одним запросом
+    """
+    subscriptions = list(subscriptions)
+    links = resolve_links((sub.provider_id for sub in subscriptions), region=region, platform=platform,
+                          link_type=link_type)
+    return {sub.pk: links.get(sub.provider_id) for sub in subscriptions}
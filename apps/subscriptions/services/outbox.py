@@ -0,0 +1,128 @@
+"""
+Outbox service
+
+Функционал:
+- запись событий подписок в outbox (в транзакции вызывающего сервиса, одиночно и пакетно)
+- relay: пачки непереданных событий захватываются SELECT ... FOR UPDATE SKIP LOCKED,
+  передаются publisher и помечаются published_at вместе с контрольной точкой (одна транзакция на пачку)
+- очистка давно переданных событий
+
+Publisher — callable(list[OutboxEvent]), задается settings.OUTBOX_PUBLISHER (dotted path).
+Ошибка publisher откатывает пачку: события останутся в очереди и будут переданы повторно.
+Несколько relay можно запускать параллельно — пачки не пересекаются (SKIP LOCKED),
+но строгий порядок между пачками разных relay не гарантируется.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.subscriptions.models import OutboxCheckpoint, OutboxEvent, Subscription
+
+from utils.instrumentation import instrumented
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PUBLISHER = "apps.subscriptions.services.outbox.log_publisher"
+DEFAULT_BATCH_SIZE = 500
+# Сколько хранить переданные события
+PUBLISHED_RETENTION = timedelta(days=7)
+
+Publisher = Callable[[list[OutboxEvent]], None]
+
+
+def _event(subscription: Subscription, event_type: str, payload: dict) -> OutboxEvent:
+    return OutboxEvent(event_type=event_type, subscription_id=subscription.pk, user_id=subscription.user_id,
+                       payload=payload)
+
+
+def record_event(subscription: Subscription, event_type: str, payload: dict) -> None:
+    """
+    Событие по подписке. Вызывать внутри транзакции изменения.
+    """
+    _event(subscription, event_type, payload).save()
+
+
+def record_events(events: Iterable[tuple[Subscription, str, dict]], *, batch_size: int = 1000) -> int:
+    """
+    Пакетная запись событий [(подписка, тип, payload), ...] одним bulk_create
+    """
+    rows = [_event(subscription, event_type, payload) for subscription, event_type, payload in events]
+    OutboxEvent.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def log_publisher(events: list[OutboxEvent]) -> None:
+    """
+    Publisher по умолчанию: события в лог (до подключения брокера)
+    """
+    for event in events:
+        logger.info("Outbox event #%s %s subscription=%s %s",
+                    event.pk, event.event_type, event.subscription_id, event.payload)
+
+
+def get_publisher() -> Publisher:
+    return import_string(getattr(settings, "OUTBOX_PUBLISHER", DEFAULT_PUBLISHER))
+
+
+def _claim_batch(size: int) -> list[OutboxEvent]:
+    """
+    Захват пачки непереданных событий: SELECT ... FOR UPDATE SKIP LOCKED (частичный индекс outbox_unpublished_idx)
+    """
+    return list(OutboxEvent.objects.select_for_update(skip_locked=True)
+                .filter(published_at__isnull=True).order_by("id")[:size])
+
+
+@instrumented
+def relay_outbox(*, name: str = "default", publisher: Optional[Publisher] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE, limit: Optional[int] = None) -> int:
+    """
+    Передача непереданных событий потребителям пачками.
+
+    Каждая пачка — отдельная транзакция: захват (SKIP LOCKED) -> publisher -> UPDATE published_at
+    + контрольная точка relay (OutboxCheckpoint). limit=None — до опустошения очереди.
+    Возвращает количество переданных событий.
+    """
+    publisher = publisher or get_publisher()
+    OutboxCheckpoint.objects.get_or_create(name=name)
+
+    published = 0
+    while limit is None or published < limit:
+        size = batch_size if limit is None else min(batch_size, limit - published)
+        with transaction.atomic():
+            events = _claim_batch(size)
+            if not events:
+                break
+            publisher(events)
+
+            now = timezone.now()
+            OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(published_at=now)
+            OutboxCheckpoint.objects.filter(name=name).update(
+                last_event_id=Greatest(F("last_event_id"), events[-1].pk),
+                published_count=F("published_count") + len(events),
+                update_at=now)
+        published += len(events)
+
+    return published
+
+
+@instrumented
+def purge_published(*, older_than: timedelta = PUBLISHED_RETENTION, batch_size: int = 5000) -> int:
+    """
+    Удаление переданных событий старше older_than (пачками, чтобы не держать длинные блокировки)
+    """
+    border = timezone.now() - older_than
+    deleted = 0
+    while True:
+        ids = list(OutboxEvent.objects.filter(published_at__lt=border).values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += OutboxEvent.objects.filter(pk__in=ids).delete()[0]
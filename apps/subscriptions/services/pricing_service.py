@@ -0,0 +1,103 @@
+"""
+Pricing service
+
+Функционал:
+- цена подписки на момент T ("сколько стоила подписка S в момент T")
+- пакетный вариант: цены набора подписок / всех подписок пользователя на момент T одним запросом
+- интервалы цен, пересекающие период [date_from, date_to) (для отчетов)
+- цены серии моментов по отсортированным интервалам (sweep-line)
+
+Интервал цены — [effective_from, effective_to), effective_to = NULL — действует до сих пор.
+Условие записывается как tstzrange(effective_from, effective_to) @> T
+и обслуживается GiST-индексом price_history_period_gist (subscription, период).
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Iterable, Iterator, Optional, Sequence
+
+from django.contrib.postgres.fields import RangeBoundary
+from django.db.models import QuerySet
+
+from apps.subscriptions.models import PriceHistory, Subscription
+
+from utils.db_functions import TsTzRange
+
+
+def _period():
+    return TsTzRange("effective_from", "effective_to", RangeBoundary())
+
+
+def _active_at(queryset: QuerySet, at: datetime) -> QuerySet:
+    """
+    Записи PriceHistory, действующие в момент at
+    """
+    return queryset.alias(period=_period()).filter(period__contains=at)
+
+
+def _overlapping(queryset: QuerySet, date_from: datetime, date_to: datetime) -> QuerySet:
+    """
+    Записи PriceHistory, интервал которых пересекается с [date_from, date_to)
+    """
+    return queryset.alias(period=_period()).filter(period__overlap=TsTzRange(date_from, date_to, RangeBoundary()))
+
+
+def _latest_per_subscription(queryset: QuerySet) -> dict[int, PriceHistory]:
+    """
+    Одна запись на подписку; при пересекающихся интервалах (ошибка данных) побеждает более поздняя
+    """
+    result: dict[int, PriceHistory] = {}
+    for price in queryset.order_by("subscription_id", "-effective_from", "-id"):
+        result.setdefault(price.subscription_id, price)
+    return result
+
+
+def price_at(subscription: Subscription | int, at: datetime) -> Optional[PriceHistory]:
+    """
+    Цена подписки в момент at (None — в этот момент цены не было: до первой записи истории)
+    """
+    subscription_id = getattr(subscription, "pk", subscription)
+    return (_active_at(PriceHistory.objects.filter(subscription_id=subscription_id), at)
+            .order_by("-effective_from", "-id").first())
+
+
+def prices_at(subscription_ids: Iterable[int], at: datetime) -> dict[int, PriceHistory]:
+    """
+    Цены набора подписок в момент at одним запросом: {subscription_id: PriceHistory}.
+    Подписки без цены на этот момент в результат не попадают.
+    """
+    subscription_ids = list(subscription_ids)
+    if not subscription_ids:
+        return {}
+    return _latest_per_subscription(_active_at(PriceHistory.objects.filter(subscription_id__in=subscription_ids),
+                                               at))
+
+
+def user_prices_at(user, at: datetime) -> dict[int, PriceHistory]:
+    """
+    Цены всех подписок пользователя в момент at одним запросом (JOIN subscriptions по user)
+    """
+    return _latest_per_subscription(_active_at(PriceHistory.objects.filter(subscription__user=user), at))
+
+
+def price_intervals(subscription_ids: Iterable[int], *, date_from: datetime, date_to: datetime) -> QuerySet:
+    """
+    Интервалы цен набора подписок, пересекающие [date_from, date_to),
+    упорядоченные по (subscription_id, effective_from) — вход для sweep-line расчетов
+    """
+    return (_overlapping(PriceHistory.objects.filter(subscription_id__in=list(subscription_ids)), date_from, date_to)
+            .order_by("subscription_id", "effective_from", "id"))
+
+
+def prices_for_moments(moments: Iterable[datetime], intervals: Sequence[PriceHistory]) -> Iterator[Optional[PriceHistory]]:
+    """
+    Sweep-line: моменты и интервалы цен одной подписки отсортированы по времени, указатель по ценам только растет.
+
+    Цена момента — интервал, начавшийся не позже него (ближайшая известная цена);
+    до первого интервала — первый интервал, без истории — None.
+    """
+    idx = 0
+    for moment in moments:
+        while idx + 1 < len(intervals) and intervals[idx + 1].effective_from <= moment:
+            idx += 1
+        yield intervals[idx] if intervals else None
@@ -9,20 +9,26 @@ Subscription service
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from decimal import Decimal
-from typing import Optional
+from typing import Iterable, Optional
 
 from django.db import transaction
+from django.db.models import F, Max
 from django.utils import timezone
 
-from apps.subscriptions.models import BillingSchedule, PriceHistory, Subscription
-from apps.subscriptions.services.billing_service import (recalculate_schedule_next_run,
+from apps.analytics.services.aggregations import apply_subscription_spend, rebuild_user_spend
+from apps.subscriptions.models import BillingSchedule, PriceHistory, Subscription, VerifiedPrice
+from apps.subscriptions.services.billing_service import (calculate_next_run_at,
+    recalculate_schedule_next_run,
     sync_subscription_next_billing,
     validate_billing_schedule_params,
 )
+from apps.subscriptions.services.forecast_service import refresh_subscription_occurrences, sync_occurrences
+from apps.subscriptions.services.outbox import record_event, record_events
 
-from utils.enums import Status, Source
+from utils.enums import EventType, Status, Source
+from utils.instrumentation import instrumented
 
 
 @dataclass(frozen=True)
@@ -35,6 +41,8 @@ class PriceInput:
     effective_from: Optional[timezone.datetime] = None
     reason: Optional[str] = None
     source: str = Source.MANUAL
+    # Версия справочника цен (NULL — ручная цена)
+    verified_price: Optional[VerifiedPrice] = None
 
 
 @dataclass(frozen=True)
@@ -51,6 +59,7 @@ class ScheduleInput:
     billing_timezone: Optional[str] = None
 
 
+@instrumented
 @transaction.atomic
 def create_subscription_with_defaults(*, user, title: str, description: Optional[str] = None,
                                          provider=None, category=None, status: str = Status.ACTIVE,
@@ -63,7 +72,9 @@ def create_subscription_with_defaults(*, user, title: str, description: Optional
     - PriceHistory (текущая цена)
     - BillingSchedule (актуальный график)
 
-    Рассчитывает next_run_at и синхронизирует Subscription.next_billing_at.
+    Рассчитывает next_run_at, синхронизирует Subscription.next_billing_at
+    и материализует прогноз будущих списаний (BillingOccurrence).
+    Учитывает подписку в агрегатах расходов (MonthlySpend).
 
     Это "правильная" точка входа для создания подписки в домене.
     """
@@ -90,7 +101,8 @@ def create_subscription_with_defaults(*, user, title: str, description: Optional
                                 currency=price.currency,
                                 effective_from=effective_from,
                                 change_reason=price.reason,
-                                source=price.source)
+                                source=price.source,
+                                verified_price=price.verified_price)
 
     validate_billing_schedule_params(period_unit=schedule.period_unit,
                                      period_interval=schedule.period_interval,
@@ -109,47 +121,238 @@ def create_subscription_with_defaults(*, user, title: str, description: Optional
                                            next_run_at=timezone.now(),
                                            is_current=True)
 
-    recalculate_schedule_next_run(sched, dtime=timezone.now())
+    recalculate_schedule_next_run(sched, from_dt=timezone.now())
+    sub.current_schedule = sched
+    sub.save(update_fields=["current_schedule", "update_at"])
     sync_subscription_next_billing(sub)
+    refresh_subscription_occurrences(sub)
+    apply_subscription_spend(sub, schedule=sched)
     return sub
 
 
+@instrumented
+@transaction.atomic
+def replace_schedule(sub: Subscription, schedule: ScheduleInput, *,
+                     now: Optional[timezone.datetime] = None) -> BillingSchedule:
+    """
+    Новая версия расписания подписки:
+    - строка подписки блокируется (параллельные замены выполняются по очереди)
+    - старая версия теряет is_current, новая создается актуальной (uniq_billing_schedule_current)
+    - Subscription.current_schedule переключается на новую версию, next_billing_at синхронизируется
+    - пересобирает прогноз будущих списаний (BillingOccurrence) и обновляет агрегаты расходов (MonthlySpend)
+
+    Старые версии сохраняются: по ним считаются прошлые списания (spend_history).
+
+    Это "правильная" точка входа для изменения расписания в домене.
+    """
+    now = now or timezone.now()
+    validate_billing_schedule_params(period_unit=schedule.period_unit,
+                                     period_interval=schedule.period_interval,
+                                     anchor_day=schedule.anchor_day,
+                                     anchor_weekday=schedule.anchor_weekday,
+                                     grace_days=schedule.grace_days)
+
+    # Изменения применяются к заблокированной строке: переданный экземпляр мог устареть
+    sub = Subscription.objects.select_for_update().get(pk=sub.pk)
+    update_fields = ["current_schedule", "update_at"]
+    if schedule.billing_timezone is not None and schedule.billing_timezone != sub.billing_timezone:
+        sub.billing_timezone = schedule.billing_timezone
+        update_fields.append("billing_timezone")
+
+    BillingSchedule.objects.filter(subscription=sub, is_current=True).update(is_current=False, update_at=now)
+    sched = BillingSchedule(subscription=sub,
+                            period_unit=schedule.period_unit,
+                            period_interval=schedule.period_interval,
+                            anchor_day=schedule.anchor_day,
+                            anchor_weekday=schedule.anchor_weekday,
+                            trial_ends_at=schedule.trial_ends_at,
+                            grace_days=schedule.grace_days,
+                            is_current=True)
+    sched.next_run_at = calculate_next_run_at(sched, from_dt=now)
+    sched.save()
+
+    sub.current_schedule = sched
+    sub.save(update_fields=update_fields)
+    sync_subscription_next_billing(sub)
+    refresh_subscription_occurrences(sub, now=now)
+    apply_subscription_spend(sub, schedule=sched)
+    return sched
+
+
+class PriceVersionConflict(ValueError):
+    """
+    Цена подписки была изменена параллельно (price_version не совпал с ожидаемым)
+    """
+
+
+@dataclass
+class BulkPriceResult:
+    """
+    Итог пакетной смены цены
+    """
+    # Подписки, к которым применена новая цена
+    updated: list[int] = field(default_factory=list)
+    # Конфликт версии: цена изменена параллельно (или подписка удалена)
+    conflicts: list[int] = field(default_factory=list)
+    # effective_from не позже начала текущей цены
+    rejected: list[int] = field(default_factory=list)
+    # Созданные записи PriceHistory
+    entries: list[PriceHistory] = field(default_factory=list)
+
+
+def _apply_price(subscription_ids: Iterable[int], price: PriceInput, *,
+                 expected_versions: Optional[dict[int, int]] = None) -> BulkPriceResult:
+    """
+    Применение одной цены к набору подписок без блокировок строк (optimistic concurrency):
+
+    1. чтение текущих price_version и начала открытых интервалов (без SELECT FOR UPDATE)
+    2. UPDATE subscriptions ... WHERE price_version = ожидаемая (один запрос на версию) —
+       строки, версию которых успели изменить, не обновятся и попадут в conflicts
+    3. закрытие открытых интервалов PriceHistory одним UPDATE
+    4. новые PriceHistory одним bulk_create
+    5. события PRICE_CHANGED в outbox одним bulk_create
+
+    Вызывать внутри транзакции.
+    """
+    effective_from = price.effective_from or timezone.now()
+    subscription_ids = list(dict.fromkeys(subscription_ids))
+    result = BulkPriceResult()
+
+    rows = {pk: (version, user_id) for pk, version, user_id
+            in Subscription.objects.filter(pk__in=subscription_ids).values_list("pk", "price_version", "user_id")}
+    current = {pk: version for pk, (version, _) in rows.items()}
+    open_from = dict(PriceHistory.objects.filter(subscription_id__in=current, effective_to__isnull=True)
+                     .values("subscription_id").annotate(start=Max("effective_from"))
+                     .values_list("subscription_id", "start"))
+
+    by_version: dict[int, list[int]] = {}
+    expected = {}
+    for pk in subscription_ids:
+        if pk not in current:
+            result.conflicts.append(pk)
+        elif open_from.get(pk) is not None and open_from[pk] >= effective_from:
+            result.rejected.append(pk)
+        else:
+            expected[pk] = current[pk] if expected_versions is None else expected_versions.get(pk, current[pk])
+            by_version.setdefault(expected[pk], []).append(pk)
+
+    # update_at — метка этой операции: по ней отличаем свои обновления от параллельных
+    marker = timezone.now()
+    updated_count = 0
+    for version, pks in by_version.items():
+        updated_count += (Subscription.objects.filter(pk__in=pks, price_version=version)
+                          .update(current_price_amount=price.amount, current_price_currency=price.currency,
+                                  price_version=F("price_version") + 1, update_at=marker))
+
+    if updated_count == len(expected):
+        result.updated = list(expected)
+    else:
+        applied = {pk: version for pk, version in Subscription.objects.filter(pk__in=expected, update_at=marker)
+                   .values_list("pk", "price_version")}
+        for pk, version in expected.items():
+            if applied.get(pk) == version + 1:
+                result.updated.append(pk)
+            else:
+                result.conflicts.append(pk)
+
+    if not result.updated:
+        return result
+
+    PriceHistory.objects.filter(subscription_id__in=result.updated, effective_to__isnull=True,
+                                effective_from__lt=effective_from).update(effective_to=effective_from)
+    result.entries = PriceHistory.objects.bulk_create([PriceHistory(subscription_id=pk,
+                                                                    amount=price.amount,
+                                                                    currency=price.currency,
+                                                                    effective_from=effective_from,
+                                                                    change_reason=price.reason,
+                                                                    source=price.source,
+                                                                    verified_price=price.verified_price)
+                                                       for pk in result.updated], batch_size=1000)
+    record_events((Subscription(pk=pk, user_id=rows[pk][1]), EventType.PRICE_CHANGED,
+                   {"amount": price.amount, "currency": price.currency, "effective_from": effective_from,
+                    "price_version": expected[pk] + 1, "source": price.source})
+                  for pk in result.updated)
+    return result
+
+
+@instrumented
 @transaction.atomic
 def set_subscription_price(*, subscription: Subscription, amount: Decimal, currency: str,
                            effective_from: Optional[timezone.datetime] = None, reason: Optional[str] = None,
-                           source: str = Source.MANUAL) -> PriceHistory:
+                           source: str = Source.MANUAL, expected_version: Optional[int] = None) -> PriceHistory:
     """
     Меняет текущую цену подписки:
-    - обновляет Subscription.current_price_*
+    - обновляет Subscription.current_price_* и price_version
     - закрывает предыдущую активную запись PriceHistory (effective_to)
     - создаёт новую PriceHistory
+    - пишет событие PRICE_CHANGED в outbox
+    - пересобирает прогноз будущих списаний (BillingOccurrence)
+    - обновляет агрегаты расходов (MonthlySpend)
 
     Правило: в любой момент должна быть “текущая” запись PriceHistory с effective_to = NULL.
+    Без блокировок: если price_version в БД не равен expected_version (по умолчанию —
+    версии загруженного объекта), цена изменена параллельно — PriceVersionConflict.
 
     Это "правильная" точка входа для изменения цены в домене.
     """
-    # Момент вступления цены в силу
-    effective_from = effective_from or timezone.now()
-
-    # Текущая активная цена (если есть)
-    prev = PriceHistory.objects.select_for_update().filter(subscription=subscription, effective_to__isnull=True).order_by("-effective_from").first()
+    if expected_version is None:
+        expected_version = subscription.price_version
 
-    if prev and prev.effective_from < effective_from:
-        # Закрываем предыдущую “текущую” запись
-        prev.effective_to = effective_from
-        prev.save(update_fields=["effective_to"])
-    elif prev and prev.effective_from >= effective_from:
+    result = _apply_price([subscription.pk], PriceInput(amount=amount, currency=currency,
+                                                        effective_from=effective_from, reason=reason,
+                                                        source=source),
+                          expected_versions={subscription.pk: expected_version})
+    if result.rejected:
         raise ValueError("Значение effective_from должно быть больше текущей активной цены effective_from.")
-
-    entry = PriceHistory.objects.create(subscription=subscription,
-                                        amount=amount,
-                                        currency=currency,
-                                        effective_from=effective_from,
-                                        change_reason=reason,
-                                        source=source)
+    if result.conflicts:
+        raise PriceVersionConflict(f"Цена подписки {subscription.pk} была изменена параллельно")
 
     subscription.current_price_amount = amount
     subscription.current_price_currency = currency
-    subscription.save(update_fields=["current_price_amount", "current_price_currency", "update_at"])
+    subscription.price_version = expected_version + 1
+    refresh_subscription_occurrences(subscription)
+    apply_subscription_spend(subscription)
+
+    return result.entries[0]
+
+
+@instrumented
+@transaction.atomic
+def bulk_change_price(subscription_ids: Iterable[int], *, price: PriceInput,
+                      expected_versions: Optional[dict[int, int]] = None) -> BulkPriceResult:
+    """
+    Пакетная смена цены (например, провайдер поменял тариф — INTEGRATION на тысячи подписок).
+
+    Количество запросов не зависит от числа подписок; строки не блокируются,
+    конфликты определяются по price_version (expected_versions — версии, которые видел вызывающий;
+    по умолчанию — прочитанные в начале операции). Конфликтные и отклоненные подписки не меняются.
+    """
+    result = _apply_price(subscription_ids, price, expected_versions=expected_versions)
+    if result.updated:
+        sync_occurrences(result.updated, rebuild=True)
+        rebuild_user_spend(set(Subscription.objects.filter(pk__in=result.updated)
+                               .values_list("user_id", flat=True)))
+    return result
+
+
+@instrumented
+@transaction.atomic
+def change_subscription_status(*, subscription: Subscription, status: str) -> Subscription:
+    """
+    Меняет статус подписки:
+    - пишет событие STATUS_CHANGED в outbox
+    - пересобирает прогноз будущих списаний (BillingOccurrence)
+    - обновляет агрегаты расходов (MonthlySpend)
+
+    Это "правильная" точка входа для смены статуса в домене.
+    """
+    if subscription.status == status:
+        return subscription
 
-    return entry
\ No newline at end of file
+    previous = subscription.status
+    subscription.status = status
+    subscription.save(update_fields=["status", "update_at"])
+    record_event(subscription, EventType.STATUS_CHANGED, {"status": status, "previous": previous})
+    refresh_subscription_occurrences(subscription)
+    apply_subscription_spend(subscription)
+    return subscription
\ No newline at end of file
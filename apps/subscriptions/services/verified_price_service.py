@@ -0,0 +1,148 @@
+"""
+Verified price service
+
+Функционал:
+- публикация новой версии VerifiedPrice (предыдущая версия ключа закрывается)
+- распространение версии на активные подписки, следующие этому ключу (fan-out):
+  поиск подписок — по частичному индексу price_history_open_verified (открытые интервалы),
+  запись — пачками, каждая пачка в своей транзакции (bulk_change_price)
+- прогресс и пропускная способность (callback + лог)
+
+Подписки с ручной ценой (открытый интервал без verified_price) и неактивные подписки не затрагиваются.
+Прошлые интервалы не переписываются: новая цена вступает в силу не раньше момента распространения.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Optional
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from apps.subscriptions.models import PriceHistory, Provider, VerifiedPrice
+from apps.subscriptions.services.subscription_service import PriceInput, bulk_change_price
+
+from utils.enums import PeriodUnit, Platform, Source, Status
+from utils.instrumentation import instrumented
+from utils.validators import GLOBAL_REGION
+
+logger = logging.getLogger(__name__)
+
+# Поля ключа версии справочника
+KEY_FIELDS = ("provider_id", "region", "currency", "period_unit", "period_interval", "platform", "plan")
+# Статусы подписок, на которые распространяется новая цена
+PROPAGATE_STATUSES = (Status.ACTIVE, Status.TRIAL)
+DEFAULT_BATCH_SIZE = 1000
+
+
+@dataclass
+class PropagationProgress:
+    """
+    Прогресс распространения версии цены
+    """
+    verified_price_id: int
+    # Оценка количества затронутых подписок (на момент старта)
+    total: int
+    processed: int = 0
+    updated: int = 0
+    conflicts: int = 0
+    rejected: int = 0
+    batches: int = 0
+    # Секунд с начала распространения
+    elapsed: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        """
+        Пропускная способность, подписок в секунду
+        """
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+
+@instrumented
+@transaction.atomic
+def publish_verified_price(*, provider: Provider, plan: str, amount: Decimal, currency: str,
+                           region: str = GLOBAL_REGION, platform: str = Platform.WEB,
+                           period_unit: str = PeriodUnit.MONTH, period_interval: int = 1,
+                           valid_from: Optional[timezone.datetime] = None,
+                           source: str = Source.INTEGRATION) -> VerifiedPrice:
+    """
+    Новая версия цены по ключу провайдер + регион/валюта/период/платформа/план.
+    Текущая версия ключа закрывается (valid_to = valid_from новой версии).
+
+    Подписки не меняются — см. propagate_verified_price.
+    """
+    valid_from = valid_from or timezone.now()
+    key = dict(provider=provider, region=region, currency=currency, period_unit=period_unit,
+               period_interval=period_interval, platform=platform, plan=plan)
+
+    current = VerifiedPrice.objects.select_for_update().filter(**key, valid_to__isnull=True).first()
+    if current is not None:
+        if current.valid_from >= valid_from:
+            raise ValueError("Значение valid_from должно быть больше valid_from текущей версии цены.")
+        current.valid_to = valid_from
+        current.save(update_fields=["valid_to"])
+
+    return VerifiedPrice.objects.create(**key, amount=amount, source=source, valid_from=valid_from)
+
+
+def affected_price_history(verified_price: VerifiedPrice) -> QuerySet:
+    """
+    Открытые интервалы цен активных подписок, следующих предыдущим версиям ключа
+    """
+    previous = VerifiedPrice.objects.filter(valid_from__lt=verified_price.valid_from,
+                                            **{field: getattr(verified_price, field) for field in KEY_FIELDS})
+    return PriceHistory.objects.filter(effective_to__isnull=True, verified_price__in=previous,
+                                       subscription__status__in=PROPAGATE_STATUSES)
+
+
+@instrumented
+def propagate_verified_price(verified_price: VerifiedPrice, *, batch_size: int = DEFAULT_BATCH_SIZE,
+                             progress: Optional[Callable[[PropagationProgress], None]] = None,
+                             now: Optional[timezone.datetime] = None) -> PropagationProgress:
+    """
+    Распространение версии цены на подписки (fan-out на большую долю строк).
+
+    Подписки обходятся keyset-чанками по subscription_id; на каждый чанк — одна транзакция
+    bulk_change_price (закрытие интервалов, bulk_create, обновление current_price_*),
+    блокировки не держатся дольше одной пачки. Подписки, цена которых изменилась параллельно,
+    пропускаются (conflicts). Повторный запуск продолжает с оставшихся подписок.
+
+    progress вызывается после каждой пачки.
+    """
+    now = now or timezone.now()
+    price = PriceInput(amount=verified_price.amount, currency=verified_price.currency,
+                       effective_from=max(verified_price.valid_from, now),
+                       reason=f"Verified price #{verified_price.pk}", source=verified_price.source,
+                       verified_price=verified_price)
+
+    affected = affected_price_history(verified_price)
+    state = PropagationProgress(verified_price_id=verified_price.pk, total=affected.count())
+    started = time.monotonic()
+
+    last_id = 0
+    while True:
+        ids = list(affected.filter(subscription_id__gt=last_id).order_by("subscription_id")
+                   .values_list("subscription_id", flat=True)[:batch_size])
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        result = bulk_change_price(ids, price=price)
+        state.processed += len(ids)
+        state.updated += len(result.updated)
+        state.conflicts += len(result.conflicts)
+        state.rejected += len(result.rejected)
+        state.batches += 1
+        state.elapsed = time.monotonic() - started
+
+        logger.info("Verified price %s: %s/%s subscriptions (%.0f/s)",
+                    verified_price.pk, state.processed, state.total, state.rate)
+        if progress is not None:
+            progress(state)
+
+    return state
@@ -0,0 +1,22 @@
+"""
+Сигналы приложения subscriptions
+
+- инвалидация кеша каталога (Provider / ProviderLink) при сохранении/удалении
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.subscriptions.models import Provider, ProviderLink
+from apps.subscriptions.services.catalog_cache import invalidate_catalog
+
+
+@receiver([post_save, post_delete], sender=Provider, dispatch_uid="catalog_cache_provider")
+@receiver([post_save, post_delete], sender=ProviderLink, dispatch_uid="catalog_cache_provider_link")
+def invalidate_catalog_cache(sender, **kwargs):
+    """
+    Сбрасываем версию сразу и повторно после коммита:
+    параллельный запрос мог закешировать старые данные, пока транзакция не была зафиксирована
+    """
+    invalidate_catalog()
+    transaction.on_commit(invalidate_catalog)
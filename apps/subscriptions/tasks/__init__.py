@@ -3,5 +3,7 @@ Celery tasks for subscriptions app
 
 Периодические задачи:
 - расчет next_billing_at
+- переходы статусов (окончание trial, истечение льготного периода)
 - health-check данных (ссылки провайдера)
+- передача событий outbox потребителям
 """
\ No newline at end of file
@@ -0,0 +1,19 @@
+import logging
+
+from apps.subscriptions.services.drift_service import DriftReport, audit_denormalization
+
+logger = logging.getLogger(__name__)
+
+
+def repair_denormalization_drift(**options) -> DriftReport:
+    """
+    Задача сверки денормализованных полей подписок (current_schedule, next_billing_at, current_price_*)
+
+    dry_run=True — только подсчет расхождений (метрики), без изменений.
+    Сейчас вызывается вручную или через management command.
+    В будущем — оборачивается в Celery task без изменения логики.
+    """
+    report = audit_denormalization(**options)
+    logger.info("Denormalization drift: %s found, %s repaired (scanned %s)",
+                report.total, sum(report.repaired.values()), report.scanned)
+    return report
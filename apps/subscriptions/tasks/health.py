@@ -0,0 +1,19 @@
+import logging
+
+from apps.subscriptions.services.link_health import LinkCheckSummary, check_provider_links
+
+logger = logging.getLogger(__name__)
+
+
+def check_stale_provider_links(limit: int | None = None, **options) -> LinkCheckSummary:
+    """
+    Задача health-check ссылок провайдеров (ProviderLink)
+
+    Проверяет активные ссылки, не проверявшиеся дольше STALE_AFTER.
+    Сейчас вызывается вручную или через management command.
+    В будущем — оборачивается в Celery task без изменения логики.
+    """
+    summary = check_provider_links(limit=limit, **options)
+    logger.info("Provider links checked: %s ok, %s failed, %s deactivated",
+                summary.ok, summary.failed, summary.deactivated)
+    return summary
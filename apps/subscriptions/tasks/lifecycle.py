@@ -0,0 +1,18 @@
+import logging
+
+from apps.subscriptions.services.lifecycle_service import LifecycleSweepResult, sweep_subscription_lifecycle
+
+logger = logging.getLogger(__name__)
+
+
+def sweep_lifecycle_transitions(**options) -> LifecycleSweepResult:
+    """
+    Задача переходов статусов подписок (окончание trial, истечение льготного периода)
+
+    Запускать перед пересчетом просроченных расписаний: журнал списаний учитывает только ACTIVE-подписки.
+    Сейчас вызывается вручную или через management command.
+    В будущем — оборачивается в Celery task без изменения логики.
+    """
+    result = sweep_subscription_lifecycle(**options)
+    logger.info("Subscription lifecycle sweep: %s transitions", result.total)
+    return result
@@ -1,10 +1,22 @@
+import logging
+
 from django.db import transaction
 from django.utils import timezone
 
-from apps.subscriptions.models import BillingSchedule
-from apps.subscriptions.services.billing_service import recalculate_schedule_next_run, sync_subscription_next_billing
+from apps.subscriptions.models import BillingSchedule, Subscription
+from apps.subscriptions.services.billing_service import (bulk_recalculate_schedules,
+    recalculate_schedule_next_run,
+    sync_subscription_next_billing,
+)
+from apps.subscriptions.services.forecast_service import sync_occurrences
+from apps.subscriptions.services.ledger_service import record_due_charges
+
+from utils.instrumentation import instrumented
+
+logger = logging.getLogger(__name__)
 
 
+@instrumented
 @transaction.atomic
 def recalculate_due_schedules(limit: int = 500) -> int:
     """
@@ -16,14 +28,114 @@ def recalculate_due_schedules(limit: int = 500) -> int:
     now = timezone.now()
 
     # находит расписания, у которых next_run_at <= now
-    schedules = BillingSchedule.objects.select_related("subscription").filter(is_current=True, next_run_at__lte=now).order_by("next_run_at")[:limit]
+    schedules = list(BillingSchedule.objects.select_related("subscription").filter(is_current=True, next_run_at__lte=now).order_by("next_run_at")[:limit])
+
+    # Фиксируем наступившие списания (BillingEvent) до пересчета next_run_at
+    if record_due_charges(schedules, now=now):
+        Subscription.objects.bulk_update([schedule.subscription for schedule in schedules], ["last_billed_at"])
 
     processed = 0
+    subscription_ids = set()
     for schedule in schedules:
         # Пересчитываем schedule.next_run_at
         recalculate_schedule_next_run(schedule, from_dt=now)
         # Синхронизируем Subscription.next_billing_at
         sync_subscription_next_billing(schedule.subscription)
+        subscription_ids.add(schedule.subscription_id)
         processed += 1
 
-    return processed
\ No newline at end of file
+    # Сдвигаем горизонт прогноза (BillingOccurrence)
+    sync_occurrences(subscription_ids, now=now)
+    return processed
+
+
+def _recalculate_chunk(schedules: list[BillingSchedule], now, batch_size: int) -> int:
+    """
+    Журнал списаний + bulk пересчет чанка + сдвиг горизонта прогноза по затронутым подпискам
+
+    last_billed_at записывается тем же bulk_update, что и next_billing_at.
+    """
+    record_due_charges(schedules, now=now, batch_size=batch_size)
+    processed = bulk_recalculate_schedules(schedules, from_dt=now, batch_size=batch_size)
+    sync_occurrences({schedule.subscription_id for schedule in schedules}, now=now)
+    return processed
+
+
+def _claim_due_chunk(now, size: int, exclude_ids=()) -> list[BillingSchedule]:
+    """
+    Захват чанка просроченных расписаний: SELECT ... FOR UPDATE SKIP LOCKED
+
+    Строки, заблокированные другим воркером, пропускаются, поэтому несколько процессов
+    разбирают очередь параллельно без двойной обработки. Блокируется только BillingSchedule.
+    Вызывать внутри транзакции.
+    """
+    queryset = (BillingSchedule.objects.select_related("subscription")
+                .select_for_update(skip_locked=True, of=("self",))
+                .filter(is_current=True, next_run_at__lte=now))
+    if exclude_ids:
+        queryset = queryset.exclude(pk__in=exclude_ids)
+    return list(queryset.order_by("next_run_at")[:size])
+
+
+def _recalculate_rows_isolated(schedules: list[BillingSchedule], now) -> tuple[int, list[int]]:
+    """
+    Построчная обработка чанка, упавшего в bulk режиме
+
+    Каждая строка — в своем savepoint, ошибочные строки пропускаются.
+    Возвращает (количество обработанных, id ошибочных расписаний).
+    """
+    processed = 0
+    failed_ids = []
+    for schedule in schedules:
+        try:
+            with transaction.atomic():
+                _recalculate_chunk([schedule], now, batch_size=1)
+        except Exception:
+            logger.exception("Ошибка пересчета расписания id=%s", schedule.pk)
+            failed_ids.append(schedule.pk)
+        else:
+            processed += 1
+    return processed, failed_ids
+
+
+@instrumented
+def recalculate_due_schedules_bulk(limit: int | None = None, chunk_size: int = 500) -> int:
+    """
+    Пакетный (bulk) режим задачи recalculate_due_schedules / воркер очереди расписаний
+
+    Расписания обрабатываются чанками по chunk_size:
+    - захват чанка через SELECT ... FOR UPDATE SKIP LOCKED (_claim_due_chunk)
+    - наступившие списания пишутся в журнал (BillingEvent) одним bulk_create
+    - next_run_at считается в памяти
+    - запись через bulk_update (BillingSchedule + Subscription)
+    - инкрементальное обновление прогноза (BillingOccurrence)
+
+    Каждый чанк — отдельная транзакция (commit после чанка), поэтому:
+    - ошибка откатывает только текущий чанк; он повторяется построчно, ошибочные строки пропускаются
+    - функцию можно запускать в нескольких процессах/на нескольких узлах одновременно
+
+    После пересчета next_run_at > now, поэтому следующий SELECT сам берет следующий чанк.
+    limit=None — обработать всю очередь.
+    """
+    now = timezone.now()
+
+    processed = 0
+    failed_ids: list[int] = []
+    while limit is None or processed < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - processed)
+
+        try:
+            with transaction.atomic():
+                schedules = _claim_due_chunk(now, size, failed_ids)
+                if not schedules:
+                    break
+                processed += _recalculate_chunk(schedules, now, batch_size=chunk_size)
+        except Exception:
+            logger.exception("Ошибка пересчета чанка расписаний, повтор построчно")
+            with transaction.atomic():
+                schedules = _claim_due_chunk(now, size, failed_ids)
+                chunk_processed, chunk_failed = _recalculate_rows_isolated(schedules, now)
+            processed += chunk_processed
+            failed_ids.extend(chunk_failed)
+
+    return processed
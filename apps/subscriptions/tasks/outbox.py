@@ -0,0 +1,18 @@
+import logging
+
+from apps.subscriptions.services.outbox import purge_published, relay_outbox
+
+logger = logging.getLogger(__name__)
+
+
+def relay_subscription_events(**options) -> int:
+    """
+    Задача передачи событий подписок из outbox потребителям (+ очистка переданных)
+
+    Сейчас вызывается вручную или через management command.
+    В будущем — оборачивается в Celery task без изменения логики.
+    """
+    published = relay_outbox(**options)
+    purged = purge_published()
+    logger.info("Outbox relay: %s events published, %s purged", published, purged)
+    return published
@@ -0,0 +1,20 @@
+import logging
+
+from apps.subscriptions.models import VerifiedPrice
+from apps.subscriptions.services.verified_price_service import PropagationProgress, propagate_verified_price
+
+logger = logging.getLogger(__name__)
+
+
+def propagate_verified_price_task(verified_price_id: int, **options) -> PropagationProgress:
+    """
+    Задача распространения новой версии VerifiedPrice на подписки
+
+    Сейчас вызывается вручную или через management command.
+    В будущем — оборачивается в Celery task без изменения логики.
+    """
+    verified_price = VerifiedPrice.objects.get(pk=verified_price_id)
+    state = propagate_verified_price(verified_price, **options)
+    logger.info("Verified price %s propagated: %s updated, %s conflicts, %s rejected in %.1fs",
+                verified_price_id, state.updated, state.conflicts, state.rejected, state.elapsed)
+    return state
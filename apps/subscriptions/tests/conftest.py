@@ -0,0 +1,56 @@
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from apps.subscriptions.services.subscription_service import (PriceInput, ScheduleInput,
+    create_subscription_with_defaults,
+)
+
+from utils.enums import PeriodUnit
+
+User = get_user_model()
+
+
+@pytest.fixture()
+def user(db):
+    """
+    Тестовый пользователь-владелец подписок
+    """
+    return User.objects.create_user(email="sub_owner@test.com", username="sub_owner", password="StrongTestPass123!")
+
+
+@pytest.fixture()
+def create_subscription(user):
+    """
+    Быстрое создание подписки через сервисный слой:
+    subX = create_subscription(period_unit=PeriodUnit.WEEK, anchor_weekday=0, amount=Decimal("5.00"))
+    """
+    def _create_subscription(*, title: str = "Test subscription", amount: Decimal = Decimal("9.99"),
+                             currency: str = "USD", period_unit: str = PeriodUnit.MONTH, period_interval: int = 1,
+                             anchor_day=None, anchor_weekday=None, billing_timezone=None, owner=None, **kwargs):
+        if period_unit == PeriodUnit.MONTH and anchor_day is None:
+            anchor_day = 1
+        if period_unit == PeriodUnit.WEEK and anchor_weekday is None:
+            anchor_weekday = 0
+        return create_subscription_with_defaults(user=owner or user,
+                                                 title=title,
+                                                 price=PriceInput(amount=amount, currency=currency),
+                                                 schedule=ScheduleInput(period_unit=period_unit,
+                                                                        period_interval=period_interval,
+                                                                        anchor_day=anchor_day,
+                                                                        anchor_weekday=anchor_weekday,
+                                                                        billing_timezone=billing_timezone),
+                                                 **kwargs)
+    return _create_subscription
+
+
+@pytest.fixture()
+def utc_dt():
+    """
+    Короткий конструктор aware-datetime в UTC: utc_dt(2026, 1, 31, 10)
+    """
+    def _utc_dt(*args):
+        return datetime(*args, tzinfo=dt_timezone.utc)
+    return _utc_dt
@@ -0,0 +1,102 @@
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytest
+from django.core.exceptions import ValidationError
+
+from apps.subscriptions.models import BillingSchedule, Subscription
+from apps.subscriptions.services.billing_service import calculate_next_run_at, calculate_next_run_at_batch
+
+from utils.enums import PeriodUnit
+
+TIMEZONES = [None, "UTC", "Europe/Moscow", "America/New_York", "Europe/London",
+             "Australia/Lord_Howe", "Asia/Kathmandu", "Pacific/Chatham", "America/Santiago"]
+
+
+def _schedule(*, period_unit, period_interval=1, anchor_day=None, anchor_weekday=None,
+              billing_timezone=None, trial_ends_at=None):
+    """
+    Несохраненное расписание (расчет не обращается к БД)
+    """
+    sub = Subscription(billing_timezone=billing_timezone)
+    return BillingSchedule(subscription=sub, period_unit=period_unit, period_interval=period_interval,
+                           anchor_day=anchor_day, anchor_weekday=anchor_weekday,
+                           trial_ends_at=trial_ends_at, grace_days=0)
+
+
+def _random_schedule(rnd: random.Random, from_dt: datetime):
+    period_unit = rnd.choice(list(PeriodUnit))
+    trial_ends_at = None
+    if rnd.random() < 0.2:
+        trial_ends_at = from_dt + timedelta(seconds=rnd.randint(-5 * 86400, 60 * 86400), microseconds=rnd.randint(0, 999_999))
+    return _schedule(period_unit=period_unit,
+                     period_interval=rnd.randint(1, 14),
+                     anchor_day=rnd.randint(1, 31),
+                     anchor_weekday=rnd.randint(0, 6),
+                     billing_timezone=rnd.choice(TIMEZONES),
+                     trial_ends_at=trial_ends_at)
+
+
+def _assert_parity(schedules, from_dt):
+    expected = [calculate_next_run_at(s, from_dt=from_dt) for s in schedules]
+    assert calculate_next_run_at_batch(schedules, from_dt=from_dt) == expected
+
+
+def test_batch_parity_random():
+    """
+    Векторный расчет совпадает со скалярным на случайных расписаниях и моментах
+    """
+    rnd = random.Random(20260117)
+    for _ in range(40):
+        from_dt = datetime(2024, 1, 1, tzinfo=dt_timezone.utc) + timedelta(seconds=rnd.randint(0, 20 * 365 * 86400),
+                                                                           microseconds=rnd.randint(0, 999_999))
+        _assert_parity([_random_schedule(rnd, from_dt) for _ in range(50)], from_dt)
+
+
+@pytest.mark.parametrize("tz_name", ["America/New_York", "Europe/London", "Australia/Lord_Howe", "America/Santiago"])
+@pytest.mark.parametrize("year", [2025, 2041])
+def test_batch_parity_around_dst_transitions(tz_name, year):
+    """
+    Переходы на летнее/зимнее время: несуществующее и неоднозначное локальное время, fold
+    """
+    schedules = []
+    for period_unit in PeriodUnit:
+        for interval in (1, 2):
+            for anchor in (0, 3, 6, 28, 31):
+                schedules.append(_schedule(period_unit=period_unit, period_interval=interval,
+                                           anchor_day=max(anchor, 1), anchor_weekday=anchor % 7,
+                                           billing_timezone=tz_name))
+
+    start = datetime(year, 1, 1, tzinfo=dt_timezone.utc)
+    # Шаг 50 минут в течение года: попадаем и в "двойной" час, и рядом с "пропущенным"
+    for step in range(0, 365 * 24 * 60, 50 * 61):
+        _assert_parity(schedules, start + timedelta(minutes=step))
+
+
+def test_batch_month_clamp_and_leap_year():
+    """
+    anchor_day=31 в коротких месяцах и 29 февраля для YEAR
+    """
+    schedules = [
+        _schedule(period_unit=PeriodUnit.MONTH, anchor_day=31),
+        _schedule(period_unit=PeriodUnit.MONTH, anchor_day=30, period_interval=12),
+        _schedule(period_unit=PeriodUnit.YEAR),
+        _schedule(period_unit=PeriodUnit.YEAR, period_interval=4),
+    ]
+    for from_dt in (datetime(2024, 1, 31, 12, tzinfo=dt_timezone.utc),
+                    datetime(2024, 2, 29, 12, tzinfo=dt_timezone.utc),
+                    datetime(2023, 2, 28, 23, 59, tzinfo=dt_timezone.utc)):
+        _assert_parity(schedules, from_dt)
+
+
+def test_batch_validation_errors():
+    """
+    Ошибки валидации как в скалярном пути
+    """
+    from_dt = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+    with pytest.raises(ValidationError):
+        calculate_next_run_at_batch([_schedule(period_unit=PeriodUnit.MONTH)], from_dt=from_dt)
+    with pytest.raises(ValidationError):
+        calculate_next_run_at_batch([_schedule(period_unit=PeriodUnit.WEEK)], from_dt=from_dt)
+    with pytest.raises(ValidationError):
+        calculate_next_run_at_batch([_schedule(period_unit=PeriodUnit.DAY, period_interval=0)], from_dt=from_dt)
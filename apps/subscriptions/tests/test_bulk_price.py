@@ -0,0 +1,126 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from apps.analytics.models import MonthlySpend
+from apps.subscriptions.models import BillingOccurrence, PriceHistory, Subscription
+from apps.subscriptions.services.subscription_service import (PriceInput, PriceVersionConflict, bulk_change_price,
+    set_subscription_price,
+)
+
+from utils.enums import Source
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_bulk_change_price_applies_to_all(create_subscription, utc_dt):
+    """
+    Одна цена на набор подписок: интервалы закрыты, новые записи созданы, current_price_* и версия обновлены
+    """
+    subs = [create_subscription(title=f"s{i}", amount=Decimal("5.00")) for i in range(3)]
+    effective_from = utc_dt(2030, 1, 1)
+
+    result = bulk_change_price([sub.pk for sub in subs],
+                               price=PriceInput(amount=Decimal("7.50"), currency="EUR", effective_from=effective_from,
+                                                reason="tariff", source=Source.INTEGRATION))
+
+    assert sorted(result.updated) == sorted(sub.pk for sub in subs)
+    assert result.conflicts == [] and result.rejected == []
+    for sub in subs:
+        sub.refresh_from_db()
+        assert (sub.current_price_amount, sub.current_price_currency, sub.price_version) == (Decimal("7.50"), "EUR", 1)
+        history = list(PriceHistory.objects.filter(subscription=sub).order_by("effective_from"))
+        assert [h.effective_to for h in history] == [effective_from, None]
+        assert (history[-1].source, history[-1].change_reason) == (Source.INTEGRATION, "tariff")
+
+
+@pytest.mark.django_db
+def test_bulk_change_price_query_count_is_constant(create_subscription, utc_dt, django_assert_max_num_queries):
+    """
+    Число запросов применения цены не зависит от количества подписок
+    """
+    ids = [create_subscription(title=f"s{i}").pk for i in range(20)]
+
+    with django_assert_max_num_queries(30):
+        result = bulk_change_price(ids, price=PriceInput(amount=Decimal("1.00"), currency="USD",
+                                                         effective_from=utc_dt(2030, 1, 1)))
+    assert len(result.updated) == 20
+
+
+@pytest.mark.django_db
+def test_bulk_change_price_conflicts_and_rejections(create_subscription, utc_dt):
+    """
+    Несовпавшая версия -> conflicts, effective_from не позже текущей цены -> rejected; такие подписки не меняются
+    """
+    ok = create_subscription(title="ok", amount=Decimal("5.00"))
+    stale = create_subscription(title="stale", amount=Decimal("5.00"))
+    late = create_subscription(title="late", amount=Decimal("5.00"))
+    PriceHistory.objects.filter(subscription=late).update(effective_from=utc_dt(2031, 1, 1))
+
+    result = bulk_change_price([ok.pk, stale.pk, late.pk, 999999],
+                               price=PriceInput(amount=Decimal("8.00"), currency="USD",
+                                                effective_from=utc_dt(2030, 1, 1)),
+                               expected_versions={stale.pk: 5})
+
+    assert result.updated == [ok.pk]
+    assert sorted(result.conflicts) == sorted([stale.pk, 999999])
+    assert result.rejected == [late.pk]
+    for sub in (stale, late):
+        sub.refresh_from_db()
+        assert (sub.current_price_amount, sub.price_version) == (Decimal("5.00"), 0)
+        assert PriceHistory.objects.filter(subscription=sub).count() == 1
+
+
+@pytest.mark.django_db
+def test_bulk_change_price_refreshes_forecast_and_spend(create_subscription):
+    """
+    Прогноз и агрегаты расходов пересчитываются по новой цене
+    """
+    sub = create_subscription(amount=Decimal("5.00"))
+
+    bulk_change_price([sub.pk], price=PriceInput(amount=Decimal("9.00"), currency="USD"))
+
+    assert set(BillingOccurrence.objects.filter(subscription=sub).values_list("amount", flat=True)) == {Decimal("9.00")}
+    assert list(MonthlySpend.objects.filter(user=sub.user).values_list("monthly_amount", flat=True)) == [Decimal("9")]
+
+
+@pytest.mark.django_db
+def test_set_subscription_price_detects_stale_instance(create_subscription):
+    """
+    Объект с устаревшей версией не перезаписывает цену, измененную параллельно
+    """
+    sub = create_subscription(amount=Decimal("5.00"))
+    stale = Subscription.objects.get(pk=sub.pk)
+
+    set_subscription_price(subscription=sub, amount=Decimal("6.00"), currency="USD")
+    assert sub.price_version == 1
+
+    with pytest.raises(PriceVersionConflict):
+        set_subscription_price(subscription=stale, amount=Decimal("7.00"), currency="USD")
+
+    sub.refresh_from_db()
+    assert (sub.current_price_amount, sub.price_version) == (Decimal("6.00"), 1)
+    assert PriceHistory.objects.filter(subscription=sub, effective_to__isnull=True).count() == 1
+
+
+@pytest.mark.django_db
+def test_bulk_price_endpoint_requires_admin(user, create_subscription, utc_dt):
+    sub = create_subscription(amount=Decimal("5.00"))
+    client = APIClient()
+    client.force_authenticate(user)
+    payload = {"subscription_ids": [sub.pk], "amount": "6.00", "currency": "USD",
+               "expected_versions": {str(sub.pk): 0}}
+
+    assert client.post("/api/subscriptions/admin/bulk-price/", payload, format="json").status_code == 403
+
+    admin = User.objects.create_superuser(email="admin@test.com", username="admin", password="StrongTestPass123!")
+    client.force_authenticate(admin)
+    response = client.post("/api/subscriptions/admin/bulk-price/", payload, format="json")
+
+    assert response.status_code == 200
+    assert response.data == {"updated": 1, "conflicts": [], "rejected": []}
+    sub.refresh_from_db()
+    assert sub.current_price_amount == Decimal("6.00")
@@ -0,0 +1,106 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from apps.subscriptions.models import Provider, ProviderLink
+from apps.subscriptions.services import catalog_cache
+from apps.subscriptions.services.catalog_cache import get_catalog_entries, get_provider_links, local_cache_info
+
+from utils.enums import LinkType, Platform
+
+
+@pytest.fixture(autouse=True)
+def clean_catalog_cache():
+    cache.clear()
+    catalog_cache.invalidate_catalog()
+    yield
+    cache.clear()
+    catalog_cache.invalidate_catalog()
+
+
+@pytest.fixture()
+def provider(db):
+    provider = Provider.objects.create(name="Netflix", slug="netflix", description="Video")
+    ProviderLink.objects.create(provider=provider, region="US", platform=Platform.WEB,
+                                link_type=LinkType.BILLING, url="https://example.com/us/billing")
+    ProviderLink.objects.create(provider=provider, region="GLOBAL", platform=Platform.WEB,
+                                link_type=LinkType.BILLING, url="https://example.com/billing")
+    ProviderLink.objects.create(provider=provider, region="GLOBAL", platform=Platform.IOS,
+                                link_type=LinkType.ACCOUNT, url="https://example.com/account", is_active=False)
+    return provider
+
+
+@pytest.mark.django_db
+def test_links_are_read_through(provider, django_assert_num_queries):
+    """
+    Первое чтение идет в БД, повторные — из LRU процесса без запросов
+    """
+    with django_assert_num_queries(2):
+        links = get_provider_links(provider.pk, link_type=LinkType.BILLING)
+    assert sorted(link.region for link in links) == ["GLOBAL", "US"]
+
+    hits = local_cache_info()["hits"]
+    with django_assert_num_queries(0):
+        assert [link.url for link in get_provider_links(provider.pk, region="US")] == \
+               ["https://example.com/us/billing"]
+        # Неактивные ссылки в кеш не попадают
+        assert get_provider_links(provider.pk, platform=Platform.IOS) == []
+    assert local_cache_info()["hits"] == hits + 2
+
+
+@pytest.mark.django_db
+def test_shared_tier_used_after_local_eviction(provider, django_assert_num_queries):
+    """
+    После очистки LRU процесса данные берутся из Django cache, а не из БД
+    """
+    get_provider_links(provider.pk)
+    catalog_cache._local.clear()
+
+    with django_assert_num_queries(0):
+        assert len(get_provider_links(provider.pk)) == 2
+
+
+@pytest.mark.django_db
+def test_signals_invalidate_catalog(provider):
+    """
+    Сохранение/удаление Provider/ProviderLink сбрасывает версию каталога
+    """
+    version = catalog_cache.catalog_version()
+    assert len(get_provider_links(provider.pk)) == 2
+
+    link = ProviderLink.objects.create(provider=provider, region="DE", platform=Platform.ANDROID,
+                                       link_type=LinkType.SUPPORT, url="https://example.com/de/support")
+    assert catalog_cache.catalog_version() != version
+    assert len(get_provider_links(provider.pk)) == 3
+
+    link.delete()
+    assert len(get_provider_links(provider.pk)) == 2
+
+    provider.name = "Netflix Inc"
+    provider.save()
+    assert catalog_cache.get_provider(provider.pk).name == "Netflix Inc"
+
+
+@pytest.mark.django_db
+def test_missing_provider_is_cached(django_assert_num_queries):
+    """
+    Несуществующий провайдер кешируется как None
+    """
+    assert get_catalog_entries([987654]) == {987654: None}
+    with django_assert_num_queries(0):
+        assert get_provider_links(987654) == []
+
+
+@pytest.mark.django_db
+def test_subscription_detail_contains_provider_links(user, provider, create_subscription):
+    """
+    Детальная карточка подписки отдает ссылки провайдера из кеша
+    """
+    sub = create_subscription(provider=provider)
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get(f"/api/subscriptions/subscriptions/{sub.pk}/")
+
+    assert response.status_code == 200
+    assert {link["region"] for link in response.data["provider_links"]} == {"US", "GLOBAL"}
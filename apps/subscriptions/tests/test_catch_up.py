@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytest
+
+from apps.subscriptions.models import BillingSchedule, Subscription
+from apps.subscriptions.services.billing_service import calculate_catch_up, calculate_next_run_at, catch_up_schedule
+
+from utils.enums import PeriodUnit
+
+
+def _schedule(*, next_run_at, period_unit, period_interval=1, anchor_day=None, anchor_weekday=None,
+              billing_timezone="UTC", trial_ends_at=None):
+    """
+    Несохраненное расписание (расчет не обращается к БД)
+    """
+    sub = Subscription(billing_timezone=billing_timezone)
+    return BillingSchedule(subscription=sub, period_unit=period_unit, period_interval=period_interval,
+                           anchor_day=anchor_day, anchor_weekday=anchor_weekday, trial_ends_at=trial_ends_at,
+                           grace_days=0, next_run_at=next_run_at)
+
+
+def _iterate(schedule, now):
+    """
+    Эталон: проход период за периодом через calculate_next_run_at
+    """
+    missed = []
+    current = schedule.next_run_at
+    while current <= now:
+        missed.append(current)
+        current = calculate_next_run_at(schedule, from_dt=current)
+    return missed, current
+
+
+CASES = [
+    dict(period_unit=PeriodUnit.DAY, period_interval=1),
+    dict(period_unit=PeriodUnit.DAY, period_interval=3),
+    dict(period_unit=PeriodUnit.WEEK, anchor_weekday=2),
+    dict(period_unit=PeriodUnit.WEEK, period_interval=2, anchor_weekday=6),
+    dict(period_unit=PeriodUnit.MONTH, anchor_day=31),
+    dict(period_unit=PeriodUnit.MONTH, period_interval=3, anchor_day=15),
+    dict(period_unit=PeriodUnit.YEAR),
+    dict(period_unit=PeriodUnit.MONTH, anchor_day=30, billing_timezone="Europe/Moscow"),
+    dict(period_unit=PeriodUnit.DAY, period_interval=2, billing_timezone="Asia/Kathmandu"),
+    # Переход на летнее время: списание попадает в несуществующий час и сдвигается на 1 час вперед
+    dict(period_unit=PeriodUnit.DAY, billing_timezone="America/New_York",
+         next_run_at=datetime(2024, 3, 1, 7, 30, tzinfo=dt_timezone.utc)),
+    dict(period_unit=PeriodUnit.WEEK, anchor_weekday=6, billing_timezone="America/New_York",
+         next_run_at=datetime(2024, 3, 3, 7, 30, tzinfo=dt_timezone.utc)),
+    dict(period_unit=PeriodUnit.DAY, billing_timezone="Europe/London",
+         next_run_at=datetime(2024, 3, 1, 1, 30, tzinfo=dt_timezone.utc)),
+    dict(period_unit=PeriodUnit.MONTH, anchor_day=31, billing_timezone="Europe/London",
+         next_run_at=datetime(2024, 1, 31, 1, 30, tzinfo=dt_timezone.utc)),
+    dict(period_unit=PeriodUnit.DAY, period_interval=3, billing_timezone="Europe/London",
+         next_run_at=datetime(2024, 10, 20, 0, 30, tzinfo=dt_timezone.utc)),
+]
+
+
+@pytest.mark.parametrize("params", CASES)
+@pytest.mark.parametrize("behind_days", [0, 1, 7, 45, 400, 3000])
+def test_catch_up_matches_iteration(params, behind_days):
+    """
+    Арифметический catch-up совпадает с проходом период за периодом
+    """
+    params = {"next_run_at": datetime(2024, 1, 31, 9, 30, tzinfo=dt_timezone.utc), **params}
+    now = params["next_run_at"] + timedelta(days=behind_days, hours=5)
+    schedule = _schedule(**params)
+
+    expected_missed, expected_next = _iterate(schedule, now)
+    result = calculate_catch_up(schedule, now=now, with_missed=True)
+
+    assert result.missed_count == len(expected_missed)
+    assert result.missed == tuple(expected_missed)
+    assert result.next_run_at == expected_next
+    assert result.next_run_at > now
+
+
+def test_catch_up_dst_gap_example():
+    """
+    America/New_York, каждый день в 02:30 EST: после перехода 10.03 списания идут в 03:30 EDT (07:30 UTC),
+    как при пошаговом расчете
+    """
+    schedule = _schedule(next_run_at=datetime(2024, 3, 1, 7, 30, tzinfo=dt_timezone.utc), period_unit=PeriodUnit.DAY,
+                         billing_timezone="America/New_York")
+
+    result = calculate_catch_up(schedule, now=schedule.next_run_at + timedelta(days=60))
+
+    assert result.next_run_at == datetime(2024, 5, 1, 7, 30, tzinfo=dt_timezone.utc)
+
+
+def test_catch_up_not_behind():
+    """
+    Расписание не просрочено — ничего не пропущено
+    """
+    next_run_at = datetime(2026, 5, 1, tzinfo=dt_timezone.utc)
+    schedule = _schedule(next_run_at=next_run_at, period_unit=PeriodUnit.DAY)
+
+    result = calculate_catch_up(schedule, now=next_run_at - timedelta(seconds=1))
+
+    assert result.missed_count == 0
+    assert result.next_run_at == next_run_at
+
+
+def test_catch_up_without_missed_list():
+    """
+    По умолчанию список дат не строится, только количество
+    """
+    next_run_at = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+    schedule = _schedule(next_run_at=next_run_at, period_unit=PeriodUnit.DAY)
+
+    result = calculate_catch_up(schedule, now=next_run_at + timedelta(days=10_000))
+
+    assert result.missed_count == 10_001
+    assert result.missed == ()
+
+
+@pytest.mark.django_db
+def test_catch_up_schedule_persists(create_subscription):
+    """
+    catch_up_schedule сохраняет next_run_at и синхронизирует Subscription.next_billing_at
+    """
+    sub = create_subscription(period_unit=PeriodUnit.WEEK, anchor_weekday=0)
+    schedule = BillingSchedule.objects.select_related("subscription").get(subscription=sub, is_current=True)
+    now = schedule.next_run_at + timedelta(weeks=5, hours=1)
+
+    result = catch_up_schedule(schedule, now=now)
+
+    sub.refresh_from_db()
+    assert result.missed_count == 6
+    assert sub.next_billing_at == result.next_run_at
+    assert now < result.next_run_at <= now + timedelta(weeks=1)
@@ -0,0 +1,58 @@
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from apps.subscriptions.models import Subscription
+
+from utils.date_calculator import get_tzinfo, is_valid_timezone, tz_cache_info, valid_timezone_names
+from utils.validators import validator_timezone
+
+
+def test_get_tzinfo_is_interned():
+    """
+    Один и тот же объект timezone на повторных вызовах, попадания считаются
+    """
+    before = tz_cache_info().hits
+    first = get_tzinfo("Asia/Yekaterinburg")
+    second = get_tzinfo("Asia/Yekaterinburg")
+
+    assert first is second
+    assert first == ZoneInfo("Asia/Yekaterinburg")
+    assert tz_cache_info().hits > before
+
+
+def test_get_tzinfo_accepts_subscription():
+    """
+    get_tzinfo принимает подписку и берет ее billing_timezone
+    """
+    assert get_tzinfo(Subscription(billing_timezone="Europe/Moscow")) == ZoneInfo("Europe/Moscow")
+    assert get_tzinfo(Subscription(billing_timezone=None)) == timezone.get_current_timezone()
+    assert get_tzinfo(None) == timezone.get_current_timezone()
+
+
+def test_invalid_timezone_cached_and_rejected():
+    """
+    Несуществующее имя: ValidationError, повторная проверка без исключения внутри (кеш)
+    """
+    with pytest.raises(ValidationError):
+        get_tzinfo("Mars/Olympus_Mons")
+    misses = tz_cache_info().misses
+
+    assert is_valid_timezone("Mars/Olympus_Mons") is False
+    assert is_valid_timezone("../../etc/passwd") is False
+    assert tz_cache_info().misses == misses + 1
+
+    with pytest.raises(ValidationError):
+        validator_timezone("Mars/Olympus_Mons")
+    validator_timezone("Europe/London")
+    validator_timezone("")
+
+
+def test_valid_timezone_names_registry():
+    """
+    Реестр IANA-имен строится один раз и содержит основные зоны
+    """
+    assert valid_timezone_names() is valid_timezone_names()
+    assert {"UTC", "Europe/Moscow", "America/New_York"} <= valid_timezone_names()
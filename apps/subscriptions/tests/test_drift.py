@@ -0,0 +1,130 @@
+from collections import Counter
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+
+from apps.analytics.models import MonthlySpend
+from apps.subscriptions.models import BillingOccurrence, BillingSchedule, OutboxEvent, Subscription
+from apps.subscriptions.services.drift_service import audit_denormalization
+
+from utils import instrumentation
+from utils.enums import EventType
+
+
+def _corrupt(create_subscription, utc_dt):
+    """
+    Три подписки с расхождениями, записанными в обход сервисного слоя, и одна согласованная
+    """
+    price = create_subscription(title="price", amount=Decimal("5.00"))
+    billing = create_subscription(title="billing")
+    pointer = create_subscription(title="pointer")
+    create_subscription(title="ok")
+
+    Subscription.objects.filter(pk=price.pk).update(current_price_amount=Decimal("1.00"))
+    Subscription.objects.filter(pk=billing.pk).update(next_billing_at=utc_dt(2000, 1, 1))
+    Subscription.objects.filter(pk=pointer.pk).update(current_schedule=None)
+    return price, billing, pointer
+
+
+@pytest.mark.django_db
+def test_dry_run_counts_without_changes(create_subscription, utc_dt):
+    price, billing, pointer = _corrupt(create_subscription, utc_dt)
+
+    report = audit_denormalization(dry_run=True, chunk_size=2)
+
+    assert (report.scanned, report.chunks) == (4, 2)
+    assert report.drift == Counter(current_schedule=1, next_billing_at=1, current_price=1)
+    assert report.as_metrics()["subscriptions.denormalization.drift.current_price"] == 1
+    assert "subscriptions.denormalization.repaired.current_price" not in report.as_metrics()
+    assert Subscription.objects.get(pk=price.pk).current_price_amount == Decimal("1.00")
+    assert Subscription.objects.get(pk=pointer.pk).current_schedule_id is None
+    assert not OutboxEvent.objects.filter(payload__repair=True).exists()
+
+
+@pytest.mark.django_db
+def test_metrics_go_through_sinks(create_subscription, utc_dt, monkeypatch):
+    _corrupt(create_subscription, utc_dt)
+    gauges = {}
+
+    class Sink:
+        def observe(self, stats):
+            pass
+
+        def gauge(self, name, value):
+            gauges[name] = value
+
+    monkeypatch.setattr(instrumentation, "get_sinks", lambda: [Sink()])
+    report = audit_denormalization(dry_run=True)
+
+    assert gauges == report.as_metrics()
+    assert gauges["subscriptions.denormalization.drift.next_billing_at"] == 1
+
+
+@pytest.mark.django_db
+def test_repair_restores_denormalized_fields(create_subscription, utc_dt):
+    price, billing, pointer = _corrupt(create_subscription, utc_dt)
+    MonthlySpend.objects.all().delete()
+    BillingOccurrence.objects.filter(subscription=price).update(amount=Decimal("1.00"))
+
+    report = audit_denormalization(chunk_size=2)
+
+    assert report.repaired == report.drift and report.total == 3
+    price.refresh_from_db()
+    assert (price.current_price_amount, price.price_version) == (Decimal("5.00"), 1)
+    assert set(BillingOccurrence.objects.filter(subscription=price).values_list("amount", flat=True)) == {
+        Decimal("5.00")}
+    billing.refresh_from_db()
+    assert billing.next_billing_at == BillingSchedule.objects.get(subscription=billing, is_current=True).next_run_at
+    pointer.refresh_from_db()
+    assert pointer.current_schedule == BillingSchedule.objects.get(subscription=pointer, is_current=True)
+    assert MonthlySpend.objects.exists()
+
+    events = OutboxEvent.objects.filter(payload__repair=True)
+    assert sorted(events.values_list("event_type", "subscription_id")) == sorted([
+        (EventType.PRICE_CHANGED, price.pk), (EventType.NEXT_BILLING_CHANGED, billing.pk)])
+    # Повторный прогон — расхождений нет
+    assert audit_denormalization().total == 0
+
+
+@pytest.mark.django_db
+def test_stale_pointer_and_orphan_next_billing(create_subscription, utc_dt):
+    sub = create_subscription()
+    old = sub.current_schedule
+    BillingSchedule.objects.filter(pk=old.pk).update(is_current=False)
+    new = BillingSchedule.objects.create(subscription=sub, period_unit=old.period_unit, period_interval=1,
+                                         anchor_day=old.anchor_day, next_run_at=utc_dt(2031, 1, 1))
+    orphan = create_subscription(title="orphan")
+    BillingSchedule.objects.filter(subscription=orphan).update(is_current=False)
+
+    report = audit_denormalization()
+
+    assert report.drift == Counter(current_schedule=2, next_billing_at=2)
+    sub.refresh_from_db()
+    orphan.refresh_from_db()
+    assert (sub.current_schedule_id, sub.next_billing_at) == (new.pk, utc_dt(2031, 1, 1))
+    # Актуальной версии нет: указатель и ближайшее списание сбрасываются
+    assert (orphan.current_schedule_id, orphan.next_billing_at) == (None, None)
+
+
+@pytest.mark.django_db
+def test_query_count_independent_of_drifted_rows(create_subscription, utc_dt, django_assert_max_num_queries):
+    subs = [create_subscription(title=f"s{i}") for i in range(10)]
+    Subscription.objects.filter(pk__in=[sub.pk for sub in subs]).update(current_price_amount=Decimal("0.50"),
+                                                                         next_billing_at=None)
+
+    with django_assert_max_num_queries(30):
+        report = audit_denormalization()
+
+    assert report.repaired == Counter(next_billing_at=10, current_price=10)
+
+
+@pytest.mark.django_db
+def test_command_dry_run(create_subscription, utc_dt, capsys):
+    _corrupt(create_subscription, utc_dt)
+
+    call_command("repair_denormalization", "--dry-run")
+
+    out = capsys.readouterr().out
+    assert "subscriptions.denormalization.drift.next_billing_at 1" in out
+    assert Subscription.objects.filter(current_schedule__isnull=True).count() == 1
@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from rest_framework.test import APIClient
+
+from utils.enums import PeriodUnit
+
+User = get_user_model()
+
+
+def _content(response):
+    assert isinstance(response, StreamingHttpResponse)
+    return b"".join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+def test_user_export_streams_only_own_rows(user, create_subscription):
+    """
+    Пользователь выгружает только свои подписки (CSV и NDJSON)
+    """
+    other = User.objects.create_user(email="other@test.com", username="other", password="StrongTestPass123!")
+    mine = [create_subscription(title=f"mine {i}", period_unit=PeriodUnit.DAY) for i in range(3)]
+    create_subscription(title="foreign", period_unit=PeriodUnit.DAY, owner=other)
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get("/api/subscriptions/export/", {"kind": "subscriptions", "output": "csv"})
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(_content(response))))
+    assert [int(row["id"]) for row in rows] == [s.pk for s in mine]
+
+    response = client.get("/api/subscriptions/export/", {"kind": "price_history", "output": "ndjson"})
+    lines = [json.loads(line) for line in _content(response).splitlines()]
+    assert {line["subscription_id"] for line in lines} == {s.pk for s in mine}
+
+
+@pytest.mark.django_db
+def test_tenant_export_requires_admin(user, create_subscription):
+    """
+    Полная выгрузка доступна только администратору
+    """
+    create_subscription(period_unit=PeriodUnit.WEEK)
+    client = APIClient()
+    client.force_authenticate(user)
+    assert client.get("/api/subscriptions/admin/export/").status_code == 403
+
+    admin = User.objects.create_superuser(email="admin@test.com", username="admin", password="StrongTestPass123!")
+    client.force_authenticate(admin)
+    response = client.get("/api/subscriptions/admin/export/", {"kind": "schedules", "output": "ndjson"})
+    assert response.status_code == 200
+    assert len(_content(response).splitlines()) == 1
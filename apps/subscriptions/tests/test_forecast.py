@@ -0,0 +1,84 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.subscriptions.models import BillingOccurrence, BillingSchedule
+from apps.subscriptions.services.forecast_service import FORECAST_HORIZON_DAYS, sync_occurrences
+from apps.subscriptions.services.subscription_service import set_subscription_price
+
+from utils.enums import PeriodUnit, Status
+
+
+@pytest.mark.django_db
+def test_occurrences_materialized_on_create(create_subscription):
+    """
+    При создании подписки прогноз строится до горизонта, первое списание = next_billing_at
+    """
+    sub = create_subscription(period_unit=PeriodUnit.MONTH, anchor_day=15, amount=Decimal("10.00"))
+
+    occurrences = list(BillingOccurrence.objects.filter(subscription=sub))
+
+    assert 12 <= len(occurrences) <= 13
+    assert occurrences[0].occurs_at == sub.next_billing_at
+    assert occurrences[-1].occurs_at <= timezone.now() + timedelta(days=FORECAST_HORIZON_DAYS)
+    assert all(o.amount == Decimal("10.00") and o.currency == "USD" for o in occurrences)
+
+
+@pytest.mark.django_db
+def test_occurrences_follow_future_price_change(create_subscription):
+    """
+    Будущая смена цены попадает только в списания после effective_from
+    """
+    sub = create_subscription(period_unit=PeriodUnit.WEEK, anchor_weekday=2, amount=Decimal("5.00"))
+    change_at = timezone.now() + timedelta(days=60)
+
+    set_subscription_price(subscription=sub, amount=Decimal("7.50"), currency="USD", effective_from=change_at)
+
+    for occurrence in BillingOccurrence.objects.filter(subscription=sub):
+        expected = Decimal("7.50") if occurrence.occurs_at >= change_at else Decimal("5.00")
+        assert occurrence.amount == expected
+
+
+@pytest.mark.django_db
+def test_sync_occurrences_drops_inactive_and_extends_tail(create_subscription):
+    """
+    Неактивная подписка теряет прогноз; у активной хвост достраивается при сдвиге горизонта
+    """
+    active = create_subscription(title="active", period_unit=PeriodUnit.DAY, period_interval=7)
+    paused = create_subscription(title="paused", period_unit=PeriodUnit.DAY, period_interval=7)
+    paused.status = Status.PAUSED
+    paused.save()
+    last_before = BillingOccurrence.objects.filter(subscription=active).latest("occurs_at").occurs_at
+
+    sync_occurrences([active.pk, paused.pk], now=timezone.now() + timedelta(days=1))
+    # Расписание не сдвигалось — первое списание то же, хвост дорос
+    sync_occurrences([active.pk], now=timezone.now() + timedelta(days=30))
+
+    assert not BillingOccurrence.objects.filter(subscription=paused).exists()
+    assert BillingOccurrence.objects.filter(subscription=active).latest("occurs_at").occurs_at > last_before
+
+
+@pytest.mark.django_db
+def test_forecast_endpoint_totals(user, create_subscription):
+    """
+    GET /api/subscriptions/forecast/?days=N — итоги по валютам и список списаний
+    """
+    create_subscription(title="usd", period_unit=PeriodUnit.WEEK, amount=Decimal("2.00"), currency="USD")
+    create_subscription(title="eur", period_unit=PeriodUnit.YEAR, amount=Decimal("100.00"), currency="EUR")
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get("/api/subscriptions/forecast/", {"days": 365})
+
+    assert response.status_code == 200
+    totals = {row["currency"]: row for row in response.data["totals"]}
+    assert totals["EUR"]["count"] == 1
+    assert totals["EUR"]["amount"] == Decimal("100.00")
+    assert totals["USD"]["count"] in (52, 53)
+    assert len(response.data["occurrences"]) == totals["USD"]["count"] + 1
+
+    response = client.get("/api/subscriptions/forecast/", {"days": 1000})
+    assert response.status_code == 400
@@ -0,0 +1,97 @@
+import io
+import json
+from decimal import Decimal
+from itertools import islice
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+
+from apps.subscriptions.models import BillingSchedule, Category, OutboxEvent, PriceHistory, Subscription
+from apps.subscriptions.services.import_service import import_subscriptions, iter_csv_rows, iter_json_rows
+
+from utils.enums import EventType, Source
+
+CSV_DATA = """title,amount,currency,period_unit,period_interval,anchor_day,anchor_weekday,category,billing_timezone
+Music,9.99,USD,month,1,5,,music,Europe/Moscow
+Cloud,99.00,EUR,year,1,,,,
+Gym,15.00,USD,week,2,,3,,
+Broken,abc,USD,month,1,1,,,
+NoCategory,1.00,USD,day,1,,,missing,
+Fake,1.00,XXQ,day,1,,,,
+"""
+
+
+@pytest.mark.django_db
+def test_import_csv_creates_all_entities(user):
+    """
+    Валидные строки создаются пачками, ошибочные попадают в отчет
+    """
+    Category.objects.create(name="Music", slug="music")
+
+    result = import_subscriptions(user, iter_csv_rows(io.StringIO(CSV_DATA)), batch_size=2)
+
+    assert result.created == 3
+    assert result.failed == 3
+    assert [row for row, _ in result.errors] == [4, 5, 6]
+    assert "currency" in result.errors[2][1]
+
+    subs = Subscription.objects.filter(user=user)
+    assert subs.count() == 3
+    for sub in subs:
+        schedule = BillingSchedule.objects.get(subscription=sub, is_current=True)
+        price = PriceHistory.objects.get(subscription=sub)
+        assert sub.next_billing_at == schedule.next_run_at
+        assert price.amount == sub.current_price_amount
+        assert price.source == Source.IMPORT
+        # событие outbox — как при создании через сервисный слой
+        event = OutboxEvent.objects.get(subscription_id=sub.pk)
+        assert (event.event_type, event.user_id) == (EventType.NEXT_BILLING_CHANGED, user.pk)
+        assert event.payload["previous"] is None
+    assert subs.get(title="Music").category.slug == "music"
+
+
+def test_iter_json_rows_streams_array_and_lines():
+    """
+    JSON массив и JSON Lines читаются по объекту, в т.ч. через границы буфера
+    """
+    rows = [{"title": f"sub {i}", "note": "x" * 5000} for i in range(50)]
+
+    assert list(iter_json_rows(io.StringIO(json.dumps(rows)))) == rows
+    assert list(iter_json_rows(io.StringIO("\n".join(json.dumps(r) for r in rows)))) == rows
+    assert list(iter_json_rows(io.StringIO("[]"))) == []
+
+
+def test_iter_json_rows_fails_fast_on_malformed_object():
+    """
+    Поврежденный объект в середине файла — ошибка с номером строки без дочитывания файла в память
+    """
+    good = [json.dumps({"title": f"sub {i}", "note": "x" * 1000}) for i in range(3000)]
+    stream = io.StringIO("[" + ",".join(good[:3] + ['{"title": oops}'] + good[3:]) + "]")
+    rows = iter_json_rows(stream)
+
+    assert [row["title"] for row in islice(rows, 3)] == ["sub 0", "sub 1", "sub 2"]
+    with pytest.raises(ValueError, match="Строка 4: некорректный JSON"):
+        next(rows)
+    assert stream.tell() < len(stream.getvalue()) // 2
+
+
+@pytest.mark.django_db
+def test_import_endpoint(user):
+    """
+    POST /api/subscriptions/import/ с JSON-файлом
+    """
+    payload = json.dumps([
+        {"title": "Video", "amount": "7.99", "currency": "USD", "period_unit": "month", "anchor_day": 31},
+        {"title": "News", "amount": "3.00", "currency": "USD", "period_unit": "week", "anchor_weekday": 0},
+    ]).encode()
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.post("/api/subscriptions/import/",
+                           {"file": SimpleUploadedFile("subs.json", payload, content_type="application/json")},
+                           format="multipart")
+
+    assert response.status_code == 201
+    assert response.data["created"] == 2
+    assert Subscription.objects.get(user=user, title="Video").current_price_amount == Decimal("7.99")
@@ -0,0 +1,182 @@
+import socket
+from decimal import Decimal
+
+import pytest
+from django.test import RequestFactory, override_settings
+from rest_framework.test import APIClient
+
+from apps.subscriptions.models import Subscription
+from apps.subscriptions.services.subscription_service import PriceInput, bulk_change_price
+from apps.subscriptions.tasks.maintenance import recalculate_due_schedules_bulk
+
+from utils import instrumentation
+from utils.instrumentation import (CallStats,
+    PrometheusSink,
+    QueryBudgetExceeded,
+    StatsdSink,
+    emit_gauges,
+    instrument,
+    prometheus_enabled,
+    prometheus_metrics,
+    query_budget,
+    reset_sinks,
+)
+
+
+class _ListSink:
+    def __init__(self):
+        self.calls = []
+        self.gauges = {}
+
+    def observe(self, stats):
+        self.calls.append(stats)
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+
+@pytest.fixture()
+def sink(monkeypatch):
+    """
+    Sink, подставленный вместо настроенных (get_sinks)
+    """
+    sink = _ListSink()
+    monkeypatch.setattr(instrumentation, "get_sinks", lambda: [sink])
+    return sink
+
+
+@pytest.mark.django_db
+def test_instrument_counts_queries_and_rows(create_subscription):
+    create_subscription(title="a")
+    create_subscription(title="b")
+    recorded = _ListSink()
+
+    with instrument("test.block", sinks=[recorded]) as stats:
+        list(Subscription.objects.all())
+        Subscription.objects.update(owner_note="x")
+
+    assert recorded.calls == [stats]
+    assert (stats.name, stats.queries) == ("test.block", 2)
+    # UPDATE затронул 2 строки (rowcount SELECT зависит от драйвера)
+    assert stats.rows >= 2
+    assert 0 < stats.db_time <= stats.wall_time
+
+
+@pytest.mark.django_db
+def test_decorated_services_report_calls(sink, create_subscription, utc_dt):
+    sub = create_subscription()
+    sink.calls.clear()
+
+    bulk_change_price([sub.pk], price=PriceInput(amount=Decimal("3.00"), currency="USD",
+                                                 effective_from=utc_dt(2030, 1, 1)))
+    recalculate_due_schedules_bulk()
+
+    names = [stats.name for stats in sink.calls]
+    assert "apps.subscriptions.services.subscription_service.bulk_change_price" in names
+    assert names[-1] == "apps.subscriptions.tasks.maintenance.recalculate_due_schedules_bulk"
+    # Вложенные вызовы (sync_occurrences) учитываются отдельно и внутри внешнего
+    outer = next(stats for stats in sink.calls if stats.name.endswith("bulk_change_price"))
+    inner = next(stats for stats in sink.calls if stats.name.endswith("sync_occurrences"))
+    assert 0 < inner.queries < outer.queries
+
+
+@pytest.mark.django_db
+def test_query_budget_fails_on_regression():
+    with query_budget(2) as stats:
+        list(Subscription.objects.all())
+    assert stats.queries == 1
+
+    with pytest.raises(QueryBudgetExceeded, match="3 запросов при бюджете 2"):
+        with query_budget(2):
+            for _ in range(3):
+                Subscription.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bulk_change_price_within_budget(create_subscription, utc_dt):
+    ids = [create_subscription(title=f"s{i}").pk for i in range(20)]
+
+    with query_budget(30):
+        bulk_change_price(ids, price=PriceInput(amount=Decimal("1.00"), currency="USD",
+                                                effective_from=utc_dt(2030, 1, 1)))
+
+
+def test_sink_errors_do_not_break_calls(caplog):
+    class Broken:
+        def observe(self, stats):
+            raise RuntimeError("sink down")
+
+    with instrument("test.broken", sinks=[Broken()]):
+        pass
+
+    assert "Ошибка sink Broken" in caplog.text
+
+
+def test_prometheus_render():
+    sink = PrometheusSink(prefix="t")
+    for queries in (0, 1, 5, 7):
+        sink.observe(CallStats(name="svc.call", queries=queries))
+
+    text = sink.render()
+    assert "# TYPE t_queries histogram" in text
+    assert 't_queries_bucket{name="svc.call",le="1"} 2' in text
+    assert 't_queries_bucket{name="svc.call",le="5"} 3' in text
+    assert 't_queries_bucket{name="svc.call",le="+Inf"} 4' in text
+    assert 't_queries_sum{name="svc.call"} 13' in text
+    assert 't_queries_count{name="svc.call"} 4' in text
+
+
+def test_statsd_sink_sends_udp():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(2)
+    sink = StatsdSink(host="127.0.0.1", port=receiver.getsockname()[1], prefix="subflux")
+
+    with instrument("apps.svc.call", sinks=[sink]):
+        pass
+
+    payload = receiver.recv(4096).decode()
+    receiver.close()
+    assert "subflux.apps.svc.call.queries:0|h" in payload.splitlines()
+    assert any(line.startswith("subflux.apps.svc.call.wall_time:") and line.endswith("|ms")
+               for line in payload.splitlines())
+
+
+def test_gauges_reach_every_sink(sink):
+    prometheus = PrometheusSink(prefix="t")
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(2)
+    statsd = StatsdSink(host="127.0.0.1", port=receiver.getsockname()[1], prefix="subflux")
+
+    emit_gauges({"jobs.drift.current_price": 3}, sinks=[prometheus, statsd, sink, object()])
+
+    payload = receiver.recv(4096).decode()
+    receiver.close()
+    assert payload == "subflux.jobs.drift.current_price:3|g"
+    assert "# TYPE t_jobs_drift_current_price gauge\nt_jobs_drift_current_price 3" in prometheus.render()
+    assert sink.gauges == {"jobs.drift.current_price": 3}
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_not_mounted_by_default():
+    assert not prometheus_enabled()
+    assert APIClient().get("/metrics/").status_code == 404
+
+
+def test_metrics_view_requires_token():
+    request_factory = RequestFactory()
+    try:
+        with override_settings(INSTRUMENTATION_SINKS=["utils.instrumentation.PrometheusSink"],
+                               PROMETHEUS_METRICS_TOKEN="secret"):
+            reset_sinks()
+            assert prometheus_enabled()
+            with instrument("svc.endpoint"):
+                pass
+
+            assert prometheus_metrics(request_factory.get("/metrics/")).status_code == 403
+            response = prometheus_metrics(request_factory.get("/metrics/", HTTP_AUTHORIZATION="Bearer secret"))
+            assert response.status_code == 200
+            assert 'subflux_service_wall_time_count{name="svc.endpoint"} 1' in response.content.decode()
+    finally:
+        reset_sinks()
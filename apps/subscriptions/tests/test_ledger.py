@@ -0,0 +1,74 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from apps.subscriptions.models import BillingEvent, BillingSchedule, PriceHistory, Subscription
+from apps.subscriptions.tasks.maintenance import recalculate_due_schedules, recalculate_due_schedules_bulk
+
+from utils.enums import PeriodUnit, Status
+
+
+def _rewind(sub, days: int):
+    """
+    Расписание и история цены "отстают" на days дней (как после простоя сервиса)
+    """
+    past = timezone.now() - timedelta(days=days)
+    BillingSchedule.objects.filter(subscription=sub, is_current=True).update(next_run_at=past)
+    PriceHistory.objects.filter(subscription=sub).update(effective_from=past - timedelta(days=1))
+    return past
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("sweep", [recalculate_due_schedules, recalculate_due_schedules_bulk])
+def test_sweep_records_missed_charges(create_subscription, sweep):
+    """
+    Каждое наступившее списание (включая пропущенные) — строка журнала; last_billed_at — последнее из них
+    """
+    sub = create_subscription(amount=Decimal("3.00"), period_unit=PeriodUnit.DAY)
+    first = _rewind(sub, 3)
+
+    assert sweep() == 1
+
+    events = list(BillingEvent.objects.filter(subscription=sub).order_by("occurrence_at"))
+    assert len(events) == 4
+    assert events[0].occurrence_at == first
+    assert {(event.amount, event.currency) for event in events} == {(Decimal("3.00"), "USD")}
+    sub.refresh_from_db()
+    assert sub.last_billed_at == events[-1].occurrence_at
+    assert sub.next_billing_at > timezone.now()
+
+
+@pytest.mark.django_db
+def test_charges_use_price_in_effect(create_subscription):
+    sub = create_subscription(amount=Decimal("3.00"), period_unit=PeriodUnit.DAY)
+    first = _rewind(sub, 3)
+    # цена сменилась между первым и вторым списанием
+    change_at = first + timedelta(hours=12)
+    PriceHistory.objects.filter(subscription=sub).update(effective_to=change_at)
+    PriceHistory.objects.create(subscription=sub, amount=Decimal("4.00"), currency="USD", effective_from=change_at)
+
+    recalculate_due_schedules_bulk()
+
+    amounts = list(BillingEvent.objects.filter(subscription=sub).order_by("occurrence_at")
+                   .values_list("amount", flat=True))
+    assert amounts == [Decimal("3.00")] + [Decimal("4.00")] * 3
+
+
+@pytest.mark.django_db
+def test_rerun_is_noop_and_inactive_not_billed(create_subscription):
+    sub = create_subscription(period_unit=PeriodUnit.DAY)
+    paused = create_subscription(title="paused", period_unit=PeriodUnit.DAY)
+    Subscription.objects.filter(pk=paused.pk).update(status=Status.PAUSED)
+    past = _rewind(sub, 2)
+    _rewind(paused, 2)
+
+    recalculate_due_schedules_bulk()
+    count = BillingEvent.objects.count()
+    # повторный прогон по тем же датам (например, после отката чанка) не дублирует журнал
+    BillingSchedule.objects.filter(subscription=sub, is_current=True).update(next_run_at=past)
+    recalculate_due_schedules_bulk()
+
+    assert BillingEvent.objects.count() == count == 3
+    assert not BillingEvent.objects.filter(subscription=paused).exists()
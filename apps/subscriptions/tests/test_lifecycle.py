@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+
+from apps.analytics.models import MonthlySpend
+from apps.subscriptions.models import BillingOccurrence, BillingSchedule, OutboxEvent, Subscription
+from apps.subscriptions.services.lifecycle_service import ending_candidates, sweep_subscription_lifecycle
+
+from utils.enums import EventType, PeriodUnit, Status
+
+
+@pytest.mark.django_db
+def test_trial_ends_into_active(create_subscription, utc_dt):
+    now = utc_dt(2030, 3, 10)
+    ended = create_subscription(title="ended", status=Status.TRIAL)
+    running = create_subscription(title="running", status=Status.TRIAL)
+    BillingSchedule.objects.filter(subscription=ended).update(trial_ends_at=now - timedelta(hours=1))
+    BillingSchedule.objects.filter(subscription=running).update(trial_ends_at=now + timedelta(days=3))
+
+    result = sweep_subscription_lifecycle(now=now)
+
+    assert dict(result.transitions) == {(Status.TRIAL, Status.ACTIVE): 1}
+    assert Subscription.objects.get(pk=ended.pk).status == Status.ACTIVE
+    assert Subscription.objects.get(pk=running.pk).status == Status.TRIAL
+    # ACTIVE учитывается в агрегатах расходов, событие — в outbox
+    assert MonthlySpend.objects.filter(user=ended.user).exists()
+    event = OutboxEvent.objects.filter(event_type=EventType.STATUS_CHANGED).get()
+    assert (event.subscription_id, event.payload["previous"]) == (ended.pk, Status.TRIAL)
+
+
+@pytest.mark.django_db
+def test_grace_expiry(create_subscription, utc_dt):
+    now = utc_dt(2030, 3, 10)
+    today = now.date()
+    expired = create_subscription(title="expired", ended_at=today - timedelta(days=5))
+    canceled = create_subscription(title="canceled", status=Status.CANCELED, ended_at=today - timedelta(days=1))
+    in_grace = create_subscription(title="in grace", ended_at=today - timedelta(days=2))
+    BillingSchedule.objects.filter(subscription=expired).update(grace_days=3)
+    BillingSchedule.objects.filter(subscription=in_grace).update(grace_days=3)
+    assert BillingOccurrence.objects.filter(subscription=expired).exists()
+
+    result = sweep_subscription_lifecycle(now=now, chunk_size=1)
+
+    assert dict(result.transitions) == {(Status.ACTIVE, Status.EXPIRED): 1, (Status.CANCELED, Status.EXPIRED): 1}
+    assert set(Subscription.objects.filter(status=Status.EXPIRED).values_list("pk", flat=True)) == {expired.pk,
+                                                                                                   canceled.pk}
+    assert not BillingOccurrence.objects.filter(subscription=expired).exists()
+    # повторный прогон — переходов нет
+    assert sweep_subscription_lifecycle(now=now).total == 0
+
+
+@pytest.mark.django_db
+def test_sweep_query_count_independent_of_rows(create_subscription, utc_dt, django_assert_max_num_queries):
+    now = utc_dt(2030, 3, 10)
+    for i in range(10):
+        create_subscription(title=f"t{i}", status=Status.TRIAL, period_unit=PeriodUnit.YEAR)
+    BillingSchedule.objects.update(trial_ends_at=now - timedelta(days=1))
+
+    with django_assert_max_num_queries(25):
+        assert sweep_subscription_lifecycle(now=now).total == 10
+
+
+@pytest.mark.django_db
+def test_command_reports_transitions(create_subscription, capsys):
+    create_subscription(status=Status.TRIAL)
+    BillingSchedule.objects.update(trial_ends_at=BillingSchedule.objects.get().create_at)
+
+    call_command("sweep_subscription_lifecycle")
+
+    out = capsys.readouterr().out
+    assert "trial -> active: 1" in out and "Переходов: 1" in out
+
+
+@pytest.mark.django_db
+def test_grace_window_is_checked_in_query(create_subscription, utc_dt):
+    """
+    Подписки внутри льготного периода не попадают в кандидаты (и не захватываются FOR UPDATE)
+    """
+    today = utc_dt(2030, 3, 10).date()
+    in_grace = create_subscription(title="in grace", ended_at=today - timedelta(days=3))
+    expired = create_subscription(title="expired", ended_at=today - timedelta(days=4))
+    BillingSchedule.objects.filter(subscription__in=[in_grace, expired]).update(grace_days=3)
+
+    assert list(ending_candidates(today).values_list("pk", flat=True)) == [expired.pk]
@@ -0,0 +1,216 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from apps.subscriptions.models import Provider, ProviderLink
+from apps.subscriptions.services.link_health import (DEAD_AFTER_FAILURES, check_links_async, check_provider_links,
+    stale_links,
+)
+
+from utils.enums import LinkType, Platform
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """
+    Локальный stub HTTP-сервер:
+    /ok (ETag + 304), /no-head (HEAD 405 -> GET), /gone (404), /error (500), /slow, /concurrent
+    """
+    active = 0
+    max_active = 0
+    requests: list = []
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, head: bool):
+        cls = type(self)
+        with cls.lock:
+            cls.requests.append((self.command, self.path))
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            if self.path == "/ok":
+                if self.headers.get("If-None-Match") == '"v1"':
+                    self.send_response(304)
+                else:
+                    self.send_response(200)
+                    self.send_header("ETag", '"v1"')
+                    self.send_header("Last-Modified", "Wed, 01 Jan 2025 00:00:00 GMT")
+            elif self.path == "/no-head" and head:
+                self.send_response(405)
+            elif self.path == "/gone":
+                self.send_response(404)
+            elif self.path == "/error":
+                self.send_response(500)
+            elif self.path == "/slow":
+                time.sleep(1.5)
+                self.send_response(200)
+            elif self.path.startswith("/concurrent"):
+                time.sleep(0.1)
+                self.send_response(200)
+            else:
+                self.send_response(200)
+            body = b"" if head else b"body"
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def do_HEAD(self):
+        self._reply(head=True)
+
+    def do_GET(self):
+        self._reply(head=False)
+
+
+def _serve():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture()
+def stub_server():
+    _StubHandler.requests = []
+    _StubHandler.active = _StubHandler.max_active = 0
+    server = _serve()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def provider(db):
+    return Provider.objects.create(name="Stub", slug="stub", description="")
+
+
+def _link(provider, url, **kwargs):
+    return ProviderLink.objects.create(provider=provider, region=kwargs.pop("region", "GLOBAL"),
+                                       platform=kwargs.pop("platform", Platform.WEB),
+                                       link_type=kwargs.pop("link_type", LinkType.BILLING), url=url, **kwargs)
+
+
+@pytest.mark.django_db
+def test_check_and_write_back(stub_server, provider):
+    """
+    Результаты записываются пачкой, 404 деактивирует ссылку сразу, HEAD 405 -> GET
+    """
+    ok = _link(provider, f"{stub_server}/ok")
+    no_head = _link(provider, f"{stub_server}/no-head", link_type=LinkType.ACCOUNT)
+    gone = _link(provider, f"{stub_server}/gone", link_type=LinkType.SUPPORT)
+    error = _link(provider, f"{stub_server}/error", link_type=LinkType.PRICING)
+
+    summary = check_provider_links(timeout=1.0)
+
+    assert (summary.checked, summary.ok, summary.failed, summary.deactivated) == (4, 2, 2, 1)
+    ok.refresh_from_db()
+    assert ok.last_status_code == 200 and ok.etag == '"v1"' and ok.last_checked_at is not None
+    no_head.refresh_from_db()
+    assert no_head.last_status_code == 200
+    assert ("GET", "/no-head") in _StubHandler.requests
+    gone.refresh_from_db()
+    assert gone.is_active is False
+    error.refresh_from_db()
+    assert error.is_active is True and error.failure_count == 1
+    provider.refresh_from_db()
+    assert provider.last_links_checked_at is not None
+
+    # Все ссылки проверены — повторный прогон по устаревшим ничего не делает
+    assert not stale_links().exists()
+    assert check_provider_links().checked == 0
+
+
+@pytest.mark.django_db
+def test_conditional_request_and_dead_after_failures(stub_server, provider):
+    """
+    Повторная проверка отправляет If-None-Match (304 — ok); N ошибок подряд деактивируют ссылку
+    """
+    ok = _link(provider, f"{stub_server}/ok")
+    error = _link(provider, f"{stub_server}/error", link_type=LinkType.ACCOUNT)
+
+    for _ in range(DEAD_AFTER_FAILURES):
+        check_provider_links(ProviderLink.objects.filter(is_active=True), timeout=1.0)
+
+    ok.refresh_from_db()
+    assert ok.last_status_code == 304 and ok.etag == '"v1"' and ok.is_active
+    error.refresh_from_db()
+    assert error.failure_count == DEAD_AFTER_FAILURES
+    assert error.is_active is False
+
+
+@pytest.mark.django_db
+def test_timeout_and_connection_error(stub_server, provider):
+    """
+    Таймаут и отказ соединения — ошибка проверки, без исключения
+    """
+    slow = _link(provider, f"{stub_server}/slow")
+    refused = _link(provider, "http://127.0.0.1:1/refused", link_type=LinkType.ACCOUNT)
+
+    results = {r.link_id: r for r in asyncio.run(check_links_async([slow, refused], timeout=0.3))}
+
+    assert results[slow.pk].error == "timeout"
+    assert results[refused.pk].status_code is None and results[refused.pk].error
+
+
+@pytest.mark.django_db
+def test_malformed_url_does_not_break_batch(stub_server, provider):
+    """
+    Некорректный URL — неудачная проверка этой ссылки, остальные ссылки пачки записываются
+    """
+    ok = _link(provider, f"{stub_server}/ok")
+    broken = _link(provider, "http://[::1/", link_type=LinkType.ACCOUNT)
+    bad_port = _link(provider, "http://example.com:99999/", link_type=LinkType.SUPPORT)
+
+    summary = check_provider_links(timeout=1.0)
+
+    assert (summary.checked, summary.ok, summary.failed) == (3, 1, 2)
+    broken.refresh_from_db()
+    bad_port.refresh_from_db()
+    assert broken.failure_count == 1 and broken.last_checked_at is not None
+    assert bad_port.failure_count == 1
+
+
+@pytest.mark.django_db
+def test_per_host_limit(stub_server, provider):
+    """
+    Одновременных запросов к одному host не больше per_host
+    """
+    links = [_link(provider, f"{stub_server}/concurrent/{i}", region=region, platform=platform)
+             for i, (region, platform) in enumerate((r, p) for r in ("US", "DE", "FR") for p in Platform.values)]
+
+    results = asyncio.run(check_links_async(links, concurrency=50, per_host=2))
+
+    assert all(result.is_ok for result in results)
+    assert 1 <= _StubHandler.max_active <= 2
+
+
+@pytest.mark.django_db
+def test_busy_host_does_not_hold_global_slots(stub_server, provider):
+    """
+    Ссылки, ждущие занятый host, не занимают общие слоты: другой host проверяется параллельно
+    """
+    other = _serve()
+    other_url = f"http://127.0.0.1:{other.server_address[1]}"
+    pairs = [(r, p) for r in ("US", "DE", "FR") for p in Platform.values]
+    busy = [_link(provider, f"{stub_server}/concurrent/{i}", region=region, platform=platform)
+            for i, (region, platform) in enumerate(pairs[:6])]
+    free = [_link(provider, f"{other_url}/concurrent/free-{i}", region=region, platform=platform)
+            for i, (region, platform) in enumerate(pairs[6:8])]
+
+    try:
+        results = asyncio.run(check_links_async(busy + free, concurrency=3, per_host=2))
+    finally:
+        other.shutdown()
+        other.server_close()
+
+    assert all(result.is_ok for result in results)
+    # Свободный host получает третий общий слот в первой волне, а не после очереди занятого host
+    assert _StubHandler.requests.index(("HEAD", "/concurrent/free-0")) < 3
@@ -0,0 +1,94 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from apps.subscriptions.models import Provider, ProviderLink
+from apps.subscriptions.services.link_resolver import resolve_link, resolve_links, resolve_subscription_links
+
+from utils.enums import LinkType, Platform
+
+
+def _link(provider, region, platform, link_type=LinkType.BILLING, **kwargs):
+    return ProviderLink.objects.create(provider=provider, region=region, platform=platform, link_type=link_type,
+                                       url=f"https://{provider.slug}.example.com/{region}/{platform}/{link_type}",
+                                       **kwargs)
+
+
+@pytest.fixture()
+def providers(db):
+    cache.clear()
+    full = Provider.objects.create(name="Full", slug="full", description="")
+    for region in ("US", "GLOBAL"):
+        for platform in (Platform.IOS, Platform.WEB):
+            _link(full, region, platform)
+    _link(full, "US", Platform.ANDROID, link_type=LinkType.SUPPORT)
+
+    web_only = Provider.objects.create(name="Web", slug="web-only", description="")
+    _link(web_only, "US", Platform.WEB)
+    _link(web_only, "GLOBAL", Platform.WEB)
+    _link(web_only, "DE", Platform.IOS, is_active=False)
+
+    empty = Provider.objects.create(name="Empty", slug="empty", description="")
+    return full, web_only, empty
+
+
+@pytest.mark.django_db
+def test_priority_order(providers):
+    """
+    region+platform -> GLOBAL+platform -> region+WEB -> GLOBAL+WEB
+    """
+    full, web_only, empty = providers
+
+    assert resolve_link(full.pk, region="US", platform=Platform.IOS).url.endswith("/US/ios/billing")
+    assert resolve_link(full.pk, region="DE", platform=Platform.IOS).url.endswith("/GLOBAL/ios/billing")
+    assert resolve_link(full.pk, region="US", platform=Platform.TV).url.endswith("/US/web/billing")
+    assert resolve_link(full.pk, region="DE", platform=Platform.TV).url.endswith("/GLOBAL/web/billing")
+    # Неактивная ссылка пропускается
+    assert resolve_link(web_only.pk, region="DE", platform=Platform.IOS).url.endswith("/GLOBAL/web/billing")
+    assert resolve_link(empty.pk, region="US", platform=Platform.IOS) is None
+    assert resolve_link(full.pk, region="US", platform=Platform.ANDROID,
+                        link_type=LinkType.SUPPORT).url.endswith("/US/android/support")
+
+
+@pytest.mark.django_db
+def test_bulk_resolution_is_one_query(providers, create_subscription, django_assert_num_queries):
+    """
+    Ссылки для списка подписок разрешаются одним запросом
+    """
+    full, web_only, empty = providers
+    subs = [create_subscription(title=p.name, provider=p) for p in (full, web_only, empty)]
+    subs.append(create_subscription(title="No provider"))
+
+    with django_assert_num_queries(1):
+        links = resolve_subscription_links(subs, region="US", platform=Platform.IOS)
+
+    assert links[subs[0].pk].url.endswith("/US/ios/billing")
+    assert links[subs[1].pk].url.endswith("/US/web/billing")
+    assert links[subs[2].pk] is None
+    assert links[subs[3].pk] is None
+
+    with django_assert_num_queries(0):
+        assert resolve_links([]) == {}
+
+
+@pytest.mark.django_db
+def test_list_endpoint_returns_billing_link(user, providers, create_subscription, django_assert_max_num_queries):
+    """
+    billing_link в списке и в карточке подписки
+    """
+    full, web_only, _ = providers
+    sub_full = create_subscription(title="full", provider=full)
+    create_subscription(title="web", provider=web_only)
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get("/api/subscriptions/subscriptions/", {"region": "US", "platform": "ios"})
+    assert response.status_code == 200
+    links = {row["title"]: row["billing_link"] for row in response.data["results"]}
+    assert links["full"].endswith("/US/ios/billing")
+    assert links["web"].endswith("/US/web/billing")
+
+    detail = client.get(f"/api/subscriptions/subscriptions/{sub_full.pk}/", {"platform": "tv"})
+    assert detail.data["billing_link"].endswith("/GLOBAL/web/billing")
+
+    assert client.get("/api/subscriptions/subscriptions/", {"region": "ZZ"}).status_code == 400
@@ -0,0 +1,137 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.subscriptions.models import BillingSchedule, Subscription
+from apps.subscriptions.services.billing_service import calculate_next_run_at
+from apps.subscriptions.tasks import maintenance
+from apps.subscriptions.tasks.maintenance import recalculate_due_schedules, recalculate_due_schedules_bulk
+
+from utils.enums import PeriodUnit
+
+
+def _make_due(*subs):
+    """
+    Сдвигаем next_run_at актуальных расписаний в прошлое (расписание "просрочено")
+    """
+    past = timezone.now() - timedelta(days=3)
+    BillingSchedule.objects.filter(subscription__in=subs, is_current=True).update(next_run_at=past)
+    Subscription.objects.filter(pk__in=[s.pk for s in subs]).update(next_billing_at=past)
+
+
+@pytest.mark.django_db
+def test_bulk_recalculation_matches_row_by_row(create_subscription):
+    """
+    Bulk режим дает те же next_run_at/next_billing_at, что и построчный пересчет
+    """
+    subs = [
+        create_subscription(title="day", period_unit=PeriodUnit.DAY, period_interval=3),
+        create_subscription(title="week", period_unit=PeriodUnit.WEEK, anchor_weekday=4, billing_timezone="Europe/Moscow"),
+        create_subscription(title="month", period_unit=PeriodUnit.MONTH, anchor_day=31, billing_timezone="America/New_York"),
+        create_subscription(title="year", period_unit=PeriodUnit.YEAR),
+    ]
+
+    _make_due(*subs)
+    assert recalculate_due_schedules() == len(subs)
+    expected = {s.pk: s.next_run_at for s in BillingSchedule.objects.filter(is_current=True)}
+
+    _make_due(*subs)
+    assert recalculate_due_schedules_bulk() == len(subs)
+
+    for schedule in BillingSchedule.objects.filter(is_current=True).select_related("subscription"):
+        # Опорный момент между запусками чуть сдвинулся, поэтому сравниваем с точностью до минуты
+        assert abs(schedule.next_run_at - expected[schedule.pk]) < timedelta(minutes=1)
+        assert schedule.subscription.next_billing_at == schedule.next_run_at
+        assert schedule.next_run_at > timezone.now()
+
+
+@pytest.mark.django_db
+def test_bulk_recalculation_query_count(create_subscription):
+    """
+    На чанк: SELECT + журнал списаний (цены + INSERT BillingEvent) + UPDATE расписаний + UPDATE подписок
+    + INSERT событий outbox + 5 запросов прогноза (DELETE прошедших, агрегат, расписания, цены, DELETE пересборки),
+    плюс пустой SELECT завершения.
+    SAVEPOINT-ы и пакетные INSERT прогноза не считаем — их число зависит от горизонта, а не от строк
+    """
+    subs = [create_subscription(title=f"sub {i}", period_unit=PeriodUnit.DAY) for i in range(10)]
+    _make_due(*subs)
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert recalculate_due_schedules_bulk(chunk_size=100) == 10
+
+    queries = [q["sql"] for q in ctx.captured_queries
+               if "SAVEPOINT" not in q["sql"] and not q["sql"].startswith('INSERT INTO "billing_occurrences"')]
+    assert len(queries) == 12
+
+
+@pytest.mark.django_db
+def test_bulk_recalculation_respects_limit_and_chunks(create_subscription):
+    """
+    limit ограничивает общее количество, chunk_size — размер одной транзакции
+    """
+    subs = [create_subscription(title=f"sub {i}", period_unit=PeriodUnit.DAY) for i in range(5)]
+    _make_due(*subs)
+
+    assert recalculate_due_schedules_bulk(limit=3, chunk_size=2) == 3
+    assert BillingSchedule.objects.filter(is_current=True, next_run_at__lte=timezone.now()).count() == 2
+    assert recalculate_due_schedules_bulk(chunk_size=2) == 2
+
+
+@pytest.mark.django_db
+def test_calculate_next_run_at_does_not_write(create_subscription):
+    """
+    calculate_next_run_at — чистая функция, ничего не сохраняет
+    """
+    sub = create_subscription(period_unit=PeriodUnit.DAY)
+    schedule = BillingSchedule.objects.get(subscription=sub, is_current=True)
+    stored = schedule.next_run_at
+
+    result = calculate_next_run_at(schedule, from_dt=stored + timedelta(days=10))
+
+    schedule.refresh_from_db()
+    assert schedule.next_run_at == stored
+    assert result == stored + timedelta(days=11)
+
+
+@pytest.mark.django_db
+def test_bulk_recalculation_skips_failed_rows(create_subscription, monkeypatch):
+    """
+    Ошибка в одной строке не откатывает остальные строки чанка
+    """
+    subs = [create_subscription(title=f"sub {i}", period_unit=PeriodUnit.DAY) for i in range(4)]
+    _make_due(*subs)
+    broken = BillingSchedule.objects.get(subscription=subs[1], is_current=True)
+
+    original = maintenance.bulk_recalculate_schedules
+
+    def _flaky(schedules, **kwargs):
+        schedules = list(schedules)
+        if any(s.pk == broken.pk for s in schedules):
+            raise RuntimeError("broken row")
+        return original(schedules, **kwargs)
+
+    monkeypatch.setattr(maintenance, "bulk_recalculate_schedules", _flaky)
+
+    assert recalculate_due_schedules_bulk(chunk_size=10) == 3
+    due = BillingSchedule.objects.filter(is_current=True, next_run_at__lte=timezone.now())
+    assert list(due.values_list("pk", flat=True)) == [broken.pk]
+
+
+@pytest.mark.django_db
+def test_recalculate_due_schedules_command(create_subscription):
+    """
+    Management command разбирает очередь в bulk режиме
+    """
+    subs = [create_subscription(title=f"sub {i}", period_unit=PeriodUnit.WEEK) for i in range(3)]
+    _make_due(*subs)
+
+    out = StringIO()
+    call_command("recalculate_due_schedules", "--chunk-size", "2", stdout=out)
+
+    assert "3" in out.getvalue()
+    assert not BillingSchedule.objects.filter(is_current=True, next_run_at__lte=timezone.now()).exists()
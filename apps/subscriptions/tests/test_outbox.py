@@ -0,0 +1,85 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+
+from apps.subscriptions.models import OutboxCheckpoint, OutboxEvent
+from apps.subscriptions.services.outbox import purge_published, relay_outbox
+from apps.subscriptions.services.subscription_service import change_subscription_status, set_subscription_price
+
+from utils.enums import EventType, Status
+
+
+@pytest.mark.django_db
+def test_service_layer_writes_events(create_subscription):
+    """
+    Создание, смена цены и статуса пишут события в outbox
+    """
+    sub = create_subscription(amount=Decimal("5.00"))
+    set_subscription_price(subscription=sub, amount=Decimal("6.00"), currency="USD")
+    change_subscription_status(subscription=sub, status=Status.PAUSED)
+
+    events = list(OutboxEvent.objects.filter(subscription_id=sub.pk).order_by("id"))
+    assert [event.event_type for event in events] == [EventType.NEXT_BILLING_CHANGED, EventType.PRICE_CHANGED,
+                                                      EventType.STATUS_CHANGED]
+    assert all(event.user_id == sub.user_id for event in events)
+    assert events[1].payload["amount"] == "6.00" and events[1].payload["price_version"] == 1
+    assert events[2].payload == {"status": Status.PAUSED, "previous": Status.ACTIVE}
+
+
+@pytest.mark.django_db
+def test_rolled_back_change_has_no_event(create_subscription):
+    sub = create_subscription()
+    before = OutboxEvent.objects.count()
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            change_subscription_status(subscription=sub, status=Status.CANCELED)
+            raise RuntimeError
+
+    assert OutboxEvent.objects.count() == before
+
+
+@pytest.mark.django_db
+def test_relay_publishes_in_batches_with_checkpoint(create_subscription):
+    for i in range(5):
+        create_subscription(title=f"s{i}")
+    batches = []
+
+    assert relay_outbox(name="test", publisher=lambda events: batches.append([e.pk for e in events]),
+                        batch_size=2) == 5
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert not OutboxEvent.objects.filter(published_at__isnull=True).exists()
+    checkpoint = OutboxCheckpoint.objects.get(name="test")
+    assert (checkpoint.last_event_id, checkpoint.published_count) == (batches[-1][-1], 5)
+    # очередь пуста — повторный запуск ничего не передает
+    assert relay_outbox(name="test", publisher=batches.append) == 0
+
+
+@pytest.mark.django_db
+def test_relay_failure_keeps_events_queued(create_subscription):
+    create_subscription()
+
+    def failing(events):
+        raise ConnectionError
+
+    with pytest.raises(ConnectionError):
+        relay_outbox(publisher=failing)
+
+    assert OutboxEvent.objects.filter(published_at__isnull=True).count() == 1
+    assert OutboxCheckpoint.objects.get(name="default").published_count == 0
+
+
+@pytest.mark.django_db
+def test_purge_and_command(create_subscription, capsys):
+    create_subscription()
+    call_command("relay_outbox", "--batch-size", "10")
+    assert "Передано событий: 1" in capsys.readouterr().out
+
+    OutboxEvent.objects.update(published_at=timezone.now() - timedelta(days=30))
+    assert purge_published() == 1
+    assert not OutboxEvent.objects.exists()
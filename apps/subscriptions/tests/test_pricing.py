@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+import pytest
+from rest_framework.test import APIClient
+
+from apps.subscriptions.models import PriceHistory
+from apps.subscriptions.services.pricing_service import price_at, price_intervals, prices_at, user_prices_at
+from apps.subscriptions.services.subscription_service import set_subscription_price
+
+
+@pytest.fixture()
+def priced_subscriptions(create_subscription, utc_dt):
+    """
+    a: 10 USD с 2025-01-01, 12 USD с 2025-06-01; b: 5 EUR с 2025-03-01
+    """
+    a = create_subscription(title="a", amount=Decimal("10.00"))
+    b = create_subscription(title="b", amount=Decimal("5.00"), currency="EUR")
+    PriceHistory.objects.filter(subscription=a).update(effective_from=utc_dt(2025, 1, 1))
+    PriceHistory.objects.filter(subscription=b).update(effective_from=utc_dt(2025, 3, 1))
+    set_subscription_price(subscription=a, amount=Decimal("12.00"), currency="USD",
+                           effective_from=utc_dt(2025, 6, 1))
+    return a, b
+
+
+@pytest.mark.django_db
+def test_price_at_boundaries(priced_subscriptions, utc_dt):
+    """
+    Интервал [effective_from, effective_to): граница принадлежит новой цене
+    """
+    a, b = priced_subscriptions
+
+    assert price_at(a, utc_dt(2024, 12, 31)) is None
+    assert price_at(a, utc_dt(2025, 1, 1)).amount == Decimal("10.00")
+    assert price_at(a, utc_dt(2025, 5, 31, 23)).amount == Decimal("10.00")
+    assert price_at(a, utc_dt(2025, 6, 1)).amount == Decimal("12.00")
+    assert price_at(a.pk, utc_dt(2030, 1, 1)).amount == Decimal("12.00")
+
+
+@pytest.mark.django_db
+def test_batch_prices_in_one_query(user, priced_subscriptions, utc_dt, django_assert_num_queries):
+    """
+    Цены многих подписок на момент T — одним запросом
+    """
+    a, b = priced_subscriptions
+
+    with django_assert_num_queries(1):
+        prices = prices_at([a.pk, b.pk], utc_dt(2025, 4, 1))
+    assert {pk: p.amount for pk, p in prices.items()} == {a.pk: Decimal("10.00"), b.pk: Decimal("5.00")}
+
+    with django_assert_num_queries(1):
+        prices = user_prices_at(user, utc_dt(2025, 2, 1))
+    assert list(prices) == [a.pk]
+
+    intervals = list(price_intervals([a.pk, b.pk], date_from=utc_dt(2025, 5, 1), date_to=utc_dt(2025, 7, 1)))
+    assert [(p.subscription_id, p.amount) for p in intervals] == \
+           [(a.pk, Decimal("10.00")), (a.pk, Decimal("12.00")), (b.pk, Decimal("5.00"))]
+
+
+@pytest.mark.django_db
+def test_prices_at_endpoint(user, priced_subscriptions):
+    """
+    GET /api/subscriptions/prices-at/?at=
+    """
+    a, b = priced_subscriptions
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get("/api/subscriptions/prices-at/", {"at": "2025-07-01T00:00:00Z"})
+
+    assert response.status_code == 200
+    assert [(row["subscription"], row["amount"]) for row in response.data["prices"]] == \
+           [(a.pk, "12.00"), (b.pk, "5.00")]
@@ -0,0 +1,100 @@
+"""
+Регрессия планов запросов планировщика: EXPLAIN должен использовать частичные индексы BillingSchedule.
+
+План закрепляется данными, а не только настройками: 500 подписок с актуальным расписанием без trial
+и история версий (is_current=False), затем ANALYZE. С такой статистикой нужный индекс — самый дешевый путь;
+seq scan и bitmap scan дополнительно отключены. Проверяется только имя индекса в плане, не конкретный узел.
+"""
+from contextlib import contextmanager
+from decimal import Decimal
+
+import pytest
+from django.db import IntegrityError, connection, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from apps.subscriptions.models import BillingSchedule, Subscription
+from apps.subscriptions.services.lifecycle_service import trial_candidates
+
+from utils.enums import Status
+
+
+@contextmanager
+def _plans_prefer_indexes():
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+        yield
+
+
+def _seed(schedule: BillingSchedule, *, subscriptions: int = 500, versions: int = 200) -> None:
+    """
+    Подписки с актуальным расписанием без trial (частичные индексы по is_current заполнены) и история версий
+    расписания schedule (в частичные индексы не попадает) + свежая статистика планировщика
+    """
+    subs = Subscription.objects.bulk_create(
+        Subscription(user_id=schedule.subscription.user_id, title=f"seed {i}", current_price_amount=Decimal("1.00"),
+                     current_price_currency="USD")
+        for i in range(subscriptions))
+    BillingSchedule.objects.bulk_create(
+        [BillingSchedule(subscription=sub, period_unit=schedule.period_unit, anchor_day=schedule.anchor_day,
+                         next_run_at=schedule.next_run_at, is_current=True)
+         for sub in subs]
+        + [BillingSchedule(subscription_id=schedule.subscription_id, period_unit=schedule.period_unit,
+                           anchor_day=schedule.anchor_day, next_run_at=schedule.next_run_at, is_current=False)
+           for _ in range(versions)])
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {Subscription._meta.db_table}, {BillingSchedule._meta.db_table}")
+
+
+def _plan(queryset: QuerySet) -> str:
+    with _plans_prefer_indexes():
+        return queryset.explain()
+
+
+@pytest.mark.django_db
+def test_due_queue_uses_partial_index(create_subscription):
+    sub = create_subscription()
+    _seed(sub.current_schedule)
+
+    plan = _plan(BillingSchedule.objects.filter(is_current=True, next_run_at__lte=timezone.now())
+                 .order_by("next_run_at"))
+
+    assert "billing_schedule_due_idx" in plan
+
+
+@pytest.mark.django_db
+def test_current_schedule_lookup_uses_partial_unique_index(create_subscription):
+    sub = create_subscription()
+    _seed(sub.current_schedule)
+
+    plan = _plan(BillingSchedule.objects.filter(subscription=sub, is_current=True))
+
+    assert "uniq_billing_schedule_current" in plan
+
+
+@pytest.mark.django_db
+def test_trial_queue_uses_partial_index(create_subscription):
+    sub = create_subscription(status=Status.TRIAL)
+    BillingSchedule.objects.filter(pk=sub.current_schedule_id).update(trial_ends_at=timezone.now())
+    _seed(sub.current_schedule)
+
+    plan = _plan(trial_candidates(timezone.now()))
+
+    assert "billing_schedule_trial_idx" in plan
+
+
+@pytest.mark.django_db
+def test_second_current_schedule_is_rejected(create_subscription):
+    sub = create_subscription()
+    current = BillingSchedule.objects.get(subscription=sub)
+
+    with pytest.raises(IntegrityError), transaction.atomic():
+        BillingSchedule.objects.create(subscription=sub, period_unit=current.period_unit, anchor_day=1,
+                                       next_run_at=current.next_run_at, is_current=True)
+
+    # история (is_current=False) не ограничена
+    BillingSchedule.objects.create(subscription=sub, period_unit=current.period_unit, anchor_day=1,
+                                   next_run_at=current.next_run_at, is_current=False)
+    assert BillingSchedule.objects.filter(subscription=sub).count() == 2
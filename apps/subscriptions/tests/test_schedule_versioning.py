@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.subscriptions.models import BillingOccurrence, BillingSchedule, Subscription
+from apps.subscriptions.services.billing_service import sync_subscription_next_billing
+from apps.subscriptions.services.subscription_service import ScheduleInput, replace_schedule
+
+from utils.enums import PeriodUnit
+
+
+@pytest.mark.django_db
+def test_replace_schedule_switches_current_version(create_subscription, utc_dt):
+    sub = create_subscription(period_unit=PeriodUnit.MONTH, anchor_day=1)
+    old = sub.current_schedule
+    now = utc_dt(2030, 1, 10)
+
+    new = replace_schedule(sub, ScheduleInput(period_unit=PeriodUnit.WEEK, anchor_weekday=2), now=now)
+
+    old.refresh_from_db()
+    sub.refresh_from_db()
+    assert not old.is_current and new.is_current
+    assert sub.current_schedule_id == new.pk
+    assert BillingSchedule.objects.filter(subscription=sub).count() == 2
+    # 2030-01-10 — четверг, следующая среда — 2030-01-16
+    assert new.next_run_at == utc_dt(2030, 1, 16)
+    assert sub.next_billing_at == new.next_run_at
+    occurs = list(BillingOccurrence.objects.filter(subscription=sub).values_list("occurs_at", flat=True)[:2])
+    assert occurs == [new.next_run_at, new.next_run_at + timedelta(weeks=1)]
+
+
+@pytest.mark.django_db
+def test_replace_schedule_keeps_concurrent_timezone_change(create_subscription, utc_dt):
+    sub = create_subscription(period_unit=PeriodUnit.DAY)
+    stale = Subscription.objects.get(pk=sub.pk)
+    Subscription.objects.filter(pk=sub.pk).update(billing_timezone="America/New_York")
+
+    new = replace_schedule(stale, ScheduleInput(period_unit=PeriodUnit.WEEK, anchor_weekday=2),
+                           now=utc_dt(2030, 1, 10))
+
+    sub.refresh_from_db()
+    assert sub.billing_timezone == "America/New_York"
+    assert sub.current_schedule_id == new.pk
+
+
+@pytest.mark.django_db
+def test_replace_schedule_validates_before_changes(create_subscription):
+    sub = create_subscription()
+    old_id = sub.current_schedule_id
+
+    with pytest.raises(ValidationError):
+        replace_schedule(sub, ScheduleInput(period_unit=PeriodUnit.MONTH))
+
+    assert BillingSchedule.objects.get(subscription=sub, is_current=True).pk == old_id
+
+
+@pytest.mark.django_db
+def test_next_billing_sync_is_pk_lookup(create_subscription):
+    sub = create_subscription()
+    Subscription.objects.filter(pk=sub.pk).update(next_billing_at=None)
+    sub.refresh_from_db()
+
+    with CaptureQueriesContext(connection) as ctx:
+        sync_subscription_next_billing(sub)
+
+    # SELECT расписания по PK + UPDATE подписки + INSERT события outbox
+    queries = [q["sql"] for q in ctx.captured_queries if "SAVEPOINT" not in q["sql"]]
+    assert len(queries) == 3
+    assert '"billing_schedules"."id" =' in queries[0] and "is_current" not in queries[0]
+    assert sub.next_billing_at == sub.current_schedule.next_run_at
+
+
+@pytest.mark.django_db
+def test_api_list_includes_schedule_without_extra_queries(user, create_subscription, django_assert_max_num_queries):
+    for i in range(5):
+        create_subscription(title=f"s{i}", period_unit=PeriodUnit.DAY, period_interval=i + 1)
+    client = APIClient()
+    client.force_authenticate(user)
+
+    with django_assert_max_num_queries(4):
+        response = client.get("/api/subscriptions/subscriptions/")
+
+    assert sorted(row["schedule"]["period_interval"] for row in response.data["results"]) == [1, 2, 3, 4, 5]
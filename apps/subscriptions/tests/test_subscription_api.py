@@ -0,0 +1,130 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.subscriptions.api.views import SubscriptionViewSet
+from apps.subscriptions.models import Category, OutboxEvent, PriceHistory, Subscription
+from apps.subscriptions.services.subscription_service import PriceInput, bulk_change_price
+
+from utils.enums import EventType, PeriodUnit, Status
+
+
+@pytest.fixture()
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def _collect(client, params):
+    """
+    Проход по всем страницам cursor-пагинации
+    """
+    ids = []
+    response = client.get("/api/subscriptions/subscriptions/", params)
+    while True:
+        assert response.status_code == 200
+        ids.extend(row["id"] for row in response.data["results"])
+        if not response.data["next"]:
+            return ids
+        response = client.get(response.data["next"])
+
+
+@pytest.mark.django_db
+def test_list_is_cursor_paginated(api_client, create_subscription):
+    """
+    Список разбит на страницы, проход по cursor возвращает каждую подписку ровно один раз
+    """
+    subs = [create_subscription(title=f"sub {i}", period_unit=PeriodUnit.DAY, period_interval=i + 1) for i in range(7)]
+
+    response = api_client.get("/api/subscriptions/subscriptions/", {"page_size": 3})
+    assert len(response.data["results"]) == 3
+    assert "count" not in response.data
+
+    assert _collect(api_client, {"page_size": 3}) == sorted((s.pk for s in subs), reverse=True)
+
+    by_billing = _collect(api_client, {"page_size": 2, "ordering": "next_billing_at"})
+    expected = list(Subscription.objects.order_by("next_billing_at", "id").values_list("id", flat=True))
+    assert by_billing == expected
+
+
+@pytest.mark.django_db
+def test_list_filters(api_client, create_subscription):
+    """
+    Фильтры status/category/окно next_billing_at
+    """
+    video = Category.objects.create(name="Video", slug="video")
+    daily = create_subscription(title="daily", period_unit=PeriodUnit.DAY, category=video)
+    yearly = create_subscription(title="yearly", period_unit=PeriodUnit.YEAR)
+    paused = create_subscription(title="paused", period_unit=PeriodUnit.WEEK, status=Status.PAUSED)
+
+    assert _collect(api_client, {"status": "paused"}) == [paused.pk]
+    assert set(_collect(api_client, {"status": "active,paused"})) == {daily.pk, yearly.pk, paused.pk}
+    assert _collect(api_client, {"category": video.pk}) == [daily.pk]
+
+    window_end = (timezone.now() + timedelta(days=30)).isoformat()
+    assert yearly.pk not in _collect(api_client, {"next_billing_to": window_end})
+
+    response = api_client.get("/api/subscriptions/subscriptions/", {"status": "unknown"})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_price_patch_goes_through_service_layer(api_client, create_subscription):
+    """
+    PATCH цены: новая запись PriceHistory, price_version, событие outbox; остальные поля сохраняются как обычно
+    """
+    sub = create_subscription(amount=Decimal("5.00"))
+    url = f"/api/subscriptions/subscriptions/{sub.pk}/"
+
+    response = api_client.patch(url, {"current_price_amount": "7.00", "owner_note": "new"}, format="json")
+
+    assert response.status_code == 200
+    assert (response.data["current_price_amount"], response.data["price_version"]) == ("7.00", 1)
+    sub.refresh_from_db()
+    assert (sub.current_price_amount, sub.owner_note, sub.price_version) == (Decimal("7.00"), "new", 1)
+    assert list(PriceHistory.objects.filter(subscription=sub, effective_to__isnull=True)
+                .values_list("amount", flat=True)) == [Decimal("7.00")]
+    assert OutboxEvent.objects.filter(subscription_id=sub.pk, event_type=EventType.PRICE_CHANGED).count() == 1
+
+    # та же цена — без новой версии
+    api_client.patch(url, {"current_price_amount": "7.00"}, format="json")
+    assert PriceHistory.objects.filter(subscription=sub).count() == 2
+
+
+@pytest.mark.django_db
+def test_price_patch_conflict(api_client, create_subscription, monkeypatch):
+    """
+    Цена изменена параллельно между чтением и записью — 409, остальные поля не сохраняются
+    """
+    sub = create_subscription(amount=Decimal("5.00"))
+    original_get_object = SubscriptionViewSet.get_object
+
+    def stale_get_object(view):
+        instance = original_get_object(view)
+        bulk_change_price([sub.pk], price=PriceInput(amount=Decimal("6.00"), currency="USD"))
+        return instance
+
+    monkeypatch.setattr(SubscriptionViewSet, "get_object", stale_get_object)
+    response = api_client.patch(f"/api/subscriptions/subscriptions/{sub.pk}/",
+                                {"current_price_amount": "9.00", "owner_note": "lost"}, format="json")
+
+    assert response.status_code == 409
+    sub.refresh_from_db()
+    assert (sub.current_price_amount, sub.price_version, sub.owner_note) == (Decimal("6.00"), 1, None)
+
+
+@pytest.mark.django_db
+def test_status_patch_writes_outbox_event(api_client, create_subscription):
+    sub = create_subscription()
+
+    response = api_client.patch(f"/api/subscriptions/subscriptions/{sub.pk}/", {"status": Status.PAUSED},
+                                format="json")
+
+    assert response.status_code == 200
+    event = OutboxEvent.objects.get(subscription_id=sub.pk, event_type=EventType.STATUS_CHANGED)
+    assert event.payload == {"status": Status.PAUSED, "previous": Status.ACTIVE}
+    assert Subscription.objects.get(pk=sub.pk).status == Status.PAUSED
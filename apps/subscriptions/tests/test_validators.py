@@ -0,0 +1,34 @@
+import pytest
+from django.core.exceptions import ValidationError
+
+from utils.iso_codes import CURRENCY_CODES, REGION_CODES
+from utils.validators import invalid_currencies, invalid_regions, validator_currency, validator_region
+
+
+def test_validators_use_precomputed_codes():
+    """
+    Валидаторы работают по frozenset из utils.iso_codes
+    """
+    assert {"USD", "EUR", "RUB"} <= CURRENCY_CODES
+    assert {"US", "DE", "RU"} <= REGION_CODES
+
+    validator_currency("RUB")
+    validator_region("DE")
+    validator_region("GLOBAL")
+
+    for value in ("", "usd", "XXQ"):
+        with pytest.raises(ValidationError):
+            validator_currency(value)
+    for value in ("", "de", "ZZ", "GLOBALS"):
+        with pytest.raises(ValidationError):
+            validator_region(value)
+
+
+def test_batch_validation():
+    """
+    Пакетная проверка возвращает только неизвестные коды
+    """
+    assert invalid_currencies(["USD", "EUR", "USD"]) == set()
+    assert invalid_currencies(["USD", "XXQ", "usd"]) == {"XXQ", "usd"}
+    assert invalid_regions(["US", "GLOBAL"]) == set()
+    assert invalid_regions(["US", "ZZ"]) == {"ZZ"}
@@ -0,0 +1,112 @@
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+
+from apps.subscriptions.models import PriceHistory, Provider, VerifiedPrice
+from apps.subscriptions.services.subscription_service import set_subscription_price
+from apps.subscriptions.services.verified_price_service import (affected_price_history, propagate_verified_price,
+    publish_verified_price,
+)
+
+from utils.enums import Status
+
+
+@pytest.fixture()
+def provider(db):
+    return Provider.objects.create(name="Netflix", slug="netflix", description="Streaming")
+
+
+@pytest.fixture()
+def following(create_subscription, provider, utc_dt):
+    """
+    Версия 10.00 USD (2025-01-01) и подписки, которые ей следуют
+    """
+    version = publish_verified_price(provider=provider, plan="standard", amount=Decimal("10.00"), currency="USD",
+                                     valid_from=utc_dt(2025, 1, 1))
+
+    def _following(count: int, **kwargs):
+        subs = [create_subscription(title=f"s{i}", amount=Decimal("10.00"), provider=provider, **kwargs)
+                for i in range(count)]
+        PriceHistory.objects.filter(subscription__in=subs).update(verified_price=version,
+                                                                  effective_from=utc_dt(2025, 1, 1))
+        return subs
+    return _following
+
+
+@pytest.mark.django_db
+def test_publish_closes_previous_version(provider, utc_dt):
+    first = publish_verified_price(provider=provider, plan="standard", amount=Decimal("10.00"), currency="USD",
+                                   valid_from=utc_dt(2025, 1, 1))
+    second = publish_verified_price(provider=provider, plan="standard", amount=Decimal("12.00"), currency="USD",
+                                    valid_from=utc_dt(2025, 6, 1))
+    # другой ключ (регион) — независимая версия
+    publish_verified_price(provider=provider, plan="standard", amount=Decimal("9.00"), currency="EUR",
+                           region="DE", valid_from=utc_dt(2025, 6, 1))
+
+    first.refresh_from_db()
+    assert first.valid_to == second.valid_from
+    assert VerifiedPrice.objects.filter(valid_to__isnull=True).count() == 2
+
+    with pytest.raises(ValueError):
+        publish_verified_price(provider=provider, plan="standard", amount=Decimal("13.00"), currency="USD",
+                               valid_from=utc_dt(2025, 5, 1))
+
+
+@pytest.mark.django_db
+def test_propagation_skips_manual_and_inactive(following, create_subscription, provider, utc_dt):
+    """
+    Новая версия доходит только до активных подписок, следующих справочнику
+    """
+    subs = following(3)
+    canceled = following(1, status=Status.CANCELED)[0]
+    manual = create_subscription(title="manual", amount=Decimal("7.00"), provider=provider)
+    overridden = subs.pop()
+    set_subscription_price(subscription=overridden, amount=Decimal("8.00"), currency="USD")
+
+    version = publish_verified_price(provider=provider, plan="standard", amount=Decimal("12.00"), currency="USD",
+                                     valid_from=utc_dt(2025, 6, 1))
+    assert affected_price_history(version).count() == 2
+
+    now = utc_dt(2030, 1, 1)
+    state = propagate_verified_price(version, now=now)
+
+    assert (state.total, state.updated, state.conflicts, state.rejected) == (2, 2, 0, 0)
+    for sub in subs:
+        sub.refresh_from_db()
+        assert sub.current_price_amount == Decimal("12.00")
+        current = PriceHistory.objects.get(subscription=sub, effective_to__isnull=True)
+        # прошлое не переписывается: новая цена — с момента распространения
+        assert (current.verified_price_id, current.effective_from) == (version.pk, now)
+    for sub, amount in ((canceled, "10.00"), (manual, "7.00"), (overridden, "8.00")):
+        sub.refresh_from_db()
+        assert sub.current_price_amount == Decimal(amount)
+
+
+@pytest.mark.django_db
+def test_propagation_batches_and_reports_progress(following, provider, utc_dt, django_assert_max_num_queries):
+    following(5)
+    version = publish_verified_price(provider=provider, plan="standard", amount=Decimal("11.00"), currency="USD",
+                                     valid_from=utc_dt(2025, 6, 1))
+    reports = []
+
+    state = propagate_verified_price(version, batch_size=2,
+                                     progress=lambda s: reports.append((s.processed, s.batches)))
+
+    assert reports == [(2, 1), (4, 2), (5, 3)]
+    assert (state.total, state.updated, state.batches) == (5, 5, 3)
+    assert state.rate > 0
+    # повторный запуск — подписки уже на новой версии
+    assert propagate_verified_price(version).processed == 0
+
+
+@pytest.mark.django_db
+def test_propagate_command(following, provider, utc_dt, capsys):
+    following(2)
+    version = publish_verified_price(provider=provider, plan="standard", amount=Decimal("11.00"), currency="USD",
+                                     valid_from=utc_dt(2025, 6, 1))
+
+    call_command("propagate_verified_price", version.pk, "--batch-size", "1")
+
+    out = capsys.readouterr().out
+    assert "2/2" in out and "Обновлено подписок: 2" in out
@@ -44,11 +44,13 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'phonenumber_field',
 
     'apps.users.apps.UsersConfig',
     'apps.subscriptions.apps.SubscriptionsConfig',
+    'apps.analytics.apps.AnalyticsConfig',
 
     'rest_framework',
     'drf_spectacular',
@@ -98,6 +100,40 @@ DATABASES = {
     },
 }
 
+# Cache
+# Продакшен — Redis-совместимый backend (REDIS_URL), локально и в тестах — locmem
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
+# Базовая валюта курсов FxRate (отчеты в одной валюте)
+FX_BASE_CURRENCY = os.getenv('FX_BASE_CURRENCY', 'USD')
+
+# Получатель событий outbox (callable(list[OutboxEvent]), dotted path)
+OUTBOX_PUBLISHER = os.getenv('OUTBOX_PUBLISHER', 'apps.subscriptions.services.outbox.log_publisher')
+
+# Метрики вызовов сервисного слоя (utils/instrumentation.py): sinks через запятую (dotted paths классов)
+# LoggingSink, StatsdSink (UDP, STATSD_HOST:STATSD_PORT), PrometheusSink (endpoint /metrics/ монтируется только с ним;
+# счетчики в памяти процесса — только для однопроцессного запуска, с несколькими воркерами — StatsdSink)
+INSTRUMENTATION_SINKS = [path.strip() for path in
+                         os.getenv('INSTRUMENTATION_SINKS', 'utils.instrumentation.LoggingSink').split(',')
+                         if path.strip()]
+STATSD_HOST = os.getenv('STATSD_HOST', '127.0.0.1')
+STATSD_PORT = int(os.getenv('STATSD_PORT', '8125'))
+# Bearer-токен endpoint /metrics/ (PrometheusSink); пусто — endpoint доступен без токена
+PROMETHEUS_METRICS_TOKEN = os.getenv('PROMETHEUS_METRICS_TOKEN')
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -18,13 +18,19 @@ from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 from utils.decorators import admin_only
+from utils.instrumentation import prometheus_enabled, prometheus_metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('apps.users.urls')),
     path('', include('apps.subscriptions.urls')),
+    path('', include('apps.analytics.urls')),
 
     path('api/schema/', admin_only(SpectacularAPIView.as_view()), name='schema'),
     path('api/swagger/', admin_only(SpectacularSwaggerView.as_view(url_name='schema')), name='swagger-ui'),
     path('api/redoc/', admin_only(SpectacularRedocView.as_view(url_name='schema')), name='redoc'),
 ]
+
+# Prometheus: только при INSTRUMENTATION_SINKS с PrometheusSink (доступ — PROMETHEUS_METRICS_TOKEN/внутренняя сеть)
+if prometheus_enabled():
+    urlpatterns.append(path('metrics/', prometheus_metrics, name='metrics'))
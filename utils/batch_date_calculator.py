@@ -0,0 +1,247 @@
+"""
+Пакетный (векторный) расчет следующей даты списания над массивами NumPy.
+
+Повторяет логику billing_service.calculate_next_run_at (и _next_for_day/_week/_month/_year),
+но для всех строк сразу: календарная арифметика выполняется над колонками int64,
+без datetime на каждую строку.
+
+Формат входа (колонки одинаковой длины):
+- from_us        — опорный момент, epoch микросекунды (UTC)
+- period_units   — коды PeriodUnit (PERIOD_UNIT_CODES)
+- intervals      — каждые N периодов
+- anchors        — anchor_day для MONTH / anchor_weekday для WEEK (NO_ANCHOR если не задан)
+- tz_ids         — индекс timezone в списке tzinfos
+- trial_ends_us  — окончание trial, epoch микросекунды (NO_TRIAL если не задан)
+
+Результат — next_run_at в epoch микросекундах (UTC).
+"""
+from __future__ import annotations
+
+from datetime import datetime, tzinfo
+from typing import Optional, Sequence
+
+import numpy as np
+from django.core.exceptions import ValidationError
+
+from utils.enums import PeriodUnit
+
+US_PER_SEC = 1_000_000
+SEC_PER_DAY = 86_400
+
+# Коды PeriodUnit для колоночного представления
+PERIOD_UNIT_CODES = {
+    PeriodUnit.DAY: 0,
+    PeriodUnit.WEEK: 1,
+    PeriodUnit.MONTH: 2,
+    PeriodUnit.YEAR: 3,
+}
+_DAY, _WEEK, _MONTH, _YEAR = (PERIOD_UNIT_CODES[u] for u in (PeriodUnit.DAY, PeriodUnit.WEEK,
+                                                              PeriodUnit.MONTH, PeriodUnit.YEAR))
+
+# Значения-заглушки для "пустых" ячеек
+NO_ANCHOR = -1
+NO_TRIAL = np.iinfo(np.int64).min
+_NO_TRANS = np.iinfo(np.int64).max
+
+
+def _offset_s(tz: tzinfo, ts: int) -> int:
+    """
+    Смещение timezone (в секундах) в момент ts (epoch секунды UTC)
+    """
+    return int(datetime.fromtimestamp(ts, tz).utcoffset().total_seconds())
+
+
+class _TzDays:
+    """
+    Кеш смещений одной timezone по UTC-суткам.
+
+    Для каждых суток хранится: смещение на начало суток, момент перехода (или _NO_TRANS)
+    и смещение после перехода. Переход ищется бинарным поиском с точностью до секунды.
+    Количество вызовов tzinfo зависит от числа уникальных суток, а не от числа строк.
+    """
+
+    def __init__(self, tz: tzinfo):
+        self.tz = tz
+        self._days: dict[int, tuple[int, int, int]] = {}
+
+    def _record(self, day: int) -> tuple[int, int, int]:
+        rec = self._days.get(day)
+        if rec is None:
+            start = day * SEC_PER_DAY
+            end = start + SEC_PER_DAY - 1
+            off_start = _offset_s(self.tz, start)
+            off_end = _offset_s(self.tz, end)
+            if off_start == off_end:
+                rec = (off_start, _NO_TRANS, off_start)
+            else:
+                # offset(lo) == off_start, offset(hi) != off_start
+                lo, hi = start, end
+                while hi - lo > 1:
+                    mid = (lo + hi) // 2
+                    if _offset_s(self.tz, mid) == off_start:
+                        lo = mid
+                    else:
+                        hi = mid
+                rec = (off_start, hi, off_end)
+            self._days[day] = rec
+        return rec
+
+    def records(self, days: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (off_start, trans, off_end) для массива номеров суток
+        """
+        uniq, inverse = np.unique(days, return_inverse=True)
+        table = np.array([self._record(int(d)) for d in uniq], dtype=np.int64).reshape(-1, 3)
+        rows = table[inverse]
+        return rows[:, 0], rows[:, 1], rows[:, 2]
+
+    def utc_to_local(self, utc_s: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        UTC секунды -> (смещение, fold), как datetime.astimezone(tz)
+        """
+        off_start, trans, off_end = self.records(utc_s // SEC_PER_DAY)
+        offset = np.where(utc_s >= trans, off_end, off_start)
+
+        # fold=1 — момент попадает во "второй проход" часов после перевода назад.
+        # Переход может быть в текущих или предыдущих сутках
+        fold = np.zeros(utc_s.shape, dtype=np.int64)
+        for day_shift in (0, 1):
+            p_start, p_trans, p_end = self.records(utc_s // SEC_PER_DAY - day_shift)
+            back = (p_trans != _NO_TRANS) & (p_start > p_end)
+            in_fold = back & (utc_s >= p_trans) & (utc_s < p_trans + (p_start - p_end))
+            fold[in_fold] = 1
+        return offset, fold
+
+    def local_to_utc(self, wall_s: np.ndarray, fold: np.ndarray) -> np.ndarray:
+        """
+        Локальное "настенное" время -> UTC секунды с учетом fold (как zoneinfo):
+        - неоднозначное время: fold=0 — первый проход, fold=1 — второй
+        - несуществующее время: fold=0 — смещение до перехода, fold=1 — после
+        """
+        # Смещения лежат в пределах суток, поэтому достаточно 3 соседних UTC-суток
+        base_day = wall_s // SEC_PER_DAY - 1
+        offset, _, _ = self.records(base_day)
+        for day_shift in (0, 1, 2):
+            p_start, p_trans, p_end = self.records(base_day + day_shift)
+            has_trans = p_trans != _NO_TRANS
+            wall_trans = p_trans + np.where(fold == 0, np.maximum(p_start, p_end), np.minimum(p_start, p_end))
+            passed = has_trans & (wall_s >= wall_trans)
+            offset = np.where(passed, p_end, offset)
+        return wall_s - offset
+
+
+def _month_start_days(month_idx: np.ndarray) -> np.ndarray:
+    """
+    Номер суток (от epoch) первого дня месяца; month_idx — месяцы от 1970-01
+    """
+    return month_idx.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+
+
+def _days_in_month(month_idx: np.ndarray) -> np.ndarray:
+    """
+    Количество дней в месяце (векторный аналог calendar.monthrange()[1])
+    """
+    return _month_start_days(month_idx + 1) - _month_start_days(month_idx)
+
+
+def next_run_batch(*, from_us: np.ndarray, period_units: np.ndarray, intervals: np.ndarray,
+                   anchors: np.ndarray, tz_ids: np.ndarray, tzinfos: Sequence[tzinfo],
+                   trial_ends_us: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Векторный расчет next_run_at для массива расписаний.
+
+    Результат совпадает с billing_service.calculate_next_run_at построчно
+    (включая clamp дня месяца, переходы на летнее/зимнее время и fold).
+    """
+    from_us = np.asarray(from_us, dtype=np.int64)
+    period_units = np.asarray(period_units, dtype=np.int64)
+    intervals = np.asarray(intervals, dtype=np.int64)
+    anchors = np.asarray(anchors, dtype=np.int64)
+    tz_ids = np.asarray(tz_ids, dtype=np.int64)
+
+    if np.any(intervals < 1):
+        raise ValidationError("Интервал (каждые N периодов) должен быть >= 1")
+    if np.any((period_units < _DAY) | (period_units > _YEAR)):
+        raise ValidationError("Период не найден")
+    if np.any((period_units == _MONTH) & (anchors == NO_ANCHOR)):
+        raise ValidationError("anchor_day является обязательным для интервала (period_unit) по месяцам (MONTH)")
+    if np.any((period_units == _WEEK) & (anchors == NO_ANCHOR)):
+        raise ValidationError("anchor_weekday является обязательным для интервала (period_unit) по неделям (WEEK)")
+
+    # Дробную часть секунды переносим в результат без изменений
+    frac_us = from_us % US_PER_SEC
+    utc_s = from_us // US_PER_SEC
+    offset = np.zeros_like(utc_s)
+    fold = np.zeros_like(utc_s)
+    tz_days = [_TzDays(tz) for tz in tzinfos]
+
+    for tz_id in np.unique(tz_ids):
+        mask = tz_ids == tz_id
+        offset[mask], fold[mask] = tz_days[tz_id].utc_to_local(utc_s[mask])
+
+    # Trial: если trial_ends_at позже (по локальному времени), считаем от конца trial
+    if trial_ends_us is not None:
+        trial_ends_us = np.asarray(trial_ends_us, dtype=np.int64)
+        has_trial = trial_ends_us != NO_TRIAL
+        if np.any(has_trial):
+            trial_us = np.where(has_trial, trial_ends_us, from_us)
+            trial_s = trial_us // US_PER_SEC
+            t_offset = np.zeros_like(trial_s)
+            t_fold = np.zeros_like(trial_s)
+            for tz_id in np.unique(tz_ids[has_trial]):
+                mask = (tz_ids == tz_id) & has_trial
+                t_offset[mask], t_fold[mask] = tz_days[tz_id].utc_to_local(trial_s[mask])
+
+            local_us = (utc_s + offset) * US_PER_SEC + frac_us
+            t_local_us = (trial_s + t_offset) * US_PER_SEC + trial_us % US_PER_SEC
+            use_trial = has_trial & (t_local_us > local_us)
+            utc_s = np.where(use_trial, trial_s, utc_s)
+            offset = np.where(use_trial, t_offset, offset)
+            fold = np.where(use_trial, t_fold, fold)
+            frac_us = np.where(use_trial, trial_us % US_PER_SEC, frac_us)
+
+    local_s = utc_s + offset
+    days = local_s // SEC_PER_DAY
+    time_of_day = local_s % SEC_PER_DAY
+
+    month_idx = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    day_of_month = days - _month_start_days(month_idx) + 1
+
+    new_days = days.copy()
+
+    # DAY: + N дней
+    is_day = period_units == _DAY
+    new_days[is_day] = days[is_day] + intervals[is_day]
+
+    # WEEK: ближайший anchor_weekday (0=Mon...6=Sun) с шагом N недель
+    is_week = period_units == _WEEK
+    weekday = (days + 3) % 7  # 1970-01-01 — четверг
+    days_ahead = (anchors - weekday) % 7
+    days_ahead = np.where(days_ahead == 0, 7 * intervals, days_ahead + 7 * (intervals - 1))
+    new_days[is_week] = days[is_week] + days_ahead[is_week]
+
+    # MONTH: anchor_day в текущем месяце, если уже прошел — через N месяцев (с clamp)
+    is_month = period_units == _MONTH
+    clamped = np.minimum(anchors, _days_in_month(month_idx))
+    passed = clamped <= day_of_month
+    target_month = np.where(passed, month_idx + intervals, month_idx)
+    target_day = np.where(passed, np.minimum(anchors, _days_in_month(target_month)), clamped)
+    month_days = _month_start_days(target_month) + target_day - 1
+    new_days[is_month] = month_days[is_month]
+
+    # YEAR: + N лет, тот же день (с clamp для 29 февраля)
+    is_year = period_units == _YEAR
+    year_month = month_idx + 12 * intervals
+    year_days = _month_start_days(year_month) + np.minimum(day_of_month, _days_in_month(year_month)) - 1
+    new_days[is_year] = year_days[is_year]
+
+    # datetime.replace() сохраняет fold (MONTH/YEAR), сложение с timedelta — сбрасывает (DAY/WEEK)
+    new_fold = np.where(is_month | is_year, fold, 0)
+    new_wall_s = new_days * SEC_PER_DAY + time_of_day
+
+    result_s = np.empty_like(new_wall_s)
+    for tz_id in np.unique(tz_ids):
+        mask = tz_ids == tz_id
+        result_s[mask] = tz_days[tz_id].local_to_utc(new_wall_s[mask], new_fold[mask])
+
+    return result_s * US_PER_SEC + frac_us
@@ -1,27 +1,101 @@
 from __future__ import annotations
 
 import calendar
-from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
 
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
 
-def get_tzinfo(tz_name: str | None) -> timezone.tzinfo:
+# Максимум timezone в кеше (реальных IANA-имен ~600, значит кеш ограничен и для мусорных значений)
+TZ_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=1)
+def valid_timezone_names() -> frozenset[str]:
     """
-    Получение timezone по IANA-строке.
+    Множество IANA-имен timezone (строится один раз за процесс) для O(1) проверки.
+    """
+    return frozenset(available_timezones())
+
 
-    Если tz_name пуст берем timezone проекта.
+@lru_cache(maxsize=TZ_CACHE_SIZE)
+def _resolve_zone(tz_name: str) -> ZoneInfo | None:
     """
+    Интернированный ZoneInfo по имени; для несуществующих имен кешируется None,
+    чтобы не проходить через исключение на каждом вызове.
+    """
+    try:
+        return ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def is_valid_timezone(tz_name: str) -> bool:
+    """
+    Проверка IANA-имени timezone без исключений.
+    """
+    return tz_name in valid_timezone_names() or _resolve_zone(tz_name) is not None
+
+
+def tz_cache_info():
+    """
+    Счетчики кеша timezone (hits/misses/maxsize/currsize).
+    """
+    return _resolve_zone.cache_info()
+
+
+def get_tzinfo(tz_source) -> timezone.tzinfo:
+    """
+    Получение timezone по IANA-строке или по подписке (поле billing_timezone).
+
+    Если имя пустое берем timezone проекта.
+    """
+    tz_name = getattr(tz_source, "billing_timezone", tz_source)
 
     if not tz_name:
         return timezone.get_current_timezone()
 
-    try:
-       return ZoneInfo(tz_name)
-    except ZoneInfoNotFoundError as e:
-        raise ValidationError(f'Timezone не существует: {tz_name}') from e
+    tzone = _resolve_zone(tz_name)
+    if tzone is None:
+        raise ValidationError(f'Timezone не существует: {tz_name}')
+    return tzone
+
+
+@lru_cache(maxsize=TZ_CACHE_SIZE)
+def dst_gaps(tzone: timezone.tzinfo, year: int) -> tuple[tuple[datetime, datetime], ...]:
+    """
+    Несуществующие интервалы локального времени (перевод часов вперед) за год: ((начало, конец), ...),
+    naive локальное время, конец не включается. Переход 2024-03-10 в America/New_York -> ((02:00, 03:00),).
+
+    Переходы ищутся по offset с шагом в неделю + бинарный поиск до секунды; результат кешируется на (tz, год).
+    """
+    gaps = []
+    moment = datetime(year, 1, 1, tzinfo=dt_timezone.utc)
+    end = datetime(year + 1, 1, 1, tzinfo=dt_timezone.utc)
+    offset = moment.astimezone(tzone).utcoffset()
+    while moment < end:
+        probe = min(moment + timedelta(weeks=1), end)
+        probe_offset = probe.astimezone(tzone).utcoffset()
+        if probe_offset != offset:
+            low, high = moment, probe
+            while high - low > timedelta(seconds=1):
+                middle = low + (high - low) / 2
+                if middle.astimezone(tzone).utcoffset() == offset:
+                    low = middle
+                else:
+                    high = middle
+            new_offset = high.astimezone(tzone).utcoffset()
+            if new_offset > offset:
+                transition = high.replace(tzinfo=None, microsecond=0)
+                gaps.append((transition + offset, transition + new_offset))
+            offset = new_offset
+            moment = high
+        else:
+            moment = probe
+    return tuple(gaps)
 
 
 def clamp_day_to_month(year: int, month: int, day: int) -> int:
@@ -0,0 +1,21 @@
+from django.contrib.postgres.fields import DateTimeRangeField
+from django.db.models import DateField, Func
+
+
+class TsTzRange(Func):
+    """
+    PostgreSQL tstzrange(lower, upper, bounds): интервал [effective_from, effective_to)
+    NULL в верхней границе — бесконечный интервал (цена действует до сих пор)
+    """
+    function = "TSTZRANGE"
+    output_field = DateTimeRangeField()
+
+
+class AddDays(Func):
+    """
+    Дата + целое число дней (date + integer в PostgreSQL): AddDays("ended_at", "grace_days")
+    """
+    arity = 2
+    template = "(%(expressions)s)"
+    arg_joiner = " + "
+    output_field = DateField()
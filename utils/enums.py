@@ -57,4 +57,15 @@ class PeriodUnit(models.TextChoices):
     DAY = "day", "Day"
     WEEK = "week", "Week"
     MONTH = "month", "Month"
-    YEAR = "year", "Year"
\ No newline at end of file
+    YEAR = "year", "Year"
+
+class EventType(models.TextChoices):
+    """
+    Тип события подписки (transactional outbox)
+    """
+    # Изменилась цена (current_price_*)
+    PRICE_CHANGED = "price_changed", "Price changed"
+    # Изменился статус
+    STATUS_CHANGED = "status_changed", "Status changed"
+    # Изменилась дата ближайшего списания (next_billing_at)
+    NEXT_BILLING_CHANGED = "next_billing_changed", "Next billing changed"
@@ -0,0 +1,320 @@
+"""
+Инструментирование сервисного слоя
+
+Функционал:
+- instrument(name) — контекстный менеджер/декоратор: запросы к БД за вызов, время в БД, общее время,
+  затронутые строки (rowcount) через connection.execute_wrapper
+- instrumented — декоратор с именем вызова из модуля/функции
+- sinks (settings.INSTRUMENTATION_SINKS, dotted paths классов): лог, StatsD по UDP, Prometheus (text format)
+- emit_gauges(metrics) — разовые значения (итоги фоновых задач) через те же sinks
+- query_budget(limit) — хелпер тестов: падает, если вызов сделал больше limit запросов
+
+PrometheusSink хранит гистограммы в памяти процесса: при нескольких воркерах (gunicorn/uwsgi) каждый scrape
+отдает счетчики одного случайного воркера. Для многопроцессного деплоя — StatsdSink (агрегирует агент),
+PrometheusSink/endpoint /metrics/ — только для однопроцессного запуска.
+
+Ошибка sink не влияет на вызов сервиса (только лог). Вложенные instrument считаются независимо:
+запросы вложенного вызова входят и в его статистику, и в статистику внешнего.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import socket
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Iterator, Optional, Protocol, Sequence
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SINKS = ("utils.instrumentation.LoggingSink",)
+
+# Метрики вызова: поле CallStats -> (описание, границы корзин гистограммы)
+HISTOGRAMS = {
+    "queries": ("Запросов к БД за вызов", (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)),
+    "db_time": ("Время в БД за вызов, с", (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)),
+    "wall_time": ("Общее время вызова, с", (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)),
+    "rows": ("Строк затронуто/прочитано за вызов (rowcount)", (1, 10, 100, 1000, 10000, 100000, 1000000)),
+}
+
+
+@dataclass
+class CallStats:
+    """
+    Статистика одного вызова; sql — тексты запросов (только при capture_sql=True)
+    """
+    name: str
+    queries: int = 0
+    db_time: float = 0.0
+    wall_time: float = 0.0
+    rows: int = 0
+    sql: list[str] = field(default_factory=list)
+
+
+class Sink(Protocol):
+    def observe(self, stats: CallStats) -> None: ...
+
+    def gauge(self, name: str, value: float) -> None: ...
+
+
+class _QueryRecorder:
+    """
+    execute_wrapper: счетчик запросов, времени и rowcount
+    """
+
+    def __init__(self, stats: CallStats, capture_sql: bool):
+        self.stats = stats
+        self.capture_sql = capture_sql
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.stats.queries += 1
+            self.stats.db_time += time.perf_counter() - start
+            # rowcount: SELECT на psycopg — строк в результате, DML — измененных; -1, если драйвер не знает
+            rowcount = getattr(context.get("cursor"), "rowcount", -1)
+            if rowcount and rowcount > 0:
+                self.stats.rows += rowcount
+            if self.capture_sql:
+                self.stats.sql.append(sql)
+
+
+_sinks: Optional[list[Sink]] = None
+_sinks_lock = threading.Lock()
+
+
+def get_sinks() -> list[Sink]:
+    """
+    Sinks из settings.INSTRUMENTATION_SINKS (создаются один раз на процесс)
+    """
+    global _sinks
+    with _sinks_lock:
+        if _sinks is None:
+            _sinks = [import_string(path)() for path in getattr(settings, "INSTRUMENTATION_SINKS", DEFAULT_SINKS)]
+        return _sinks
+
+
+def reset_sinks() -> None:
+    """
+    Пересоздать sinks при следующем вызове (смена настроек, тесты)
+    """
+    global _sinks
+    with _sinks_lock:
+        _sinks = None
+
+
+def emit(stats: CallStats, sinks: Optional[Sequence[Sink]] = None) -> None:
+    for sink in get_sinks() if sinks is None else sinks:
+        try:
+            sink.observe(stats)
+        except Exception:
+            logger.exception("Ошибка sink %s", type(sink).__name__)
+
+
+def emit_gauges(metrics: dict[str, float], sinks: Optional[Sequence[Sink]] = None) -> None:
+    """
+    Значения-снимки {"subscriptions.denormalization.drift.current_price": 3, ...} во все sinks
+    (sink без gauge пропускается)
+    """
+    for sink in get_sinks() if sinks is None else sinks:
+        gauge = getattr(sink, "gauge", None)
+        if gauge is None:
+            continue
+        for name, value in metrics.items():
+            try:
+                gauge(name, value)
+            except Exception:
+                logger.exception("Ошибка sink %s", type(sink).__name__)
+                break
+
+
+@contextmanager
+def instrument(name: str, *, budget: Optional[int] = None, sinks: Optional[Sequence[Sink]] = None,
+               capture_sql: bool = False, using: str = DEFAULT_DB_ALIAS) -> Iterator[CallStats]:
+    """
+    Статистика вызова: with instrument("billing.recalculate") as stats: ... / @instrument("...")
+
+    budget — ожидаемый максимум запросов: превышение пишется в лог (warning), вызов не прерывается.
+    sinks=None — sinks из настроек, [] — никуда не отправлять.
+    """
+    stats = CallStats(name=name)
+    start = time.perf_counter()
+    try:
+        with connections[using].execute_wrapper(_QueryRecorder(stats, capture_sql)):
+            yield stats
+    finally:
+        stats.wall_time = time.perf_counter() - start
+        if budget is not None and stats.queries > budget:
+            logger.warning("%s: %s запросов при бюджете %s", name, stats.queries, budget)
+        emit(stats, sinks)
+
+
+def instrumented(func=None, *, budget: Optional[int] = None):
+    """
+    Декоратор instrument с именем "<модуль>.<функция>": @instrumented / @instrumented(budget=20)
+    """
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with instrument(name, budget=budget):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator if func is None else decorator(func)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(limit: int, *, name: str = "query budget", using: str = DEFAULT_DB_ALIAS) -> Iterator[CallStats]:
+    """
+    Хелпер тестов: блок должен уложиться в limit запросов, иначе QueryBudgetExceeded со списком запросов
+
+        with query_budget(12):
+            bulk_change_price(ids, price=...)
+    """
+    with instrument(name, sinks=(), capture_sql=True, using=using) as stats:
+        yield stats
+    if stats.queries > limit:
+        listing = "\n".join(f"{i}. {sql}" for i, sql in enumerate(stats.sql, start=1))
+        raise QueryBudgetExceeded(f"{name}: {stats.queries} запросов при бюджете {limit}\n{listing}")
+
+
+class LoggingSink:
+    """
+    Статистика вызовов в лог (DEBUG)
+    """
+
+    def observe(self, stats: CallStats) -> None:
+        logger.debug("%s: queries=%s db=%.1fms wall=%.1fms rows=%s", stats.name, stats.queries,
+                     stats.db_time * 1000, stats.wall_time * 1000, stats.rows)
+
+    def gauge(self, name: str, value: float) -> None:
+        logger.info("%s=%s", name, value)
+
+
+_METRIC_NAME_RE = re.compile(r"[^A-Za-z0-9_.]")
+_PROMETHEUS_NAME_RE = re.compile(r"[^A-Za-z0-9_]")
+
+
+class StatsdSink:
+    """
+    StatsD по UDP (settings.STATSD_HOST/STATSD_PORT, по умолчанию localhost:8125), без ожидания ответа
+
+    Время — таймеры (|ms), запросы и строки — гистограммы (|h).
+    """
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None, prefix: Optional[str] = None):
+        self.address = (host or getattr(settings, "STATSD_HOST", "127.0.0.1"),
+                        int(port or getattr(settings, "STATSD_PORT", 8125)))
+        self.prefix = prefix or getattr(settings, "STATSD_PREFIX", "subflux")
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def observe(self, stats: CallStats) -> None:
+        base = f"{self.prefix}.{_METRIC_NAME_RE.sub('_', stats.name)}"
+        payload = "\n".join((f"{base}.queries:{stats.queries}|h",
+                             f"{base}.db_time:{stats.db_time * 1000:.3f}|ms",
+                             f"{base}.wall_time:{stats.wall_time * 1000:.3f}|ms",
+                             f"{base}.rows:{stats.rows}|h"))
+        try:
+            self._socket.sendto(payload.encode(), self.address)
+        except OSError:
+            # Агент недоступен/буфер полон — метрика теряется, вызов не страдает
+            pass
+
+    def gauge(self, name: str, value: float) -> None:
+        try:
+            self._socket.sendto(f"{self.prefix}.{_METRIC_NAME_RE.sub('_', name)}:{value}|g".encode(), self.address)
+        except OSError:
+            pass
+
+
+class PrometheusSink:
+    """
+    Гистограммы и gauges в памяти процесса, отдаются в Prometheus text format (render / prometheus_metrics)
+
+    Только для однопроцессного запуска: у каждого воркера свои счетчики, scrape видит один из них.
+    """
+
+    def __init__(self, prefix: Optional[str] = None):
+        self.prefix = prefix or getattr(settings, "PROMETHEUS_PREFIX", "subflux_service")
+        self._lock = threading.Lock()
+        # (метрика, имя вызова) -> [счетчики корзин..., +Inf], сумма
+        self._buckets: dict[tuple[str, str], list[int]] = {}
+        self._sums: dict[tuple[str, str], float] = {}
+        self._gauges: dict[str, float] = {}
+
+    def observe(self, stats: CallStats) -> None:
+        with self._lock:
+            for metric, (_, bounds) in HISTOGRAMS.items():
+                value = getattr(stats, metric)
+                key = (metric, stats.name)
+                counts = self._buckets.setdefault(key, [0] * (len(bounds) + 1))
+                counts[bisect_left(bounds, value)] += 1
+                self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[f"{self.prefix}_{_PROMETHEUS_NAME_RE.sub('_', name)}"] = value
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for full_name, value in sorted(self._gauges.items()):
+                lines += [f"# TYPE {full_name} gauge", f"{full_name} {value}"]
+            for metric, (description, bounds) in HISTOGRAMS.items():
+                full_name = f"{self.prefix}_{metric}"
+                lines += [f"# HELP {full_name} {description}", f"# TYPE {full_name} histogram"]
+                for (key_metric, name), counts in sorted(self._buckets.items()):
+                    if key_metric != metric:
+                        continue
+                    label = name.replace("\\", "\\\\").replace('"', '\\"')
+                    cumulative = 0
+                    for bound, count in zip((*bounds, "+Inf"), counts):
+                        cumulative += count
+                        lines.append(f'{full_name}_bucket{{name="{label}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{full_name}_sum{{name="{label}"}} {self._sums[(metric, name)]}')
+                    lines.append(f'{full_name}_count{{name="{label}"}} {cumulative}')
+        return "\n".join(lines) + "\n"
+
+
+def prometheus_enabled() -> bool:
+    """
+    PrometheusSink среди settings.INSTRUMENTATION_SINKS (endpoint монтируется только в этом случае)
+    """
+    return any(issubclass(import_string(path), PrometheusSink)
+               for path in getattr(settings, "INSTRUMENTATION_SINKS", DEFAULT_SINKS))
+
+
+def prometheus_metrics(request):
+    """
+    Endpoint для Prometheus (config/urls.py, только при подключенном PrometheusSink).
+    Отдает счетчики процесса, обработавшего запрос, — корректно только при одном процессе.
+
+    settings.PROMETHEUS_METRICS_TOKEN — если задан, нужен заголовок "Authorization: Bearer <token>"
+    (bearer_token в scrape_config); иначе endpoint открывать только во внутренней сети.
+    """
+    token = getattr(settings, "PROMETHEUS_METRICS_TOKEN", None)
+    if token and not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponseForbidden()
+    for sink in get_sinks():
+        if isinstance(sink, PrometheusSink):
+            return HttpResponse(sink.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+    raise Http404
@@ -1,10 +1,14 @@
+from typing import Iterable
+
 from django.core.validators import ValidationError
-from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import re
-from pycountry import currencies, countries
+
+from utils.date_calculator import is_valid_timezone
+from utils.iso_codes import CURRENCY_CODES, REGION_CODES
 
 _CURRENCY_RE = re.compile(r'^[A-Z]{3}$')   # ISO 4217 (USD/EUR/RUB...)
 _COUNTRY_RE = re.compile(r'^[A-Z]{2}$')    # ISO 3166-1 alpha-2 (US, DE, RU, ...) или GLOBAL
+GLOBAL_REGION = 'GLOBAL'
 
 
 def validator_timezone(value: str):
@@ -14,10 +18,8 @@ def validator_timezone(value: str):
     if value in (None, ''):
         return
 
-    try:
-        ZoneInfo(value)
-    except ZoneInfoNotFoundError as e:
-        raise ValidationError(f'Timezone не существует: {value}') from e
+    if not is_valid_timezone(value):
+        raise ValidationError(f'Timezone не существует: {value}')
 
 
 def validator_currency(value: str):
@@ -27,12 +29,15 @@ def validator_currency(value: str):
     if value in (None, ''):
         raise ValidationError(f'Код валюты обязателен для заполнения')
 
-    # Проверка соответствия формату ISO 3166-1 alpha-2
+    # Быстрый путь: известный код (frozenset из utils.iso_codes)
+    if value in CURRENCY_CODES:
+        return
+
+    # Проверка соответствия формату ISO 4217
     if not _CURRENCY_RE.match(value):
         raise ValidationError(f'Код валюты не соответствует формату ISO 4217')
 
-    if currencies.get(alpha_3=value) is None:
-        raise ValidationError(f'Валюта не найдена: {value}')
+    raise ValidationError(f'Валюта не найдена: {value}')
 
 
 def validator_region(value: str):
@@ -42,12 +47,26 @@ def validator_region(value: str):
     if value in (None, ''):
         raise ValidationError(f'Регион обязателен для заполнения')
 
-    if value == 'GLOBAL':
+    if value == GLOBAL_REGION or value in REGION_CODES:
         return
 
     # Проверка соответствия формату ISO 3166-1 alpha-2
     if not _COUNTRY_RE.match(value):
         raise ValidationError(f'Регион не соответствует формату ISO 3166-1 alpha-2 или GLOBAL')
 
-    if countries.get(alpha_2=value) is None:
-        raise ValidationError(f'Регион не найден: {value}')
+    raise ValidationError(f'Регион не найден: {value}')
+
+
+def invalid_currencies(values: Iterable[str]) -> set[str]:
+    """
+    Пакетная валидация валют: возвращает множество неизвестных кодов (пустое — все валидны).
+    Одна операция над множествами на пачку вместо вызова validator_currency на каждую строку.
+    """
+    return set(values) - CURRENCY_CODES
+
+
+def invalid_regions(values: Iterable[str]) -> set[str]:
+    """
+    Пакетная валидация регионов (ISO 3166-1 alpha-2 или GLOBAL): множество неизвестных кодов
+    """
+    return set(values) - REGION_CODES - {GLOBAL_REGION}